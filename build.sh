@@ -5,9 +5,12 @@ set -o errexit
 # Install dependencies
 pip install -r requirements.txt
 
-# Collect static files
+# Collect static files (minified, content-hashed, gzip + Brotli)
 python manage.py collectstatic --no-input
 
+# Every asset a template links to must be in the manifest
+python manage.py check_static_assets
+
 # Run migrations
 python manage.py migrate
 
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shopverse.settings")
+# Serve the async storefront views (see store/async_views.py).
+os.environ.setdefault("STORE_ASYNC_VIEWS", "true")
 
 application = get_asgi_application()
@@ -0,0 +1,12 @@
+"""
+URL configuration under ASGI (``STORE_ASYNC_VIEWS``): as shopverse/urls.py,
+with the storefront read views from store/async_views.py.
+"""
+
+from django.urls import path, include
+
+from . import urls
+
+urlpatterns = [
+    path('', include('store.async_urls')),
+] + urls.urlpatterns
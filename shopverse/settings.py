@@ -14,6 +14,8 @@ from pathlib import Path
 import os
 import dj_database_url
 
+from store.staticfiles import add_cache_headers as add_static_cache_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -57,11 +59,17 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "store.middleware.PerformanceMiddleware",
+    "store.middleware.CartCookieMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "shopverse.urls"
+# shopverse/asgi.py turns this on: under ASGI the storefront read views
+# are the async ones (store/async_views.py).
+STORE_ASYNC_VIEWS = os.environ.get('STORE_ASYNC_VIEWS', 'False').lower() == 'true'
+
+ROOT_URLCONF = "shopverse.asgi_urls" if STORE_ASYNC_VIEWS else "shopverse.urls"
 
 TEMPLATES = [
     {
@@ -105,6 +113,49 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default (per process, LRU eviction past MAX_ENTRIES). Set
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache and
+# CACHE_LOCATION=/some/dir to share the cache between workers on one host.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        "LOCATION": os.environ.get('CACHE_LOCATION', 'shopverse'),
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+}
+
+# Catalog data cached by store/catalog_cache.py (categories, featured
+# products, first page of each category).
+STORE_CATALOG_CACHE = 'default'
+STORE_CATALOG_CACHE_TIMEOUT = 300
+# Rendered product cards are keyed by product version, so they can live longer.
+STORE_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Part of every storefront page's ETag (store/conditional.py), so browsers
+# revalidate to fresh pages after a deploy that changes templates.
+STORE_PAGE_VERSION = os.environ.get('RENDER_GIT_COMMIT', '')
+
+# Sessions live in the database. With a cache shared between workers (see
+# CACHE_BACKEND above), SESSION_ENGINE=django.contrib.sessions.backends.cached_db
+# serves session reads from the cache and only writes to the database. Don't
+# use it with the per-process local-memory cache: workers would see stale
+# sessions.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+
+# Where carts are kept (store/cart_storage.py): anonymous visitors get a signed
+# cookie, so browsing and filling a cart writes nothing on the server; logged-in
+# users get CartLine rows, and their anonymous cart is merged in on login. Use
+# store.cart_storage.SessionCartStorage for either to keep the cart in the session.
+STORE_CART_STORAGE = 'store.cart_storage.SignedCookieCartStorage'
+STORE_CART_USER_STORAGE = 'store.cart_storage.DatabaseCartStorage'
+STORE_CART_COOKIE_NAME = 'cart'
+STORE_CART_COOKIE_AGE = 60 * 60 * 24 * 30
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -143,8 +194,12 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-# Use simpler whitenoise storage that works with DEBUG=True/False
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
+# collectstatic minifies CSS, writes content-hashed copies listed in
+# staticfiles.json and precompresses them with gzip and Brotli; hashed files
+# are served with a one-year immutable Cache-Control (see store/staticfiles.py).
+# Until collectstatic has run, files are served under their own names.
+STATICFILES_STORAGE = 'store.staticfiles.MinifiedManifestStaticFilesStorage'
+WHITENOISE_ADD_HEADERS_FUNCTION = add_static_cache_headers
 
 # Allow whitenoise to serve files from STATICFILES_DIRS (needed for DEBUG=True)
 WHITENOISE_USE_FINDERS = True
@@ -167,6 +222,28 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 UPI_ID = os.environ.get('UPI_ID', 'shopverse@upi')
 UPI_NAME = os.environ.get('UPI_NAME', 'ShopVerse Store')
 
+# Product listings count matches up to this many rows and show "1000+" past
+# it, so the count stays cheap on large catalogs. Set to 0 to hide the count.
+STORE_CATALOG_COUNT_LIMIT = 1000
+
+# Request metrics (store/middleware.py): requests kept per view for the
+# percentiles on /admin-dashboard/performance/, and slow queries kept.
+STORE_METRICS_WINDOW = 1000
+STORE_METRICS_SLOW_QUERIES = 20
+
+# Staff dashboard (store/dashboard.py): how long the header KPIs are cached,
+# and the stock level at or below which a product counts as low stock.
+STORE_DASHBOARD_KPI_TIMEOUT = 60
+STORE_LOW_STOCK_THRESHOLD = 5
+
+# Search suggestions (store/typeahead.py): seconds before a process rebuilds
+# its in-memory index to pick up product changes made by other processes.
+STORE_TYPEAHEAD_MAX_AGE = 300
+
+# Stock reservations (store/reservations.py): seconds a UPI order placed at
+# checkout holds its units before release_expired_reservations cancels it.
+STORE_RESERVATION_TTL = 30 * 60
+
 # Cloudinary Configuration for Media Storage
 # Sign up at https://cloudinary.com (free tier available)
 CLOUDINARY_STORAGE = {
@@ -59,6 +59,13 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Facet filters apply as soon as a box is ticked; Apply is for no-JS.
+    document.querySelectorAll('.facet-form input[type="checkbox"]').forEach(box => {
+        box.addEventListener('change', () => box.form.submit());
+    });
+
+    initSearchSuggestions();
+
     const links = document.querySelectorAll('a[href^="#"]');
     links.forEach(link => {
         link.addEventListener('click', function(e) {
@@ -93,6 +100,84 @@ function decrementQty(button) {
     }
 }
 
+// ===== SEARCH SUGGESTIONS =====
+const SUGGEST_DELAY = 150;
+const SUGGEST_MIN_LENGTH = 2;
+
+function initSearchSuggestions() {
+    const input = document.querySelector('.header-search input[data-suggest-url]');
+    const list = document.getElementById('searchSuggestions');
+    if (!input || !list) return;
+
+    let timer;
+    let controller;
+    let active = -1;
+
+    function hide() {
+        list.hidden = true;
+        active = -1;
+    }
+
+    function show(suggestions) {
+        list.replaceChildren(...suggestions.map(suggestion => {
+            const item = document.createElement('li');
+            const link = document.createElement('a');
+            link.href = suggestion.url;
+            link.textContent = suggestion.name;
+            link.setAttribute('role', 'option');
+            item.appendChild(link);
+            return item;
+        }));
+        active = -1;
+        list.hidden = suggestions.length === 0;
+    }
+
+    function highlight(index) {
+        const links = list.querySelectorAll('a');
+        if (links.length === 0) return;
+        active = (index + links.length) % links.length;
+        links.forEach((link, n) => link.classList.toggle('active', n === active));
+    }
+
+    // Wait for a pause in typing, and drop the answer to a query that has been typed over.
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (query.length < SUGGEST_MIN_LENGTH) {
+            if (controller) controller.abort();
+            hide();
+            return;
+        }
+        timer = setTimeout(() => {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            const url = `${input.dataset.suggestUrl}?q=${encodeURIComponent(query)}`;
+            fetch(url, {signal: controller.signal})
+                .then(response => response.ok ? response.json() : {suggestions: []})
+                .then(data => show(data.suggestions))
+                .catch(error => {
+                    if (error.name !== 'AbortError') hide();
+                });
+        }, SUGGEST_DELAY);
+    });
+
+    input.addEventListener('keydown', e => {
+        if (list.hidden) return;
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            highlight(active + (e.key === 'ArrowDown' ? 1 : -1));
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            window.location.href = list.querySelectorAll('a')[active].href;
+        } else if (e.key === 'Escape') {
+            hide();
+        }
+    });
+
+    // Delay so a click on a suggestion lands before the list goes.
+    input.addEventListener('blur', () => setTimeout(hide, 150));
+}
+
 // ===== CAROUSEL FUNCTIONS =====
 function initCarousel() {
     const carousel = document.querySelector('.carousel');
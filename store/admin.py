@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, Product, Order, OrderItem
+from . import dashboard, reservations
+from .models import Category, Product, Order, OrderItem, StockReservation
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -11,6 +12,7 @@ class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'price', 'stock', 'category', 'created_at']
     list_filter = ['category', 'created_at', 'condition', 'rarity']
     list_editable = ['price', 'stock']
+    list_select_related = ['category']
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ['name', 'description']
 
@@ -18,11 +20,29 @@ class OrderItemInline(admin.TabularInline):
     model = OrderItem
     raw_id_fields = ['product']
     extra = 0
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'full_name', 'email', 'status', 'created_at']
+    list_display = ['id', 'full_name', 'email', 'item_count', 'total', 'status', 'created_at']
     list_filter = ['status', 'created_at']
     list_editable = ['status']
+    readonly_fields = ['subtotal', 'total', 'item_count']
     inlines = [OrderItemInline]
     search_fields = ['full_name', 'email', 'phone']
+    
+    def save_model(self, request, obj, form, change):
+        # Covers the change form and list_editable saves alike.
+        super().save_model(request, obj, form, change)
+        if change and 'status' in form.changed_data:
+            reservations.status_changed(obj, form.initial['status'])
+            dashboard.invalidate_kpis()
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['order', 'product', 'quantity', 'expires_at']
+    list_select_related = ['order', 'product']
+    raw_id_fields = ['order', 'product']
+    date_hierarchy = 'expires_at'
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import async_views
+
+# Ahead of store/urls.py under ASGI (see shopverse/asgi_urls.py).
+urlpatterns = [
+    path('', async_views.home, name='home'),
+    path('products/', async_views.product_list, name='product_list'),
+    path('products/suggest/', async_views.search_suggestions, name='search_suggestions'),
+    path('product/<slug:slug>/', async_views.product_detail, name='product_detail'),
+    path('cart/', async_views.cart_view, name='cart'),
+]
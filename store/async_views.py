@@ -0,0 +1,80 @@
+"""
+Async versions of the storefront read views, served under ASGI.
+
+shopverse/asgi.py routes home, the product list and page, search
+suggestions and the cart here (``STORE_ASYNC_VIEWS``, see
+shopverse/asgi_urls.py); under WSGI the sync views in store/views.py serve
+them, since Django would otherwise run each async view in an event loop of
+its own per request. Both fetch the same data and share the code that
+renders the page or answers 304.
+
+The catalog lookups use the async cache and ORM (``acached``, ``aget``,
+``async for``) and independent ones are gathered. Django 4.2's async ORM
+still runs each query in a thread, so the gather overlaps cache round trips
+rather than SQL. Session, user and template work go through
+``sync_to_async``.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+
+from . import catalog_cache, facets, typeahead
+from .cart import Cart
+from .models import Product
+from .views import (
+    home_response, product_cards, product_detail_response, product_list_response, product_listing,
+    suggestions_query, suggestions_response,
+)
+
+
+async def home(request):
+    in_stock = product_cards().filter(stock__gt=0)
+    categories, (last_modified, count), featured_products = await asyncio.gather(
+        catalog_cache.acategories(),
+        catalog_cache.alisting_version(in_stock, 'home'),
+        catalog_cache.afeatured_products(in_stock),
+    )
+    return await sync_to_async(home_response)(
+        request, categories, last_modified, count, lambda: featured_products,
+    )
+
+
+async def product_list(request):
+    search_query = request.GET.get('search')
+    categories = await catalog_cache.acategories()
+    # The search backend may look at the schema the first time it's used.
+    selection, unfaceted, products, ordering = await sync_to_async(product_listing)(
+        request, categories, search_query,
+    )
+    version, facet_counts = await asyncio.gather(
+        catalog_cache.alisting_version(products, facets.cache_name(selection, search_query)),
+        facets.acounts(unfaceted, selection, search_query),
+    )
+    return await sync_to_async(product_list_response)(
+        request, categories, search_query, selection, products, ordering, version, facet_counts,
+    )
+
+
+async def product_detail(request, slug):
+    try:
+        product = await Product.objects.select_related('category').aget(slug=slug)
+    except Product.DoesNotExist:
+        raise Http404('No Product matches the given query.')
+    return await sync_to_async(product_detail_response)(request, product)
+
+
+async def search_suggestions(request):
+    query = suggestions_query(request)
+    suggestions = []
+    if len(query) >= typeahead.MIN_QUERY_LENGTH:
+        suggestions = await typeahead.asuggest(query)
+    return suggestions_response(query, suggestions)
+
+
+async def cart_view(request):
+    # Loading the cart may read the session and the logged-in user.
+    cart = await sync_to_async(Cart)(request)
+    await cart.asnapshot()
+    return await sync_to_async(render)(request, 'store/cart.html', {'cart': cart})
@@ -1,14 +1,94 @@
 from decimal import Decimal
-from django.conf import settings
+from .cart_storage import get_cart_storage
 from .models import Product
 
+
+def to_paise(price):
+    """'49.90' (or Decimal('49.90')) -> 4990, without building a Decimal."""
+    units, _, fraction = str(price).partition('.')
+    return int(units) * 100 + int(fraction[:2].ljust(2, '0'))
+
+
+def from_paise(paise):
+    return Decimal(paise).scaleb(-2)
+
+
+class CartItem:
+    """One line of a cart snapshot. Money is kept in integer paise."""
+    
+    __slots__ = ('product', 'quantity', 'unit_paise', 'total_paise')
+    
+    def __init__(self, product, quantity, unit_paise):
+        set_ = object.__setattr__
+        set_(self, 'product', product)
+        set_(self, 'quantity', quantity)
+        set_(self, 'unit_paise', unit_paise)
+        set_(self, 'total_paise', unit_paise * quantity)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+    
+    def __repr__(self):
+        return f'<CartItem {self.quantity}x {self.product.pk} @ {self.unit_paise}>'
+    
+    @property
+    def price(self):
+        return from_paise(self.unit_paise)
+    
+    @property
+    def total_price(self):
+        return from_paise(self.total_paise)
+
+
+class CartSnapshot:
+    """
+    The cart's lines with their products and totals, built in one pass from one
+    product query. Lines whose product no longer exists are dropped.
+    """
+    
+    __slots__ = ('items', 'products', 'subtotal_paise', 'quantity')
+    
+    def __init__(self, cart, products=None):
+        if products is None:
+            products = self.products_query().in_bulk(self.product_ids(cart))
+        items = []
+        subtotal_paise = quantity = 0
+        for product_id, line in cart.items():
+            product = products.get(int(product_id))
+            if product is None:
+                continue
+            item = CartItem(product, line['quantity'], to_paise(line['price']))
+            items.append(item)
+            subtotal_paise += item.total_paise
+            quantity += item.quantity
+        self.items = tuple(items)
+        self.products = products
+        self.subtotal_paise = subtotal_paise
+        self.quantity = quantity
+    
+    @staticmethod
+    def products_query():
+        return Product.objects.select_related('category')
+    
+    @staticmethod
+    def product_ids(cart):
+        return [int(product_id) for product_id in cart]
+    
+    @classmethod
+    async def abuild(cls, cart):
+        return cls(cart, await cls.products_query().ain_bulk(cls.product_ids(cart)))
+    
+    @property
+    def subtotal(self):
+        return from_paise(self.subtotal_paise)
+
+
 class Cart:
     def __init__(self, request):
-        self.session = request.session
-        cart = self.session.get('cart')
-        if not cart:
-            cart = self.session['cart'] = {}
-        self.cart = cart
+        self.storage = get_cart_storage(request)
+        self.cart = self.storage.load()
+        self._snapshot = None
+        self._quantity = None
     
     def add(self, product, quantity=1, update_quantity=False):
         product_id = str(product.id)
@@ -21,39 +101,49 @@ class Cart:
             self.cart[product_id]['quantity'] = quantity
         else:
             self.cart[product_id]['quantity'] += quantity
-        self.save()
+        self.save(product_id)
     
-    def save(self):
-        self.session.modified = True
+    def save(self, *changed):
+        self._snapshot = self._quantity = None
+        self.storage.save(self.cart, changed)
     
     def remove(self, product):
         product_id = str(product.id)
         if product_id in self.cart:
             del self.cart[product_id]
-            self.save()
+            self.save(product_id)
+    
+    def snapshot(self):
+        if self._snapshot is None:
+            self._snapshot = CartSnapshot(self.cart)
+        return self._snapshot
+    
+    async def asnapshot(self):
+        if self._snapshot is None:
+            self._snapshot = await CartSnapshot.abuild(self.cart)
+        return self._snapshot
     
     def __iter__(self):
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
-        
-        for product in products:
-            cart[str(product.id)]['product'] = product
-        
-        for item in cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['quantity']
-            yield item
+        return iter(self.snapshot().items)
     
     def __len__(self):
-        return sum(item['quantity'] for item in self.cart.values())
+        return self.get_total_quantity()
     
     def get_total_price(self):
-        return sum(Decimal(item['price']) * item['quantity'] for item in self.cart.values())
+        return self.snapshot().subtotal
     
     def get_total_quantity(self):
-        return sum(item['quantity'] for item in self.cart.values())
+        if self._snapshot is not None:
+            return self._snapshot.quantity
+        if self._quantity is None:
+            # The header badge needs only this; don't fetch products for it.
+            quantity = self.storage.get_total_quantity()
+            if quantity is None:
+                quantity = sum(line['quantity'] for line in self.cart.values())
+            self._quantity = quantity
+        return self._quantity
     
     def clear(self):
-        del self.session['cart']
-        self.save()
+        self.cart = {}
+        self._snapshot = self._quantity = None
+        self.storage.clear()
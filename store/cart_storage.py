@@ -0,0 +1,207 @@
+"""
+Where a cart lives between requests.
+
+``Cart`` works on a plain ``{product_id: {'quantity': int, 'price': str}}``
+dict and hands it to a storage backend to load and save. The backend is
+picked by the ``STORE_CART_STORAGE`` setting for anonymous visitors and
+``STORE_CART_USER_STORAGE`` for logged-in users (dotted paths to one of the
+classes below):
+
+* ``SignedCookieCartStorage``: the cart is a compact signed cookie, so adding
+  to the cart needs no server state at all. Limited to what fits in a cookie.
+* ``SessionCartStorage``: the cart is part of the session; with
+  ``SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'`` reads come
+  from the cache and only writes reach the database.
+* ``DatabaseCartStorage``: one ``CartLine`` row per product for logged-in
+  users, so the cart follows them across devices. Only the lines that changed
+  are written, with a single upsert.
+
+When a visitor logs in, ``merge_anonymous_cart`` moves their anonymous cart
+into their user storage.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import signing
+from django.utils.module_loading import import_string
+
+from .models import CartLine
+
+CART_SESSION_KEY = 'cart'
+# Total quantity, stored next to the cart so the header badge doesn't have to
+# walk the cart on every page.
+CART_QUANTITY_SESSION_KEY = 'cart_quantity'
+
+
+class CartStorageFull(Exception):
+    """The cart doesn't fit in its storage (a cookie is at most ~4KB)."""
+
+
+class BaseCartStorage:
+    def __init__(self, request):
+        self.request = request
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self, cart, changed):
+        """Persist ``cart``; ``changed`` are the product ids that were added, updated or removed."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_total_quantity(self):
+        """The cart's total quantity if the storage keeps it, else None."""
+        return None
+
+    def fingerprint(self):
+        """Something that changes with the cart, falsy when it's empty; cheaper than loading it."""
+        quantity = self.get_total_quantity()
+        if quantity is None:
+            quantity = sum(item['quantity'] for item in self.load().values())
+        return quantity
+
+
+class SessionCartStorage(BaseCartStorage):
+    def load(self):
+        # Don't put an empty cart into the session: that would mark it
+        # modified and make every anonymous page view save a session row.
+        return self.request.session.get(CART_SESSION_KEY) or {}
+
+    def save(self, cart, changed):
+        session = self.request.session
+        session[CART_SESSION_KEY] = cart
+        session[CART_QUANTITY_SESSION_KEY] = sum(item['quantity'] for item in cart.values())
+        session.modified = True
+
+    def clear(self):
+        self.request.session.pop(CART_SESSION_KEY, None)
+        self.request.session.pop(CART_QUANTITY_SESSION_KEY, None)
+
+    def get_total_quantity(self):
+        return self.request.session.get(CART_QUANTITY_SESSION_KEY)
+
+
+class SignedCookieCartStorage(BaseCartStorage):
+    """
+    The cart as ``id:quantity:price|id:quantity:price...``, signed so it
+    can't be tampered with. ``CartCookieMiddleware`` writes it to the
+    response.
+    """
+
+    salt = 'store.cart'
+    # Browsers drop cookies over 4096 bytes (name and attributes included).
+    max_bytes = 3800
+
+    @property
+    def cookie_name(self):
+        return getattr(settings, 'STORE_CART_COOKIE_NAME', 'cart')
+
+    def load(self):
+        pending = getattr(self.request, 'cart_cookie', None)
+        if pending is not None:
+            value = pending
+        else:
+            value = self.request.get_signed_cookie(
+                self.cookie_name, default='', salt=self.salt,
+                max_age=getattr(settings, 'STORE_CART_COOKIE_AGE', settings.SESSION_COOKIE_AGE),
+            )
+        return self.decode(value)
+
+    def save(self, cart, changed):
+        value = self.encode(cart)
+        if len(signing.get_cookie_signer(salt=self.cookie_name + self.salt).sign(value)) > self.max_bytes:
+            raise CartStorageFull('The cart is too large to store in a cookie.')
+        self.request.cart_cookie = value
+
+    def clear(self):
+        self.request.cart_cookie = ''
+
+    def fingerprint(self):
+        # The signed value as it is: no need to verify and decode it.
+        pending = getattr(self.request, 'cart_cookie', None)
+        return pending if pending is not None else self.request.COOKIES.get(self.cookie_name, '')
+
+    @staticmethod
+    def encode(cart):
+        return '|'.join(f'{product_id}:{item["quantity"]}:{item["price"]}' for product_id, item in cart.items())
+
+    @staticmethod
+    def decode(value):
+        cart = {}
+        for line in value.split('|') if value else ():
+            product_id, quantity, price = line.split(':')
+            cart[product_id] = {'quantity': int(quantity), 'price': price}
+        return cart
+
+
+class DatabaseCartStorage(BaseCartStorage):
+    def load(self):
+        # The view and the header badge both build a Cart; read the rows once.
+        cart = getattr(self.request, '_cart_lines', None)
+        if cart is None:
+            lines = CartLine.objects.filter(user=self.request.user).values_list('product_id', 'quantity', 'price')
+            cart = self.request._cart_lines = {
+                str(product_id): {'quantity': quantity, 'price': str(price)}
+                for product_id, quantity, price in lines
+            }
+        return cart
+
+    def save(self, cart, changed):
+        user = self.request.user
+        lines = [
+            CartLine(user=user, product_id=int(product_id), quantity=cart[product_id]['quantity'],
+                     price=cart[product_id]['price'])
+            for product_id in changed if product_id in cart
+        ]
+        removed = [int(product_id) for product_id in changed if product_id not in cart]
+        if lines:
+            CartLine.objects.bulk_create(
+                lines, update_conflicts=True, unique_fields=['user', 'product'],
+                update_fields=['quantity', 'price', 'updated_at'],
+            )
+        if removed:
+            CartLine.objects.filter(user=user, product_id__in=removed).delete()
+        self.request._cart_lines = cart
+
+    def clear(self):
+        CartLine.objects.filter(user=self.request.user).delete()
+        self.request._cart_lines = {}
+
+
+@lru_cache(maxsize=None)
+def _storage_class(path):
+    return import_string(path)
+
+
+def get_cart_storage(request, authenticated=None):
+    if authenticated is None:
+        user = getattr(request, 'user', None)
+        authenticated = user is not None and user.is_authenticated
+    if authenticated:
+        path = getattr(settings, 'STORE_CART_USER_STORAGE', 'store.cart_storage.SessionCartStorage')
+    else:
+        path = getattr(settings, 'STORE_CART_STORAGE', 'store.cart_storage.SessionCartStorage')
+    return _storage_class(path)(request)
+
+
+def merge_anonymous_cart(request, user):
+    """Move the cart a visitor built before logging in into their user storage."""
+    anonymous = get_cart_storage(request, authenticated=False)
+    persistent = get_cart_storage(request, authenticated=True)
+    if type(anonymous) is type(persistent):
+        # Same place before and after login (login() keeps session data).
+        return
+
+    incoming = anonymous.load()
+    if not incoming:
+        return
+    cart = persistent.load()
+    for product_id, item in incoming.items():
+        if product_id in cart:
+            cart[product_id]['quantity'] += item['quantity']
+        else:
+            cart[product_id] = item
+    persistent.save(cart, changed=list(incoming))
+    anonymous.clear()
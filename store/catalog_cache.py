@@ -0,0 +1,218 @@
+"""
+Versioned cache for catalog data that is the same for every visitor: the
+category list, the featured products on the home page and the first page of
+each category listing.
+
+Every key embeds a generation number. Any change to a product or category
+(or a checkout, which changes stock) bumps the generation, so all catalog
+entries are invalidated at once without having to know their keys; the
+orphaned entries are never read again and age out through the cache's own
+eviction (LRU for the local-memory backend, culling for the file backend)
+or ``STORE_CATALOG_CACHE_TIMEOUT``.
+
+Rendered product cards (``render_cards``) are cached differently: each
+card's key holds its product's ``updated_at``, so editing or selling one
+product only re-renders that product's card.
+
+Lookups used by the async storefront views (store/async_views.py, served
+under ASGI) have async twins: ``acached`` and the ``a``-prefixed functions.
+
+Hit/miss counters are kept per process; see ``stats()``.
+"""
+import hashlib
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.middleware.csrf import get_token
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .models import Category
+from .pagination import KeysetPage
+
+GENERATION_KEY = 'catalog:generation'
+FEATURED_COUNT = 6
+CARD_TEMPLATE = 'store/product_card.html'
+# Cards are cached with this in place of the CSRF token of the add-to-cart
+# form; each visitor's own token is put in when the page is assembled.
+CARD_CSRF_PLACEHOLDER = 'product-card-csrf-token'
+
+_missing = object()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def get_cache():
+    return caches[getattr(settings, 'STORE_CATALOG_CACHE', 'default')]
+
+
+def generation():
+    cache = get_cache()
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # Start from the clock rather than 1 so that a generation key lost to
+        # eviction can never bring back entries from an older generation.
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+async def ageneration():
+    cache = get_cache()
+    value = await cache.aget(GENERATION_KEY)
+    if value is None:
+        await cache.aadd(GENERATION_KEY, time.time_ns(), timeout=None)
+        value = await cache.aget(GENERATION_KEY)
+    return value
+
+
+def invalidate():
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def cached(kind, name, build):
+    cache = get_cache()
+    key = f'catalog:{generation()}:{kind}:{name}'
+    value = cache.get(key, _missing)
+    if value is _missing:
+        _stats[kind]['misses'] += 1
+        value = build()
+        cache.set(key, value, getattr(settings, 'STORE_CATALOG_CACHE_TIMEOUT', 300))
+    else:
+        _stats[kind]['hits'] += 1
+    return value
+
+
+async def acached(kind, name, build):
+    """``cached`` for async callers; ``build`` returns an awaitable."""
+    cache = get_cache()
+    key = f'catalog:{await ageneration()}:{kind}:{name}'
+    value = await cache.aget(key, _missing)
+    if value is _missing:
+        _stats[kind]['misses'] += 1
+        value = await build()
+        await cache.aset(key, value, getattr(settings, 'STORE_CATALOG_CACHE_TIMEOUT', 300))
+    else:
+        _stats[kind]['hits'] += 1
+    return value
+
+
+def stats():
+    return {kind: dict(counts) for kind, counts in _stats.items()}
+
+
+def reset_stats():
+    _stats.clear()
+
+
+def categories():
+    """All categories, annotated with ``product_count``."""
+    return cached(
+        'categories', 'all',
+        lambda: list(Category.objects.annotate(product_count=Count('products'))),
+    )
+
+
+async def acategories():
+    async def build():
+        return [category async for category in Category.objects.annotate(product_count=Count('products'))]
+
+    return await acached('categories', 'all', build)
+
+
+def featured_products(queryset):
+    return cached('featured', 'home', lambda: list(queryset[:FEATURED_COUNT]))
+
+
+async def afeatured_products(queryset):
+    async def build():
+        return [product async for product in queryset[:FEATURED_COUNT]]
+
+    return await acached('featured', 'home', build)
+
+
+def listing_version(queryset, name):
+    """
+    ``(newest updated_at, row count)`` of a listing's queryset, the content
+    version behind its ``ETag``. The count catches deletions, which leave
+    the newest ``updated_at`` alone.
+    """
+    def build():
+        version = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        return version['last_modified'], version['count']
+
+    return cached('listing_version', name, build)
+
+
+async def alisting_version(queryset, name):
+    async def build():
+        version = await queryset.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('id'))
+        return version['last_modified'], version['count']
+
+    return await acached('listing_version', name, build)
+
+
+def first_page(paginator, name):
+    """
+    The first page of ``paginator`` (an unfiltered or single-category catalog
+    listing), with its count, from the cache.
+    """
+    def build():
+        page = paginator.get_page()
+        count = paginator.count if paginator.count_limit else None
+        return page.object_list, page.has_next, count
+
+    object_list, has_next, count = cached('first_page', name, build)
+    if count is not None:
+        paginator.count = count
+    return KeysetPage(paginator, object_list, has_next=has_next, has_previous=False)
+
+
+def card_key(template_name, product):
+    # The category name is on the card too, and renaming a category doesn't
+    # touch its products. STORE_PAGE_VERSION retires cards on deploy.
+    category = hashlib.blake2b(product.category.name.encode(), digest_size=4).hexdigest()
+    return 'card:{}:{}:{}:{}:{}'.format(
+        getattr(settings, 'STORE_PAGE_VERSION', ''), template_name, product.pk,
+        product.updated_at.timestamp(), category,
+    )
+
+
+def render_cards(request, products, template_name=CARD_TEMPLATE):
+    """
+    ``template_name`` rendered for each of ``products`` (which need
+    ``updated_at`` and ``category`` loaded), as a list of safe strings.
+    Cached cards are fetched with one ``get_many``; only the missing ones are
+    rendered, and stored with one ``set_many``.
+    """
+    cache = get_cache()
+    products = list(products)
+    keys = [card_key(template_name, product) for product in products]
+    cards = cache.get_many(keys)
+    missing = {key: product for key, product in zip(keys, products) if key not in cards}
+    _stats['cards']['hits'] += len(keys) - len(missing)
+    _stats['cards']['misses'] += len(missing)
+    if missing:
+        template = get_template(template_name)
+        rendered = {
+            key: template.render({'product': product, 'csrf_token': CARD_CSRF_PLACEHOLDER})
+            for key, product in missing.items()
+        }
+        cache.set_many(rendered, getattr(settings, 'STORE_CARD_CACHE_TIMEOUT', 60 * 60 * 24))
+        cards.update(rendered)
+
+    token = None
+    html = []
+    for key in keys:
+        card = cards[key]
+        if CARD_CSRF_PLACEHOLDER in card:
+            token = token or get_token(request)
+            card = card.replace(CARD_CSRF_PLACEHOLDER, token)
+        html.append(mark_safe(card))
+    return html
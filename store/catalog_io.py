@@ -0,0 +1,221 @@
+"""
+Bulk product import and export as CSV or JSON Lines.
+
+Both directions stream: ``import_products`` reads one row at a time,
+validates rows in chunks of ``chunk_size`` and writes each chunk with a
+single upsert keyed on ``slug`` (``bulk_create(update_conflicts=True)``);
+``export_rows`` reads products with ``.iterator(chunk_size=...)``. Memory use
+depends on the chunk size, not on the file size.
+
+Columns (``FIELDS``): slug, name, description, price, stock, category,
+condition, rarity. ``category`` is a category slug or name. Existing
+products are updated in place (``created_at`` is kept); products missing
+from the file are left alone.
+
+Used by ``python manage.py import_products`` / ``export_products`` and the
+staff import/export views.
+"""
+import codecs
+import csv
+import io
+import json
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import catalog_cache, typeahead
+from .models import Category, Product
+
+FIELDS = ['slug', 'name', 'description', 'price', 'stock', 'category', 'condition', 'rarity']
+UPDATE_FIELDS = ['name', 'description', 'price', 'stock', 'category', 'condition', 'rarity', 'updated_at']
+FORMATS = ('csv', 'jsonl')
+# Errors kept for the report; the rest are only counted.
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportFormatError(ValueError):
+    """The file can't be read at all (as opposed to individual bad rows)."""
+
+
+class ProductRowForm(forms.Form):
+    """Validation for one imported row, with the model's own field rules."""
+    slug = forms.SlugField(max_length=200)
+    name = forms.CharField(max_length=200)
+    description = forms.CharField(required=False)
+    price = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    stock = forms.IntegerField(min_value=0)
+    category = forms.CharField(max_length=200)
+    condition = forms.ChoiceField(choices=Product.CONDITION_CHOICES, required=False)
+    rarity = forms.ChoiceField(choices=Product.RARITY_CHOICES, required=False)
+
+
+def clean_row(row):
+    """
+    ``(cleaned data, errors)`` for one row. The fields of ``ProductRowForm``
+    are used directly: building a form per row deep-copies every field,
+    which costs as much as the rest of the import.
+    """
+    data, errors = {}, {}
+    for name, field in ProductRowForm.base_fields.items():
+        try:
+            data[name] = field.clean(row.get(name))
+        except ValidationError as error:
+            errors[name] = error.messages
+    return data, errors
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def error(self, line, slug, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'slug': slug, 'errors': errors})
+
+    @property
+    def errors_truncated(self):
+        return self.failed > len(self.errors)
+
+    def as_dict(self):
+        return {
+            'rows': self.rows, 'created': self.created, 'updated': self.updated,
+            'failed': self.failed, 'errors': self.errors,
+        }
+
+
+def guess_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(binary_file, format):
+    """``(line number, dict)`` for each row of a binary file, read lazily."""
+    lines = codecs.iterdecode(binary_file, 'utf-8-sig')
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        if reader.fieldnames is None or 'slug' not in reader.fieldnames:
+            raise ImportFormatError('The CSV file needs a header row with at least a "slug" column.')
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                yield number, error
+                continue
+            yield number, row
+    else:
+        raise ImportFormatError(f'Unknown format {format!r}; use one of {", ".join(FORMATS)}.')
+
+
+class CategoryResolver:
+    """Category slug or name -> Category, from one query for the whole import."""
+
+    def __init__(self, create=False):
+        self.create = create
+        self.lookup = {}
+        for category in Category.objects.all():
+            self.lookup[category.slug] = category
+            self.lookup.setdefault(category.name.casefold(), category)
+
+    def __call__(self, value):
+        key = value.strip()
+        category = self.lookup.get(key) or self.lookup.get(key.casefold())
+        if category is None and self.create:
+            category, _ = Category.objects.get_or_create(slug=slugify(key), defaults={'name': key})
+            self.lookup[category.slug] = self.lookup[key.casefold()] = category
+        return category
+
+
+def import_products(binary_file, format='csv', chunk_size=1000, create_categories=False, progress=None):
+    """
+    Upsert products from ``binary_file`` and return an ``ImportResult``.
+    ``progress(result)`` is called after each chunk. Each chunk is committed
+    on its own, so a failure part-way keeps the chunks before it.
+    """
+    result = ImportResult()
+    resolve_category = CategoryResolver(create=create_categories)
+    chunk = {}
+    for line, row in read_rows(binary_file, format):
+        result.rows += 1
+        if not isinstance(row, dict):
+            result.error(line, None, {'__all__': [f'Not a JSON object: {row}']})
+            continue
+        data, errors = clean_row(row)
+        if errors:
+            result.error(line, row.get('slug'), errors)
+            continue
+        category = resolve_category(data['category'])
+        if category is None:
+            result.error(line, data['slug'], {'category': [f'Unknown category "{data["category"]}".']})
+            continue
+        # A slug repeated within a chunk: the later row wins, as it would across chunks.
+        chunk[data['slug']] = Product(
+            slug=data['slug'], name=data['name'], description=data['description'],
+            price=data['price'], stock=data['stock'], category=category,
+            condition=data['condition'] or 'new', rarity=data['rarity'],
+        )
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, result)
+            chunk = {}
+            if progress:
+                progress(result)
+    if chunk:
+        _write_chunk(chunk, result)
+    if progress:
+        progress(result)
+    if result.created or result.updated:
+        catalog_cache.invalidate()
+        typeahead.reset()
+    return result
+
+
+def _write_chunk(chunk, result):
+    with transaction.atomic():
+        existing = set(Product.objects.filter(slug__in=list(chunk)).values_list('slug', flat=True))
+        Product.objects.bulk_create(
+            list(chunk.values()), update_conflicts=True, unique_fields=['slug'], update_fields=UPDATE_FIELDS,
+        )
+    result.updated += len(existing)
+    result.created += len(chunk) - len(existing)
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """One dict per product, in ``FIELDS`` order, read in chunks from the database."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    rows = queryset.order_by('pk').values_list(
+        'slug', 'name', 'description', 'price', 'stock', 'category__slug', 'condition', 'rarity',
+    )
+    for values in rows.iterator(chunk_size=chunk_size):
+        row = dict(zip(FIELDS, values))
+        row['price'] = str(row['price'])
+        yield row
+
+
+def serialize(rows, format):
+    """Encode ``rows`` as CSV (with a header) or JSON Lines, one ``str`` chunk per row."""
+    if format == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_filename(format):
+    return f'products-{timezone.now():%Y%m%d-%H%M%S}.{format}'
@@ -0,0 +1,88 @@
+"""
+Order placement.
+
+``place_order`` writes an order, its items and the stock decrements as one
+transaction with a fixed number of queries, whatever the size of the cart:
+
+1. INSERT the order, with its totals already filled in,
+2. one conditional ``UPDATE ... SET stock = stock - CASE ... WHERE stock >= CASE ...``
+   over every product in the cart,
+3. one bulk INSERT of the order items,
+4. for an order awaiting payment, one bulk INSERT of its stock holds, which
+   give the units back if payment doesn't come in time (store/reservations.py).
+
+If the UPDATE touches fewer rows than there are products, somebody else got
+there first: the transaction is rolled back and ``StockConflict`` says which
+products are short. Because the stock check and the decrement are the same
+statement, concurrent checkouts can never oversell.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from . import catalog_cache, reservations
+from .models import OrderItem, Product
+
+
+class StockConflict(Exception):
+    def __init__(self, shortages):
+        # [(product name, requested quantity, available quantity), ...]
+        self.shortages = shortages
+        super().__init__(', '.join(f'{name} ({available} left)' for name, _, available in shortages))
+
+
+def place_order(order, lines):
+    """
+    Save ``order`` with ``lines``, an iterable of ``(product, quantity, price)``.
+    Raises ``StockConflict`` (and writes nothing) if any product is short.
+    """
+    quantities = {}
+    prices = {}
+    for product, quantity, price in lines:
+        quantities[product.id] = quantity
+        prices[product.id] = price
+
+    quantity_case = Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+    order.set_totals([(quantities[product_id], prices[product_id]) for product_id in quantities])
+
+    with transaction.atomic():
+        order.save()
+        updated = Product.objects.filter(
+            pk__in=quantities, stock__gte=quantity_case,
+        ).update(stock=F('stock') - quantity_case, updated_at=timezone.now())
+
+        if updated == len(quantities):
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id, quantity=quantity, price_at_time=prices[product_id])
+                for product_id, quantity in quantities.items()
+            ])
+            if order.status == 'payment_pending':
+                reservations.hold(order, quantities)
+            # Stock levels changed, and sold-out products drop out of listings.
+            transaction.on_commit(catalog_cache.invalidate)
+        else:
+            transaction.set_rollback(True)
+
+    if updated != len(quantities):
+        # Look at stock after the rollback so the decrements we did manage
+        # to apply don't show up as shortages.
+        order.id = None
+        raise StockConflict(_shortages(quantities))
+    return order
+
+
+def _shortages(quantities):
+    stock = {
+        pk: (name, available)
+        for pk, name, available in Product.objects.filter(pk__in=quantities).values_list('pk', 'name', 'stock')
+    }
+    shortages = []
+    for product_id, quantity in quantities.items():
+        name, available = stock.get(product_id, ('Removed product', 0))
+        if available < quantity:
+            shortages.append((name, quantity, available))
+    return shortages
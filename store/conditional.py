@@ -0,0 +1,100 @@
+"""
+Conditional GET for storefront pages.
+
+A page is identified by a content version (a product's ``updated_at``, or
+the newest ``updated_at`` and row count behind a listing) plus everything
+on it that belongs to the visitor: who is logged in, their cart and the
+CSRF secret that the page's forms were rendered with. All of it goes into
+the ``ETag``, so a browser holding a page gets ``304 Not Modified`` only
+while both the catalog data and its own state are unchanged. None of it
+costs a query or a new cookie: the cart comes from its storage's
+fingerprint, and the CSRF secret from the visitor's existing cookie.
+
+``Last-Modified`` can't express the per-visitor part, so it is only sent
+for anonymous visitors with an empty cart. Pages are never answered with
+a 304 while flash messages are waiting to be shown, and pages that show
+messages get no validators.
+
+Responses carry ``Cache-Control: private, no-cache``: browsers keep the
+page, but revalidate it on every use.
+"""
+import calendar
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .cart_storage import get_cart_storage
+
+
+def visitor_state(request):
+    """The parts of a page that differ between visitors, or None if there are none."""
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    cart = get_cart_storage(request).fingerprint()
+    if user_id is None and not cart:
+        return None
+    return (user_id, cart)
+
+
+def csrf_secret(request):
+    """
+    The CSRF secret from the visitor's cookie, if they have one. It isn't
+    minted here: ``get_token`` would set the cookie on every response, 304s
+    included. A page that mints one while rendering its forms gets its
+    validators afterwards (see ``conditional_page``).
+    """
+    return request.META.get('CSRF_COOKIE', '')
+
+
+def page_validators(request, *content, last_modified=None):
+    """``(etag, last_modified)`` for a page built from ``content`` (any reprs)."""
+    state = visitor_state(request)
+    key = repr((
+        getattr(settings, 'STORE_PAGE_VERSION', ''),
+        request.get_full_path(),
+        content,
+        state,
+        csrf_secret(request),
+    ))
+    etag = '"%s"' % hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    if state is not None:
+        last_modified = None
+    return etag, last_modified
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def conditional_page(request, render_page, *content, last_modified=None):
+    """
+    Answer with 304 if the browser's copy of the page built from ``content``
+    is current; otherwise call ``render_page()`` and add validators to it.
+    """
+    if len(messages.get_messages(request)):
+        # This rendering shows one-off messages; it must not be reused.
+        return render_page()
+
+    secret = csrf_secret(request)
+    etag, modified = page_validators(request, *content, last_modified=last_modified)
+    validators = set_validators(HttpResponse(), etag, modified)
+    response = get_conditional_response(
+        request, etag=etag, response=validators,
+        last_modified=calendar.timegm(modified.utctimetuple()) if modified else None,
+    )
+    if response is validators:
+        response = render_page()
+        if csrf_secret(request) != secret:
+            # A first visit: match the secret the browser gets with the page.
+            etag, modified = page_validators(request, *content, last_modified=last_modified)
+        response = set_validators(response, etag, modified)
+    return response
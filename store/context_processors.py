@@ -1,8 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
 from .cart import Cart
 
 def cart_context(request):
-    cart = Cart(request)
+    # Nothing here touches the session until a template actually uses it.
+    cart = SimpleLazyObject(lambda: Cart(request))
     return {
         'cart': cart,
-        'cart_total_quantity': cart.get_total_quantity(),
+        'cart_total_quantity': lambda: cart.get_total_quantity(),
     }
@@ -0,0 +1,163 @@
+"""
+Data behind the staff dashboard: header KPIs and the filtered, sorted
+product and order tables.
+
+The KPIs are read-only and come from one query: a conditional aggregate
+over the daily rollups (store/rollups.py) for the sales figures, which
+costs the same however many orders there are, with the live counts
+(today's orders, payments awaiting verification, low stock, units on
+hold) as indexed scalar subqueries beside it. The rollups are kept up to
+date by ``python manage.py rollup_sales`` from cron, never by a page view;
+the KPIs say how current they are (``sales_as_of``). Best sellers take a
+second query. All of it is cached for ``STORE_DASHBOARD_KPI_TIMEOUT``
+seconds.
+
+The tables are keyset-paginated, so every page costs one query whatever
+the table size.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DateTimeField, F, Func, IntegerField, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import reservations, rollups
+from .models import DailySales, Order, Product, RollupWatermark
+
+KPI_CACHE_KEY = 'dashboard:kpis'
+REVENUE_WINDOWS = {'today': 0, '7d': 6, '30d': 29}
+
+# Sort choices: label and keyset ordering (ending in a unique field).
+PRODUCT_SORTS = {
+    'newest': ('Newest', ['-created_at', '-id']),
+    'name': ('Name A-Z', ['name', 'id']),
+    'price': ('Price: low to high', ['price', 'id']),
+    '-price': ('Price: high to low', ['-price', '-id']),
+    'stock': ('Stock: lowest first', ['stock', 'id']),
+}
+ORDER_SORTS = {
+    'newest': ('Newest', ['-created_at', '-id']),
+    'oldest': ('Oldest', ['created_at', 'id']),
+    '-total': ('Total: high to low', ['-total', '-id']),
+}
+
+
+def low_stock_threshold():
+    return getattr(settings, 'STORE_LOW_STOCK_THRESHOLD', 5)
+
+
+class Scalar(Subquery):
+    """
+    A subquery giving one value, which ``aggregate()`` takes beside the
+    aggregates. It doesn't depend on the outer rows, so it is evaluated once.
+    """
+
+    contains_aggregate = True
+
+
+def scalar_count(queryset):
+    return Scalar(queryset.order_by().values(count=Func(F('pk'), function='COUNT')), output_field=IntegerField())
+
+
+def compute_kpis():
+    now = timezone.now()
+    today = timezone.localdate()
+    booked = Q(status__in=rollups.REVENUE_STATUSES)
+    aggregates = {
+        f'revenue_{name}': Sum('revenue', filter=booked & Q(date__gte=today - timedelta(days=days)))
+        for name, days in REVENUE_WINDOWS.items()
+    }
+    aggregates.update({
+        f'status_{value}': Sum('orders', filter=Q(status=value)) for value, _ in Order.STATUS_CHOICES
+    })
+    held = reservations.current_holds(now).order_by()
+    # Each live count is answered from an index.
+    row = DailySales.objects.aggregate(
+        orders_today=scalar_count(Order.objects.filter(created_at__gte=rollups.day_start(today))),
+        awaiting_verification=scalar_count(Order.objects.filter(payment_status='awaiting_verification')),
+        # Sold-out products aren't low: the same filter as the card's link, ?p-stock=low.
+        low_stock=scalar_count(Product.objects.filter(stock__gt=0, stock__lte=low_stock_threshold())),
+        units_on_hold=Scalar(
+            held.values(units=Coalesce(Func(F('quantity'), function='SUM'), Value(0))), output_field=IntegerField(),
+        ),
+        sales_as_of=Scalar(
+            RollupWatermark.objects.filter(name=rollups.WATERMARK).values('value'), output_field=DateTimeField(),
+        ),
+        **aggregates,
+    )
+    return {
+        'revenue': {name: row[f'revenue_{name}'] or 0 for name in REVENUE_WINDOWS},
+        'orders_today': row['orders_today'],
+        'status_counts': [
+            (value, label, row[f'status_{value}'] or 0) for value, label in Order.STATUS_CHOICES
+        ],
+        'best_sellers': rollups.best_sellers(today - timedelta(days=29), today),
+        'awaiting_verification': row['awaiting_verification'],
+        'low_stock': row['low_stock'],
+        'low_stock_threshold': low_stock_threshold(),
+        'units_on_hold': row['units_on_hold'],
+        'sales_as_of': row['sales_as_of'],
+        'computed_at': now,
+    }
+
+
+def kpis():
+    value = cache.get(KPI_CACHE_KEY)
+    if value is None:
+        value = compute_kpis()
+        cache.set(KPI_CACHE_KEY, value, getattr(settings, 'STORE_DASHBOARD_KPI_TIMEOUT', 60))
+    return value
+
+
+def invalidate_kpis():
+    cache.delete(KPI_CACHE_KEY)
+
+
+def filter_products(data):
+    """Products queryset and keyset ordering for the dashboard filter form's cleaned data."""
+    products = Product.objects.select_related('category').defer('description', 'search_vector')
+    if data.get('q'):
+        products = products.filter(Q(name__icontains=data['q']) | Q(slug__icontains=data['q']))
+    if data.get('category'):
+        products = products.filter(category=data['category'])
+    stock = data.get('stock')
+    if stock == 'low':
+        products = products.filter(stock__gt=0, stock__lte=low_stock_threshold())
+    elif stock == 'out':
+        products = products.filter(stock=0)
+    elif stock == 'in':
+        products = products.filter(stock__gt=0)
+    return products, PRODUCT_SORTS[data.get('sort') or 'newest'][1]
+
+
+def filter_orders(data):
+    """Orders queryset and keyset ordering for the dashboard filter form's cleaned data."""
+    orders = Order.objects.all()
+    query = data.get('q')
+    if query:
+        match = Q(full_name__icontains=query) | Q(email__icontains=query) | Q(phone__contains=query)
+        if query.lstrip('#').isdigit():
+            match |= Q(id=int(query.lstrip('#')))
+        orders = orders.filter(match)
+    if data.get('status'):
+        orders = orders.filter(status=data['status'])
+    if data.get('payment_status'):
+        orders = orders.filter(payment_status=data['payment_status'])
+    return orders, ORDER_SORTS[data.get('sort') or 'newest'][1]
+
+
+def other_params(params, prefix):
+    """``(name, value)`` pairs of ``params`` that belong to the other table's filters."""
+    return [
+        (name, value) for name, values in params.lists() if not name.startswith(f'{prefix}-')
+        for value in values
+    ]
+
+
+def query_without(params, *names):
+    params = params.copy()
+    for name in names:
+        params.pop(name, None)
+    return params.urlencode()
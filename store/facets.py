@@ -0,0 +1,140 @@
+"""
+Faceted filtering for the product listing: category, condition, rarity
+and price range, each multi-select.
+
+Values within a facet are ORed and facets are ANDed. Each option shows how
+many products it would give combined with the other facets' selections,
+which is what a shopper gets by ticking it. Every count of every facet
+comes out of one aggregate query with a conditional ``Count`` per option.
+A covering index (``product_facets_idx``) lets that query read the index
+alone.
+
+Counts are cached through ``catalog_cache`` under a normalized signature
+of the selection and search text, so they are dropped with the rest of
+the catalog cache on any product change. The same combination in any
+parameter order or repetition shares one entry.
+"""
+import hashlib
+from decimal import Decimal
+
+from django.db.models import Count, Q
+
+from . import catalog_cache
+from .models import Product
+
+FACETS = ('category', 'condition', 'rarity', 'price')
+TITLES = {'category': 'Categories', 'condition': 'Condition', 'rarity': 'Rarity', 'price': 'Price'}
+# (value, label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = [
+    ('under-500', 'Under ₹500', None, Decimal('500')),
+    ('500-1000', '₹500 to ₹1,000', Decimal('500'), Decimal('1000')),
+    ('1000-2500', '₹1,000 to ₹2,500', Decimal('1000'), Decimal('2500')),
+    ('2500-5000', '₹2,500 to ₹5,000', Decimal('2500'), Decimal('5000')),
+    ('5000-plus', '₹5,000 and above', Decimal('5000'), None),
+]
+_PRICE_RANGES = {value: (low, high) for value, _, low, high in PRICE_BUCKETS}
+
+
+class FacetSelection:
+    """The facet values picked in ``params`` (a QueryDict), against the known ``categories``."""
+
+    def __init__(self, params, categories):
+        self.category_ids = {category.slug: category.pk for category in categories}
+        self.options = {
+            'category': [(category.slug, category.name) for category in categories],
+            'condition': list(Product.CONDITION_CHOICES),
+            'rarity': list(Product.RARITY_CHOICES),
+            'price': [(value, label) for value, label, _, _ in PRICE_BUCKETS],
+        }
+        self.selected = {}
+        for facet in FACETS:
+            requested = set(params.getlist(facet))
+            # Option order, so the same choice always has the same signature.
+            self.selected[facet] = tuple(value for value, _ in self.options[facet] if value in requested)
+        self.unknown_categories = set(params.getlist('category')) - set(self.category_ids)
+
+    def __bool__(self):
+        return any(self.selected.values())
+
+    @property
+    def signature(self):
+        return '&'.join(f'{facet}={",".join(values)}' for facet, values in self.selected.items() if values)
+
+    @property
+    def single_category(self):
+        categories = self.selected['category']
+        return categories[0] if len(categories) == 1 else None
+
+    def value_q(self, facet, value):
+        if facet == 'category':
+            return Q(category_id=self.category_ids[value])
+        if facet == 'price':
+            low, high = _PRICE_RANGES[value]
+            bounds = {}
+            if low is not None:
+                bounds['price__gte'] = low
+            if high is not None:
+                bounds['price__lt'] = high
+            return Q(**bounds)
+        return Q(**{facet: value})
+
+    def q(self, exclude=None):
+        """The selection as a filter, optionally leaving one facet out."""
+        condition = Q()
+        for facet, values in self.selected.items():
+            if values and facet != exclude:
+                condition &= Q(*[self.value_q(facet, value) for value in values], _connector=Q.OR)
+        return condition
+
+    def count_aggregates(self):
+        aggregates = {}
+        for facet in FACETS:
+            others = self.q(exclude=facet)
+            for n, (value, _) in enumerate(self.options[facet]):
+                aggregates[f'{facet}_{n}'] = Count('id', filter=self.value_q(facet, value) & others)
+        return aggregates
+
+    def groups(self, counts):
+        """What the sidebar shows: per facet, each option with its count and whether it's ticked."""
+        return [
+            {
+                'name': facet,
+                'title': TITLES[facet],
+                'options': [
+                    {
+                        'value': value, 'label': label, 'count': counts.get(f'{facet}_{n}', 0),
+                        'selected': value in self.selected[facet],
+                    }
+                    for n, (value, label) in enumerate(self.options[facet])
+                ],
+            }
+            for facet in FACETS
+        ]
+
+
+def cache_name(selection, search_query):
+    """
+    Cache name for what a listing with ``selection`` and ``search_query``
+    depends on, whatever the order, repetition or other parameters of its URL.
+    """
+    search = ' '.join((search_query or '').lower().split())
+    key = f'{selection.signature}|{search}|{",".join(map(str, selection.category_ids.values()))}'
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def counts(queryset, selection, search_query=None):
+    """
+    Facet counts over ``queryset`` (the listing before facet filters), keyed
+    ``<facet>_<option index>``.
+    """
+    def build():
+        return queryset.order_by().aggregate(**selection.count_aggregates())
+
+    return catalog_cache.cached('facets', cache_name(selection, search_query), build)
+
+
+async def acounts(queryset, selection, search_query=None):
+    async def build():
+        return await queryset.order_by().aaggregate(**selection.count_aggregates())
+
+    return await catalog_cache.acached('facets', cache_name(selection, search_query), build)
@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
-from .models import Order, Product
+from .dashboard import ORDER_SORTS, PRODUCT_SORTS
+from .models import Category, Order, Product
 
 class SignUpForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -47,3 +48,52 @@ class ProductForm(forms.ModelForm):
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
         }
+
+class ProductImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV with a header row, or JSON Lines (.jsonl).')
+    format = forms.ChoiceField(
+        choices=[('', 'From file name'), ('csv', 'CSV'), ('jsonl', 'JSON Lines')],
+        required=False,
+    )
+    create_categories = forms.BooleanField(
+        required=False, label='Create missing categories',
+    )
+
+class DashboardProductFilterForm(forms.Form):
+    prefix = 'p'
+    
+    q = forms.CharField(required=False, widget=forms.TextInput(attrs={'placeholder': 'Name or slug'}))
+    category = forms.ModelChoiceField(
+        Category.objects.all(), to_field_name='slug', required=False, empty_label='All categories',
+    )
+    stock = forms.ChoiceField(
+        choices=[('', 'Any stock'), ('in', 'In stock'), ('low', 'Low stock'), ('out', 'Out of stock')],
+        required=False,
+    )
+    sort = forms.ChoiceField(choices=[(key, label) for key, (label, _) in PRODUCT_SORTS.items()], required=False)
+
+class DashboardOrderFilterForm(forms.Form):
+    prefix = 'o'
+    
+    q = forms.CharField(required=False, widget=forms.TextInput(attrs={'placeholder': 'Order #, name, email or phone'}))
+    status = forms.ChoiceField(choices=[('', 'Any status')] + Order.STATUS_CHOICES, required=False)
+    payment_status = forms.ChoiceField(
+        choices=[('', 'Any payment')] + Order.PAYMENT_STATUS_CHOICES, required=False,
+    )
+    sort = forms.ChoiceField(choices=[(key, label) for key, (label, _) in ORDER_SORTS.items()], required=False)
+
+class OrderExportForm(forms.Form):
+    date_from = forms.DateField(required=False, label='From', widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, label='To', widget=forms.DateInput(attrs={'type': 'date'}))
+    status = forms.MultipleChoiceField(
+        choices=Order.STATUS_CHOICES, required=False, widget=forms.CheckboxSelectMultiple,
+        help_text='Leave empty for every status.',
+    )
+    format = forms.ChoiceField(choices=[('csv', 'CSV (one row per item)'), ('jsonl', 'JSON Lines (one order per line)')])
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('The start date is after the end date.')
+        return cleaned_data
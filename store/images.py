@@ -0,0 +1,132 @@
+"""
+Resized copies of product images.
+
+When a product's image changes, ``process_product_image`` writes fixed-width
+derivatives (``SIZES``) in WebP with a JPEG fallback, through the image
+field's storage (``MEDIA_ROOT`` locally, Cloudinary in production). EXIF, ICC
+and other metadata are not copied over. The names end up in
+``Product.image_variants``:
+
+    {'source': 'products/a.jpg',
+     'card': {'width': 400, 'height': 533, 'webp': '...', 'jpeg': '...'},
+     'detail': {...}, 'zoom': {...}}
+
+which the templates turn into ``srcset``s. Images narrower than a size are
+not upscaled; that size reuses the original width.
+
+``python manage.py build_image_derivatives`` backfills existing products.
+"""
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name -> width in pixels
+SIZES = {'card': 400, 'detail': 800, 'zoom': 1600}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def image_storage():
+    from .models import Product
+    return Product._meta.get_field('image').storage
+
+
+def derivative_name(source_name, size, extension):
+    directory, filename = posixpath.split(source_name)
+    stem = filename.replace('.', '-')
+    return posixpath.join(directory, 'derived', f'{stem}-{size}.{extension}')
+
+
+def _flatten(image):
+    """RGB copy of ``image``, with any transparency composited onto white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_derivatives(source_name, storage=None):
+    """
+    Write every size and format of ``source_name`` to ``storage`` and return
+    the ``image_variants`` dict describing them. Touches no database, so it
+    can run in a worker process.
+    """
+    storage = storage or image_storage()
+    with storage.open(source_name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+    # Phone photos are often stored sideways with an EXIF orientation tag;
+    # apply it, since the tag itself is dropped with the rest of the metadata.
+    original = _flatten(ImageOps.exif_transpose(original))
+
+    variants = {'source': source_name}
+    for size, width in SIZES.items():
+        if original.width > width:
+            height = round(original.height * width / original.width)
+            image = original.resize((width, height), Image.LANCZOS)
+        else:
+            image = original
+        variant = {'width': image.width, 'height': image.height}
+        for extension, options in FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(buffer, **options)
+            name = derivative_name(source_name, size, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            variant[extension] = storage.save(name, ContentFile(buffer.getvalue()))
+        variants[size] = variant
+    return variants
+
+
+def variant_names(variants):
+    return {
+        variants[size][extension]
+        for size in SIZES if size in variants
+        for extension in FORMATS if variants[size].get(extension)
+    }
+
+
+def delete_derivatives(names, storage=None):
+    storage = storage or image_storage()
+    for name in names:
+        storage.delete(name)
+
+
+def needs_processing(product):
+    return (product.image.name or None) != product.image_variants.get('source')
+
+
+def process_product_image(product):
+    """Bring ``product.image_variants`` up to date with ``product.image``."""
+    from . import catalog_cache
+    from .models import Product
+
+    if not needs_processing(product):
+        return
+    old = product.image_variants
+    variants = {}
+    if product.image:
+        try:
+            variants = render_derivatives(product.image.name)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Pages fall back to the original image, as before.
+            logger.exception('Could not build derivatives for %s', product.image.name)
+            return
+    delete_derivatives(variant_names(old) - variant_names(variants))
+
+    product.image_variants = variants
+    # A new updated_at retires the product's cached cards and page ETag.
+    Product.objects.filter(pk=product.pk).update(image_variants=variants, updated_at=timezone.now())
+    transaction.on_commit(catalog_cache.invalidate)
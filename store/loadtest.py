@@ -0,0 +1,404 @@
+"""
+Load generator that replays shopper journeys against a running server.
+
+Each virtual shopper is an asyncio task with its own cookie jar and a
+keep-alive HTTP/1.1 connection (``HTTPClient``, standard library only). It
+picks a journey by weight, runs it, and starts over until the run ends:
+
+* ``browse``: home, the product list, the next page, a product.
+* ``search``: a search for a word from a product name seen so far, a product
+  from the results.
+* ``buy``: a product, add to cart, the cart, log in, checkout with COD or
+  UPI, and for UPI the payment page and a transaction ID.
+
+Every request is timed and filed under its URL name (``product_detail``,
+``checkout``, ...). ``Recorder.report()`` turns the timings into throughput,
+p50/p95/p99 latency and error rates per URL name, as plain data for JSON.
+Run it with ``python manage.py loadtest``.
+"""
+import asyncio
+import html
+import random
+import re
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.urls import Resolver404, resolve, reverse
+
+from .metrics import percentile
+
+LOADTEST_PASSWORD = 'loadtest-password-123'
+
+JOURNEY_WEIGHTS = {'browse': 6, 'search': 3, 'buy': 1}
+
+_CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+_PRODUCT_LINK = re.compile(r'href="(/product/[^"/]+/)"')
+_ADD_TO_CART = re.compile(r'action="(/cart/add/\d+/)"')
+_NEXT_PAGE = re.compile(r'href="(\?[^"]*cursor=[^"]+)" class="btn btn-outline">Next<')
+_PRODUCT_NAME = re.compile(r'class="product-name">([^<]+)<')
+
+FALLBACK_SEARCH_TERMS = ['card', 'game', 'figure', 'book', 'rare']
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', 'replace')
+
+    @property
+    def location(self):
+        return self.headers.get('location')
+
+
+class Recorder:
+    """Latencies and failures per URL name, and outcomes per journey."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.journeys = defaultdict(lambda: {'completed': 0, 'failed': 0})
+        self.started = self.finished = None
+
+    def request(self, name, status, elapsed_ms):
+        self.latencies[name].append(elapsed_ms)
+        self.statuses[name][str(status)] += 1
+        if status >= 400:
+            self.errors[name] += 1
+
+    def failure(self, name, error):
+        self.statuses[name][type(error).__name__] += 1
+        self.errors[name] += 1
+
+    def journey(self, name, ok):
+        self.journeys[name]['completed' if ok else 'failed'] += 1
+
+    def report(self):
+        duration = (self.finished or time.monotonic()) - self.started
+        urls = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            timings = sorted(self.latencies[name])
+            attempts = sum(self.statuses[name].values())
+            urls[name] = {
+                'requests': attempts,
+                'errors': self.errors[name],
+                'error_rate': round(self.errors[name] / attempts, 4) if attempts else 0,
+                'throughput_rps': round(attempts / duration, 2),
+                'p50_ms': _percentile_ms(timings, 0.50),
+                'p95_ms': _percentile_ms(timings, 0.95),
+                'p99_ms': _percentile_ms(timings, 0.99),
+                'max_ms': _round(timings[-1] if timings else None),
+                'statuses': dict(sorted(self.statuses[name].items())),
+            }
+        total = sum(url['requests'] for url in urls.values())
+        errors = sum(url['errors'] for url in urls.values())
+        everything = sorted(t for timings in self.latencies.values() for t in timings)
+        return {
+            'duration_s': round(duration, 2),
+            'requests': total,
+            'errors': errors,
+            'error_rate': round(errors / total, 4) if total else 0,
+            'throughput_rps': round(total / duration, 2),
+            'p50_ms': _percentile_ms(everything, 0.50),
+            'p95_ms': _percentile_ms(everything, 0.95),
+            'p99_ms': _percentile_ms(everything, 0.99),
+            'journeys': {name: dict(counts) for name, counts in sorted(self.journeys.items())},
+            'urls': urls,
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def _percentile_ms(sorted_timings, fraction):
+    # No timings (every request failed) is no latency, not 0 ms.
+    return _round(percentile(sorted_timings, fraction) if sorted_timings else None)
+
+
+def url_name(path):
+    try:
+        return resolve(urlsplit(path).path).url_name or 'unnamed'
+    except Resolver404:
+        return 'unresolved'
+
+
+class HTTPClient:
+    """
+    A minimal HTTP/1.1 client for one shopper: one keep-alive connection,
+    a cookie jar, form posts and manual redirects. Only what the load test
+    needs; no TLS, no compression.
+    """
+
+    def __init__(self, host, port, recorder, timeout=30):
+        self.host = host
+        self.port = port
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = {}
+        # The page the shopper is on, sent as the Referer like a browser does.
+        self.page = None
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, data, **kwargs):
+        return await self.request('POST', path, data=data, **kwargs)
+
+    async def request(self, method, path, data=None, follow=True):
+        """Send a request, following redirects with GETs if ``follow``; each hop is recorded."""
+        while True:
+            name = url_name(path)
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(self._send(method, path, data), self.timeout)
+            except (OSError, EOFError, asyncio.TimeoutError, ValueError) as error:
+                await self.close()
+                self.recorder.failure(name, error)
+                raise JourneyFailed(f'{method} {path}: {type(error).__name__}') from error
+            self.recorder.request(name, response.status, (time.perf_counter() - started) * 1000)
+            if response.status >= 400:
+                raise JourneyFailed(f'{method} {path}: HTTP {response.status}')
+            if not (follow and response.status in (301, 302, 303, 307, 308) and response.location):
+                if response.status == 200:
+                    self.page = path
+                return response
+            method, data, path = 'GET', None, urlsplit(response.location)._replace(scheme='', netloc='').geturl()
+
+    async def _send(self, method, path, data):
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.write(self._request_bytes(method, path, data))
+            try:
+                await self.writer.drain()
+                response = await self._read_response()
+            except (ConnectionError, EOFError):
+                # The server closed an idle keep-alive connection; retry once.
+                await self.close()
+                if attempt:
+                    raise
+                continue
+            if response.headers.get('connection', '').lower() == 'close':
+                await self.close()
+            return response
+
+    def _request_bytes(self, method, path, data):
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'User-Agent: shopverse-loadtest',
+            'Accept-Encoding: identity',
+        ]
+        if self.page:
+            lines.append(f'Referer: http://{self.host}:{self.port}{self.page}')
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{key}={value}' for key, value in self.cookies.items()))
+        body = b''
+        if data is not None:
+            body = urlencode(data).encode()
+            lines.append('Content-Type: application/x-www-form-urlencoded')
+        if body or method == 'POST':
+            lines.append(f'Content-Length: {len(body)}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+    async def _read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').rstrip('\r\n')
+            if not line:
+                break
+            key, _, value = line.partition(':')
+            key, value = key.strip().lower(), value.strip()
+            if key == 'set-cookie':
+                self._store_cookie(value)
+            else:
+                headers[key] = value
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        elif status in (204, 304):
+            body = b''
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+        return Response(status, headers, body)
+
+    def _store_cookie(self, header):
+        for key, morsel in SimpleCookie(header).items():
+            if morsel['max-age'] == '0' or not morsel.value or morsel.value == '""':
+                self.cookies.pop(key, None)
+            else:
+                self.cookies[key] = morsel.value
+
+
+def csrf_token(response):
+    match = _CSRF_INPUT.search(response.text)
+    if match is None:
+        raise JourneyFailed('no CSRF token on the page')
+    return match[1]
+
+
+class Shopper:
+    """One journey's worth of state: a fresh cookie jar, an RNG, what has been seen."""
+
+    def __init__(self, client, rng, catalog, users):
+        self.client = client
+        self.rng = rng
+        self.catalog = catalog
+        self.users = users
+
+    def remember(self, response):
+        self.catalog['products'].update(_PRODUCT_LINK.findall(response.text))
+        for name in _PRODUCT_NAME.findall(response.text):
+            words = [word for word in html.unescape(name).split() if len(word) > 3]
+            self.catalog['terms'].update(word.lower() for word in words[:2])
+
+    def pick_product(self, response):
+        links = _PRODUCT_LINK.findall(response.text)
+        if not links:
+            links = sorted(self.catalog['products'])
+        if not links:
+            raise JourneyFailed('no products to look at')
+        return self.rng.choice(links)
+
+    async def browse(self):
+        home = await self.client.get(reverse('home'))
+        self.remember(home)
+        listing = await self.client.get(reverse('product_list'))
+        self.remember(listing)
+        next_page = _NEXT_PAGE.search(listing.text)
+        if next_page:
+            listing = await self.client.get(reverse('product_list') + html.unescape(next_page[1]))
+            self.remember(listing)
+        await self.client.get(self.pick_product(listing))
+
+    async def search(self):
+        terms = sorted(self.catalog['terms']) or FALLBACK_SEARCH_TERMS
+        results = await self.client.get(
+            reverse('product_list') + '?' + urlencode({'search': self.rng.choice(terms)})
+        )
+        self.remember(results)
+        if _PRODUCT_LINK.search(results.text):
+            await self.client.get(self.pick_product(results))
+
+    async def buy(self):
+        listing = await self.client.get(reverse('product_list'))
+        self.remember(listing)
+        product = await self.client.get(self.pick_product(listing))
+        add = _ADD_TO_CART.search(product.text)
+        if add is None:
+            raise JourneyFailed('product page has no add-to-cart form')
+        await self.client.post(add[1], {'csrfmiddlewaretoken': csrf_token(product), 'quantity': 1})
+        await self.client.get(reverse('cart'))
+
+        # Checkout needs a login; the anonymous cart is merged into the user's.
+        login_page = await self.client.get(reverse('checkout'))
+        checkout = await self.client.post(reverse('login') + '?' + urlencode({'next': reverse('checkout')}), {
+            'csrfmiddlewaretoken': csrf_token(login_page),
+            'username': self.rng.choice(self.users),
+            'password': LOADTEST_PASSWORD,
+        })
+        payment_method = self.rng.choice(['cod', 'upi'])
+        placed = await self.client.post(reverse('checkout'), {
+            'csrfmiddlewaretoken': csrf_token(checkout),
+            'full_name': 'Load Test', 'email': 'loadtest@example.com', 'phone': '9999999999',
+            'address': '1 Benchmark Road', 'city': 'Pune', 'postal_code': '411001', 'country': 'India',
+            'payment_method': payment_method,
+        }, follow=False)
+        if placed.status != 302 or not placed.location:
+            raise JourneyFailed('checkout did not redirect')
+        if url_name(placed.location) == 'cart':
+            raise JourneyFailed('sold out at checkout')
+        page = await self.client.get(placed.location)
+        if payment_method == 'upi':
+            await self.client.post(placed.location, {
+                'csrfmiddlewaretoken': csrf_token(page),
+                'transaction_id': f'LT{self.rng.randrange(10 ** 12):012d}',
+            })
+
+
+async def run(host, port, users, concurrency=10, duration=None, journeys=None,
+              weights=None, seed=0, think_time=0.0):
+    """
+    Run ``concurrency`` shoppers until ``duration`` seconds have passed or
+    ``journeys`` journeys have been started, and return the report.
+    """
+    weights = weights or JOURNEY_WEIGHTS
+    names = sorted(name for name, weight in weights.items() if weight > 0)
+    recorder = Recorder()
+    catalog = {'products': set(), 'terms': set()}
+    deadline = None if duration is None else time.monotonic() + duration
+    remaining = [journeys]
+
+    def another():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        if remaining[0] is not None:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+        return True
+
+    async def shopper(number):
+        rng = random.Random(f'{seed}:{number}')
+        while another():
+            name = rng.choices(names, weights=[weights[n] for n in names])[0]
+            client = HTTPClient(host, port, recorder)
+            try:
+                await getattr(Shopper(client, rng, catalog, users), name)()
+            except JourneyFailed:
+                recorder.journey(name, False)
+            else:
+                recorder.journey(name, True)
+            finally:
+                await client.close()
+            if think_time:
+                await asyncio.sleep(rng.expovariate(1 / think_time))
+
+    recorder.started = time.monotonic()
+    await asyncio.gather(*(shopper(n) for n in range(concurrency)))
+    recorder.finished = time.monotonic()
+    report = recorder.report()
+    report['config'] = {
+        'concurrency': concurrency, 'duration_s': duration, 'journeys': journeys,
+        'weights': dict(sorted(weights.items())), 'seed': seed, 'think_time_s': think_time,
+        'session_engine': settings.SESSION_ENGINE,
+    }
+    return report
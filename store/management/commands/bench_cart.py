@@ -0,0 +1,99 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from store.models import Category, Product
+
+BACKENDS = [
+    # (label, settings, log in first)
+    ('signed cookie', {
+        'STORE_CART_STORAGE': 'store.cart_storage.SignedCookieCartStorage',
+    }, False),
+    ('session (db)', {
+        'STORE_CART_STORAGE': 'store.cart_storage.SessionCartStorage',
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    }, False),
+    ('session (cached_db)', {
+        'STORE_CART_STORAGE': 'store.cart_storage.SessionCartStorage',
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    }, False),
+    ('cart lines (user)', {
+        'STORE_CART_USER_STORAGE': 'store.cart_storage.DatabaseCartStorage',
+    }, True),
+]
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare cart storage backends: latency and queries per add/update/view/remove '
+        'through the real views. Data is generated inside a transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=10, help='Products added to each cart.')
+        parser.add_argument('--repeat', type=int, default=20, help='Cart page views per backend.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"backend":>20} {"operation":>10} {"p50 ms":>8} {"max ms":>8} {"queries":>8} {"writes":>8}'
+        )
+        with transaction.atomic():
+            category = Category.objects.create(name='Cart benchmark', slug='cart-benchmark-tmp')
+            products = Product.objects.bulk_create([
+                Product(name=f'Cart bench {i}', slug=f'cart-bench-{i}', description='', price=10 + i,
+                        stock=1000, category=category)
+                for i in range(options['lines'])
+            ])
+            user = User.objects.create_user('cart-benchmark-tmp')
+
+            for label, overrides, log_in in BACKENDS:
+                with override_settings(**overrides):
+                    client = Client(HTTP_HOST='localhost')
+                    if log_in:
+                        client.force_login(user)
+                    for operation, stats in self.run_backend(client, products, options['repeat']):
+                        timings, queries, writes = stats
+                        self.stdout.write(
+                            f'{label:>20} {operation:>10} {statistics.median(timings):>8.2f} '
+                            f'{max(timings):>8.2f} {queries / len(timings):>8.1f} {writes / len(timings):>8.1f}'
+                        )
+            transaction.set_rollback(True)
+
+    def run_backend(self, client, products, repeat):
+        steps = [
+            ('add', [('post', reverse('add_to_cart', args=[p.id]), {'quantity': 1}) for p in products]),
+            ('update', [('post', reverse('update_cart', args=[p.id]), {'quantity': 2}) for p in products]),
+            ('view', [('get', reverse('cart'), None)] * repeat),
+            ('remove', [('post', reverse('update_cart', args=[p.id]), {'quantity': 0}) for p in products]),
+        ]
+        for operation, requests in steps:
+            yield operation, self.measure(client, requests)
+
+    @staticmethod
+    def measure(client, requests):
+        timings = []
+        counts = {'queries': 0, 'writes': 0}
+
+        def count(execute, sql, params, many, context):
+            counts['queries'] += 1
+            if sql.lstrip().upper().startswith(WRITES):
+                counts['writes'] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            for method, url, data in requests:
+                started = time.perf_counter()
+                getattr(client, method)(url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+                # Flash messages pile up in a cookie nobody reads here; once it
+                # overflows they'd spill into the session and skew the numbers.
+                client.cookies.pop(CookieStorage.cookie_name, None)
+        return timings, counts['queries'], counts['writes']
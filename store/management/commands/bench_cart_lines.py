@@ -0,0 +1,88 @@
+import copy
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.cart import CartSnapshot
+from store.models import Category, Product
+
+
+def dict_cart_request(cart):
+    """What a cart page used to do: iterate twice (table and summary), then total and count."""
+    for _ in range(2):
+        items = cart.copy()
+        products = Product.objects.filter(id__in=items.keys()).select_related('category')
+        for product in products:
+            items[str(product.id)]['product'] = product
+        for item in items.values():
+            item['price'] = Decimal(item['price'])
+            item['total_price'] = item['price'] * item['quantity']
+    sum(Decimal(item['price']) * item['quantity'] for item in cart.values())
+    sum(item['quantity'] for item in cart.values())
+
+
+def snapshot_request(cart):
+    snapshot = CartSnapshot(cart)
+    for _ in range(2):
+        for item in snapshot.items:
+            item.total_price
+    snapshot.subtotal
+    snapshot.quantity
+
+
+RUNNERS = (dict_cart_request, snapshot_request)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time and measure allocations of one cart page worth of cart work, for the old '
+        'dict-walking cart and the CartSnapshot, at several cart sizes. Products are '
+        'created inside a transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 100, 500])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"lines":>6} {"dict ms":>10} {"snapshot ms":>12} {"dict KB":>10} {"snapshot KB":>12}'
+        )
+        with transaction.atomic():
+            category = Category.objects.create(name='Cart benchmark', slug='cart-lines-benchmark-tmp')
+            products = Product.objects.bulk_create([
+                Product(name=f'Cart line {i}', slug=f'cart-line-{i}', description='',
+                        price=Decimal('9.99') + i, stock=100, category=category)
+                for i in range(max(options['sizes']))
+            ])
+            for size in sorted(options['sizes']):
+                cart = {str(p.id): {'quantity': 1 + i % 3, 'price': str(p.price)} for i, p in enumerate(products[:size])}
+                old_ms, new_ms = (self.time(runner, cart, options['repeat']) for runner in RUNNERS)
+                old_kb, new_kb = (self.peak_kb(runner, cart) for runner in RUNNERS)
+                self.stdout.write(f'{size:>6} {old_ms:>10.3f} {new_ms:>12.3f} {old_kb:>10.1f} {new_kb:>12.1f}')
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def time(runner, cart, repeat):
+        timings = []
+        for _ in range(repeat):
+            # The old code mutated the cart it walked; give each run a fresh one.
+            fresh = copy.deepcopy(cart)
+            started = time.perf_counter()
+            runner(fresh)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    @staticmethod
+    def peak_kb(runner, cart):
+        fresh = copy.deepcopy(cart)
+        tracemalloc.start()
+        try:
+            runner(fresh)
+            return tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,70 @@
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.middleware.csrf import get_token
+from django.template.loader import get_template
+from django.test import RequestFactory, override_settings
+
+from store import catalog_cache
+from store.models import Category, Product
+from store.views import product_cards
+
+
+def render_inline(request, products):
+    """What a listing used to do: render every card on every request."""
+    template = get_template(catalog_cache.CARD_TEMPLATE)
+    token = get_token(request)
+    return [template.render({'product': product, 'csrf_token': token}) for product in products]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time assembling the product grid of a listing page: every card rendered '
+        'inline, and through the card cache when cold and when warm. Products are '
+        'created inside a transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/products/')
+        with transaction.atomic():
+            category = Category.objects.create(name='Card benchmark', slug='card-benchmark-tmp')
+            Product.objects.bulk_create([
+                Product(name=f'Card {i}', slug=f'card-benchmark-{i}', description='',
+                        price=Decimal('9.99') + i, stock=10, category=category, rarity='rare')
+                for i in range(options['cards'])
+            ])
+            products = list(product_cards().filter(category=category))
+
+            def cold():
+                # A fresh key namespace: every card is a miss.
+                with override_settings(STORE_PAGE_VERSION=uuid.uuid4().hex):
+                    catalog_cache.render_cards(request, products)
+
+            runners = {
+                'inline': lambda: render_inline(request, products),
+                'cache cold': cold,
+                'cache warm': lambda: catalog_cache.render_cards(request, products),
+            }
+            catalog_cache.render_cards(request, products)
+
+            self.stdout.write(f'{len(products)} cards, median of {options["repeat"]} runs')
+            for name, runner in runners.items():
+                self.stdout.write(f'{name:>12} {self.time(runner, options["repeat"]):>10.2f} ms')
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def time(runner, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            runner()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
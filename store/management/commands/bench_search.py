@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from store.models import Category, Product
+from store.search import LikeSearchBackend, get_search_backend
+
+WORDS = (
+    'pikachu charizard mewtwo holo foil booster starter deck vintage sealed '
+    'graded mint figure statue comic anime retro console cartridge limited '
+    'edition signed promo dragon knight wizard galaxy robot ninja pirate'
+).split()
+
+SYLLABLES = 'ka zu mi ro te shi na bo le vy dra gon pix tor'.split()
+
+QUERIES = ['pikachu', 'holo foil', 'vintage sealed deck', 'drag', 'signed limited edition']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare product search latency (LIKE scan vs. the full-text backend) on a '
+        'synthetic catalog. Data is generated inside a transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Pad the vocabulary with made-up words so term selectivity looks like a
+        # real catalog instead of every product matching every query.
+        self.vocabulary = WORDS + sorted({
+            ''.join(rng.choices(SYLLABLES, k=3)) for _ in range(3000)
+        })
+        fulltext = get_search_backend()
+        like = LikeSearchBackend(connection)
+
+        self.stdout.write(f'backend: {type(fulltext).__name__} ({connection.vendor})')
+        self.stdout.write(f'{"products":>10} {"backend":>20} {"p50 ms":>10} {"max ms":>10}')
+
+        with transaction.atomic():
+            category = Category.objects.create(name='Search benchmark', slug='search-benchmark-tmp')
+            created = 0
+            for size in sorted(options['sizes']):
+                created += self.fill(category, rng, size - created, options['batch_size'], created)
+                for backend in (like, fulltext):
+                    p50, worst = self.time_queries(backend, options['repeat'])
+                    self.stdout.write(f'{created:>10} {type(backend).__name__:>20} {p50:>10.2f} {worst:>10.2f}')
+            transaction.set_rollback(True)
+
+    def fill(self, category, rng, count, batch_size, offset):
+        for start in range(0, count, batch_size):
+            batch = []
+            for i in range(offset + start, offset + min(start + batch_size, count)):
+                name = ' '.join(rng.choices(self.vocabulary, k=3)).title()
+                batch.append(Product(
+                    name=name,
+                    slug=f'bench-{i}',
+                    description=' '.join(rng.choices(self.vocabulary, k=20)),
+                    price=rng.randint(100, 100_000) / 100,
+                    stock=rng.randint(0, 20),
+                    category=category,
+                ))
+            Product.objects.bulk_create(batch)
+        return max(count, 0)
+
+    def time_queries(self, backend, repeat):
+        timings = []
+        base = Product.objects.filter(stock__gt=0)
+        for query in QUERIES:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(backend.search(base, query).order_by('-search_rank', '-created_at', '-id')[:12])
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), max(timings)
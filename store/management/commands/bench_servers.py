@@ -0,0 +1,127 @@
+import http.client
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from store.metrics import percentile
+from store.models import Product
+
+SERVERS = {
+    'wsgi': ['shopverse.wsgi:application'],
+    'asgi': ['shopverse.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'Server exited with status {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server did not start listening on port {port}')
+
+
+def run_load(port, paths, clients, duration):
+    """Hit ``paths`` round-robin from ``clients`` keep-alive connections for ``duration`` seconds."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine, failed = [], 0
+        i = offset
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            mine.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors)
+
+
+class Command(BaseCommand):
+    help = (
+        'Start the site under gunicorn with sync (WSGI) workers and with uvicorn (ASGI) '
+        'workers, same worker count, and compare throughput and latency of the '
+        'storefront read pages under concurrent keep-alive clients. Uses the '
+        'configured database as it is; seed it first (create_sample_data.py).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--clients', type=int, default=32, help='Concurrent connections.')
+        parser.add_argument('--duration', type=float, default=15, help='Seconds of load per server.')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds of untimed load first.')
+        parser.add_argument('--servers', nargs='+', choices=SERVERS, default=list(SERVERS))
+
+    def handle(self, *args, **options):
+        paths = [reverse('home'), reverse('product_list'), reverse('cart')]
+        product = Product.objects.filter(stock__gt=0).only('slug').first()
+        if product is not None:
+            paths.append(reverse('product_detail', args=[product.slug]))
+
+        self.stdout.write(
+            f'{options["workers"]} workers, {options["clients"]} clients, '
+            f'{options["duration"]:.0f}s per server, paths: {" ".join(paths)}'
+        )
+        self.stdout.write(f'{"server":>6} {"req/s":>10} {"p50 ms":>10} {"p95 ms":>10} {"errors":>8}')
+        for name in options['servers']:
+            port = free_port()
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', *SERVERS[name], '--workers', str(options['workers']),
+                 '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+                cwd=Path(settings.BASE_DIR),
+            )
+            try:
+                wait_until_up(port, process)
+                run_load(port, paths, options['clients'], options['warmup'])
+                latencies, errors = run_load(port, paths, options['clients'], options['duration'])
+            finally:
+                process.terminate()
+                process.wait()
+            if not latencies:
+                raise CommandError(f'{name}: no successful requests')
+            latencies.sort()
+            self.stdout.write(
+                f'{name:>6} {len(latencies) / options["duration"]:>10.1f} '
+                f'{percentile(latencies, 0.50):>10.2f} {percentile(latencies, 0.95):>10.2f} {errors:>8}'
+            )
@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from store import catalog_cache, images
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Build resized WebP/JPEG derivatives for product images that do not have '
+        'them yet (or for every image with --force), using a pool of worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes; 0 renders in this process.')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that are up to date.')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'image_variants')
+        todo = [
+            (product.pk, product.image.name, product.image_variants)
+            for product in products.order_by('pk').iterator()
+            if options['force'] or images.needs_processing(product)
+        ]
+        self.stdout.write(f'{len(todo)} product image(s) to process')
+        if not todo:
+            return
+
+        done = failed = 0
+        for (pk, name, old), result in self.render(todo, options['workers']):
+            if isinstance(result, Exception):
+                failed += 1
+                self.stderr.write(f'{name}: {result}')
+                continue
+            images.delete_derivatives(images.variant_names(old) - images.variant_names(result))
+            # Skip products whose image was replaced while we were working.
+            done += Product.objects.filter(pk=pk, image=name).update(image_variants=result, updated_at=timezone.now())
+        catalog_cache.invalidate()
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} image(s), {failed} failed'))
+
+    @staticmethod
+    def render(todo, workers):
+        if workers <= 0:
+            for task in todo:
+                try:
+                    yield task, images.render_derivatives(task[1])
+                except Exception as exc:
+                    yield task, exc
+            return
+
+        # Forked workers must not inherit open database connections; they
+        # never touch the database anyway, only the image storage.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            futures = {pool.submit(images.render_derivatives, task[1]): task for task in todo}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as exc:
+                    yield futures[future], exc
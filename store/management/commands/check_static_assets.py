@@ -0,0 +1,50 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.template.utils import get_app_template_dirs
+
+STATIC_TAG = re.compile(r'''{%\s*static\s+(['"])(?P<path>[^'"]+)\1''')
+
+
+def project_template_dirs():
+    """Template directories of the project itself (not of Django or third-party apps)."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    dirs = [Path(directory) for engine in settings.TEMPLATES for directory in engine.get('DIRS', [])]
+    dirs += [Path(directory) for directory in get_app_template_dirs('templates')]
+    return [directory for directory in dirs if directory.resolve().is_relative_to(base_dir)]
+
+
+def static_references():
+    """``(template path, line number, asset path)`` for every literal ``{% static %}``."""
+    for directory in project_template_dirs():
+        for template in sorted(directory.rglob('*.html')):
+            for number, line in enumerate(template.read_text(encoding='utf-8').splitlines(), 1):
+                for match in STATIC_TAG.finditer(line):
+                    yield template, number, match.group('path')
+
+
+class Command(BaseCommand):
+    help = (
+        'Fail if any template references a static asset that is missing from the '
+        'staticfiles manifest. Run after collectstatic.'
+    )
+
+    def handle(self, *args, **options):
+        if not hasattr(staticfiles_storage, 'load_manifest'):
+            raise CommandError('STATICFILES_STORAGE does not keep a manifest.')
+        manifest = staticfiles_storage.load_manifest()[0]
+        if not manifest:
+            raise CommandError(f'No staticfiles manifest in {settings.STATIC_ROOT}; run collectstatic first.')
+
+        checked = 0
+        missing = []
+        for template, number, path in static_references():
+            checked += 1
+            if path not in manifest:
+                missing.append(f'{template}:{number}: {path}')
+        if missing:
+            raise CommandError('Static assets missing from the manifest:\n' + '\n'.join(missing))
+        self.stdout.write(self.style.SUCCESS(f'All {checked} static references are in the manifest'))
@@ -0,0 +1,26 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from store import catalog_io
+
+
+class Command(BaseCommand):
+    help = (
+        'Write every product as CSV or JSON Lines, in the format import_products '
+        'reads. Products are read from the database in chunks, so memory stays flat.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=catalog_io.FORMATS, default='csv')
+        parser.add_argument('--output', help='Default: standard output.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = catalog_io.export_rows(chunk_size=options['chunk_size'])
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            output.writelines(catalog_io.serialize(rows, options['format']))
+        finally:
+            if output is not sys.stdout:
+                output.close()
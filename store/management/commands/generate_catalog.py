@@ -0,0 +1,225 @@
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from store import catalog_cache, typeahead
+from store.models import Category, Order, OrderItem, Product
+
+ADJECTIVES = (
+    'vintage holo foil sealed graded mint signed limited promo retro classic rare '
+    'shiny golden crystal shadow cosmic neon royal ancient legendary mythic'
+).split()
+NOUNS = (
+    'pikachu charizard mewtwo dragon knight wizard robot ninja pirate samurai '
+    'phoenix titan golem hydra kraken griffin unicorn cyborg ranger paladin'
+).split()
+KINDS = (
+    'card booster deck figure statue comic cartridge poster plush keychain '
+    'art-print playmat sleeve binder tin box'
+).split()
+CATEGORY_NAMES = (
+    'Trading Cards', 'Collectible Toys', 'Board Games', 'Video Games', 'Comics & Books',
+    'Figures & Statues', 'Plushies', 'Posters & Art', 'Accessories', 'Sealed Product',
+)
+CITIES = ('Pune', 'Mumbai', 'Delhi', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad', 'Jaipur')
+
+CONDITIONS = (['new', 'used', 'mint'], [6, 3, 1])
+RARITIES = (['', 'common', 'uncommon', 'rare', 'ultra_rare'], [3, 8, 5, 2, 1])
+ORDER_STATUSES = (
+    ['completed', 'shipped', 'confirmed', 'payment_pending', 'cancelled', 'pending'],
+    [55, 15, 12, 8, 7, 3],
+)
+
+
+def zipf_cum_weights(count, exponent):
+    """Cumulative weights of ranks 1..count with P(rank) proportional to 1 / rank**exponent."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def bulk_create_with_timestamps(model, objs, batch_size):
+    """
+    bulk_create ``objs`` keeping the created_at/updated_at values set on them.
+    The insert stamps auto_now/auto_now_add fields with the current time, so
+    the generated values are written back with one UPDATE per batch.
+    """
+    fields = [
+        field.attname for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    stamps = [[getattr(obj, name) for name in fields] for obj in objs]
+    created = model.objects.bulk_create(objs, batch_size=batch_size)
+    if created and created[0].pk is None:
+        raise CommandError('This database backend does not return ids from bulk inserts.')
+    for obj, values in zip(created, stamps):
+        for name, value in zip(fields, values):
+            setattr(obj, name, value)
+    model.objects.bulk_update(created, fields, batch_size=batch_size)
+    return created
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic catalog and order history for benchmarks: categories, '
+        'products, customers, and orders whose items follow a Zipf popularity curve. '
+        'The same --seed (and --until) always produces the same data. Slugs and '
+        'usernames carry --prefix, so several data sets can live side by side.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--users', type=int, default=1_000)
+        parser.add_argument('--orders', type=int, default=20_000)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Popularity skew: rank r sells in proportion to 1/r**zipf.')
+        parser.add_argument('--days', type=int, default=365, help='Spread products and orders over this many days.')
+        parser.add_argument('--until', help='Last day of the history, YYYY-MM-DD (default: today).')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='syn', help='Prefix for slugs and usernames.')
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.prefix = prefix = options['prefix']
+        if Category.objects.filter(slug__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Data with prefix {prefix!r} already exists; pick another --prefix.')
+        until = timezone.now()
+        if options['until']:
+            until = timezone.make_aware(datetime.fromisoformat(options['until']) + timedelta(days=1))
+        self.until = until.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        started = time.monotonic()
+        categories = self.create_categories(options['categories'])
+        product_ids, prices = self.create_products(categories, options['products'])
+        user_ids = self.create_users(options['users'])
+        orders, items = self.create_orders(product_ids, prices, user_ids, options['orders'], options['zipf'])
+        catalog_cache.invalidate()
+        typeahead.reset()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(categories)} categories, {len(product_ids)} products, {len(user_ids)} users, '
+            f'{orders} orders, {items} order items in {time.monotonic() - started:.1f}s'
+        ))
+
+    def moment(self):
+        """A random time within the history."""
+        return self.until - timedelta(seconds=self.rng.random() * self.span)
+
+    def create_categories(self, count):
+        categories = [
+            Category(name=name if n < len(CATEGORY_NAMES) else f'{name} {n // len(CATEGORY_NAMES) + 1}',
+                     slug=f'{self.prefix}-category-{n}')
+            for n, name in zip(range(count), itertools.cycle(CATEGORY_NAMES))
+        ]
+        return Category.objects.bulk_create(categories)
+
+    def create_products(self, categories, count):
+        rng = self.rng
+        ids, prices = [], []
+        # A few big categories and a long tail of small ones.
+        category_weights = zipf_cum_weights(len(categories), 1.0)
+
+        def products():
+            for n in range(count):
+                words = [rng.choice(ADJECTIVES), rng.choice(NOUNS), rng.choice(KINDS)]
+                price = Decimal(f'{rng.lognormvariate(6.5, 1.1):.2f}')
+                created = self.moment()
+                yield Product(
+                    name=' '.join(words).title(),
+                    # Unique by construction: no per-row existence checks.
+                    slug=f'{self.prefix}-{"-".join(words)}-{n}',
+                    description=' '.join(rng.choices(ADJECTIVES + NOUNS + KINDS, k=24)).capitalize() + '.',
+                    price=max(price, Decimal('1.00')),
+                    stock=0 if rng.random() < 0.08 else rng.randint(1, 200),
+                    category=rng.choices(categories, cum_weights=category_weights)[0],
+                    condition=rng.choices(*CONDITIONS)[0],
+                    rarity=rng.choices(*RARITIES)[0],
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        for batch in batches(products(), self.batch_size):
+            with transaction.atomic():
+                created = bulk_create_with_timestamps(Product, batch, self.batch_size)
+            ids.extend(product.pk for product in created)
+            prices.extend(product.price for product in created)
+            self.progress('products', len(ids), count)
+        return ids, prices
+
+    def create_users(self, count):
+        password = make_password(None)
+        ids = []
+        for batch in batches(range(count), self.batch_size):
+            created = User.objects.bulk_create([
+                User(username=f'{self.prefix}-user-{n}', email=f'{self.prefix}-user-{n}@example.com',
+                     password=password, date_joined=self.moment())
+                for n in batch
+            ])
+            ids.extend(user.pk for user in created)
+        if ids and ids[0] is None:
+            ids = list(User.objects.filter(username__startswith=f'{self.prefix}-user-').order_by('pk')
+                       .values_list('pk', flat=True))
+        return ids
+
+    def create_orders(self, product_ids, prices, user_ids, count, exponent):
+        if not product_ids or not count:
+            return 0, 0
+        rng = self.rng
+        # Which product is the most popular, second most popular, ... is itself random.
+        ranked = list(range(len(product_ids)))
+        rng.shuffle(ranked)
+        cum_weights = zipf_cum_weights(len(ranked), exponent)
+        customer_weights = zipf_cum_weights(len(user_ids), 0.8) if user_ids else None
+
+        made = items_made = 0
+        for batch in batches(range(count), self.batch_size):
+            orders, lines = [], []
+            for _ in batch:
+                picks = set(rng.choices(ranked, cum_weights=cum_weights, k=min(1 + int(rng.expovariate(0.9)), 6)))
+                order_lines = [(product_ids[p], rng.choices([1, 2, 3], [80, 15, 5])[0], prices[p]) for p in picks]
+                status = rng.choices(*ORDER_STATUSES)[0]
+                method = 'upi' if status == 'payment_pending' or rng.random() < 0.45 else 'cod'
+                user_id = rng.choices(user_ids, cum_weights=customer_weights)[0] if user_ids else None
+                order = Order(
+                    user_id=user_id, full_name=f'Customer {user_id or "guest"}', email='customer@example.com',
+                    phone='9000000000', address=f'{rng.randint(1, 999)} Market Road', city=rng.choice(CITIES),
+                    postal_code=f'{rng.randint(110001, 855999)}', country='India', payment_method=method,
+                    payment_status='verified' if method == 'upi' and status in ('completed', 'shipped') else 'pending',
+                    status=status, created_at=self.moment(),
+                )
+                order.updated_at = order.created_at
+                order.set_totals([(quantity, price) for _, quantity, price in order_lines])
+                orders.append(order)
+                lines.append(order_lines)
+            with transaction.atomic():
+                bulk_create_with_timestamps(Order, orders, self.batch_size)
+                items = [
+                    OrderItem(order_id=order.pk, product_id=product_id, quantity=quantity, price_at_time=price)
+                    for order, order_lines in zip(orders, lines)
+                    for product_id, quantity, price in order_lines
+                ]
+                OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+            made += len(orders)
+            items_made += len(items)
+            self.progress('orders', made, count)
+        return made, items_made
+
+    def progress(self, what, done, total):
+        if self.verbosity > 1 or done == total:
+            self.stderr.write(f'  {what}: {done}/{total}')
@@ -0,0 +1,56 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import catalog_io
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or update products from a CSV or JSON Lines file, streamed row by row '
+        'and upserted on slug in chunks. Rejected rows are listed (up to a limit) '
+        'and, with --errors, written to a JSON report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=catalog_io.FORMATS,
+                            help='Default: from the file extension (.jsonl/.ndjson, else CSV).')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per validate-and-upsert batch.')
+        parser.add_argument('--create-categories', action='store_true',
+                            help='Create categories the file names that do not exist yet.')
+        parser.add_argument('--errors', help='Write the per-row error report to this JSON file.')
+
+    def handle(self, *args, **options):
+        format = options['format'] or catalog_io.guess_format(options['path'])
+        started = time.monotonic()
+
+        def progress(result):
+            if options['verbosity'] > 0:
+                self.stderr.write(
+                    f'  {result.rows} rows, {result.created} created, {result.updated} updated, '
+                    f'{result.failed} rejected ({time.monotonic() - started:.1f}s)'
+                )
+
+        try:
+            with open(options['path'], 'rb') as file:
+                result = catalog_io.import_products(
+                    file, format, chunk_size=options['chunk_size'],
+                    create_categories=options['create_categories'], progress=progress,
+                )
+        except (OSError, catalog_io.ImportFormatError, UnicodeDecodeError) as error:
+            raise CommandError(error)
+
+        if options['errors']:
+            with open(options['errors'], 'w') as report:
+                json.dump(result.as_dict(), report, indent=2)
+        for error in result.errors[:20]:
+            self.stderr.write(f'  line {error["line"]} ({error["slug"] or "no slug"}): {error["errors"]}')
+        if result.failed > 20:
+            self.stderr.write(f'  ... and {result.failed - 20} more rejected rows')
+        style = self.style.WARNING if result.failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{result.rows} rows: {result.created} created, {result.updated} updated, '
+            f'{result.failed} rejected in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import subprocess
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from store import loadtest
+
+
+def parse_mix(value):
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in loadtest.JOURNEY_WEIGHTS:
+            raise CommandError(f'Unknown journey {name!r}; choose from {", ".join(loadtest.JOURNEY_WEIGHTS)}.')
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Bad weight in {part!r}; use name=number.')
+    return weights
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay shopper journeys (browse, search, buy with COD or UPI) against a running '
+        'server at a given concurrency and print throughput, p50/p95/p99 latency and error '
+        'rates per URL name as JSON. Creates the loadtest-N users the buy journey logs in '
+        'as; the server must use the same database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server to load.')
+        parser.add_argument('--concurrency', type=int, default=10, help='Simultaneous shoppers.')
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--duration', type=float, help='Seconds to run (default 30).')
+        group.add_argument('--journeys', type=int, help='Stop after this many journeys.')
+        parser.add_argument('--mix', type=parse_mix, default=dict(loadtest.JOURNEY_WEIGHTS),
+                            help='Journey weights, e.g. browse=6,search=3,buy=1.')
+        parser.add_argument('--users', type=int, default=20, help='Accounts the buy journey logs in as.')
+        parser.add_argument('--think-time', type=float, default=0.0,
+                            help='Mean pause between journeys per shopper, in seconds.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('--url must be an http:// URL.')
+        duration = options['duration']
+        if duration is None and options['journeys'] is None:
+            duration = 30
+
+        users = self.ensure_users(options['users'])
+        report = asyncio.run(loadtest.run(
+            url.hostname, url.port or 80, users,
+            concurrency=options['concurrency'], duration=duration, journeys=options['journeys'],
+            weights=options['mix'], seed=options['seed'], think_time=options['think_time'],
+        ))
+        report['config']['url'] = options['url']
+        report['commit'] = current_commit()
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+            self.stderr.write(
+                f'{report["requests"]} requests, {report["throughput_rps"]} req/s, '
+                f'p95 {report["p95_ms"]} ms, error rate {report["error_rate"]:.2%}'
+            )
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def ensure_users(count):
+        usernames = [f'loadtest-{n}' for n in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        # One hash for all of them; hashing is deliberately slow.
+        password = make_password(loadtest.LOADTEST_PASSWORD)
+        User.objects.bulk_create([
+            User(username=username, password=password, email=f'{username}@example.com')
+            for username in usernames if username not in existing
+        ])
+        return usernames
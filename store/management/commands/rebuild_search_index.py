@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from store.search import VENDOR_BACKENDS
+
+
+class Command(BaseCommand):
+    help = 'Recreate the product full-text search index and re-index every product.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        backend_class = VENDOR_BACKENDS.get(connection.vendor)
+        if backend_class is None:
+            self.stdout.write(f'No full-text index for {connection.vendor}; search falls back to LIKE.')
+            return
+
+        backend = backend_class(connection)
+        with transaction.atomic(using=options['database']):
+            backend.install()
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {connection.vendor} product search index.'))
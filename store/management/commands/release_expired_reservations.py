@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import reservations
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancel UPI orders still unpaid when their stock holds run out and put the held '
+        'units back in stock, a batch of orders at a time. Run this from cron every few '
+        'minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=reservations.BATCH_SIZE,
+                            help='Expired holds handled per transaction (default: %(default)s).')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        orders, units = reservations.release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{orders} unpaid order{"s" if orders != 1 else ""} cancelled, {units} unit{"s" if units != 1 else ""} '
+            f'back in stock in {time.monotonic() - started:.2f}s'
+        ))
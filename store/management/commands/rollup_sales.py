@@ -0,0 +1,32 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from store import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Bring the daily sales rollups up to date with the orders placed or changed '
+        'since the last run (or rebuild them from every order with --rebuild). The '
+        'staff dashboard does the same when its KPIs expire; run this from cron to '
+        'keep reports current without it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every day from scratch.')
+        parser.add_argument('--report', type=int, metavar='DAYS',
+                            help='Then print revenue per day for the last DAYS days.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        days = rollups.rebuild() if options['rebuild'] else rollups.update()
+        self.stdout.write(self.style.SUCCESS(
+            f'{days} day{"s" if days != 1 else ""} rolled up in {time.monotonic() - started:.2f}s'
+        ))
+        if options['report']:
+            today = timezone.localdate()
+            for day, orders, revenue in rollups.daily_revenue(today - timedelta(days=options['report'] - 1), today):
+                self.stdout.write(f'{day}  {orders:>6} orders  ₹{revenue:>12,.2f}')
@@ -0,0 +1,98 @@
+"""
+In-memory request metrics collected by ``store.middleware.PerformanceMiddleware``.
+
+Metrics are per process: each worker keeps the last ``STORE_METRICS_WINDOW``
+requests per view and the ``STORE_METRICS_SLOW_QUERIES`` slowest SQL
+statements it has seen.
+"""
+import heapq
+import threading
+from collections import deque
+
+from django.conf import settings
+
+FIELDS = ('total_ms', 'db_ms', 'db_queries', 'template_ms', 'response_bytes')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class RequestStats:
+    """What one request spent its time on."""
+
+    __slots__ = ('view', 'total_ms', 'db_ms', 'db_queries', 'template_ms', 'response_bytes', 'queries')
+
+    def __init__(self):
+        self.view = None
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.db_queries = 0
+        self.template_ms = 0.0
+        self.response_bytes = 0
+        self.queries = []
+
+    def record_query(self, sql, duration_ms):
+        self.db_queries += 1
+        self.db_ms += duration_ms
+        self.queries.append((duration_ms, sql))
+
+
+class MetricsRegistry:
+    def __init__(self, window=None, slow_queries=None):
+        self.window = window or getattr(settings, 'STORE_METRICS_WINDOW', 1000)
+        self.slow_query_count = slow_queries or getattr(settings, 'STORE_METRICS_SLOW_QUERIES', 20)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.requests = {}
+            self.slow_queries = []  # min-heap of (duration_ms, sql, view)
+
+    def record(self, stats):
+        row = tuple(getattr(stats, field) for field in FIELDS)
+        with self.lock:
+            samples = self.views.get(stats.view)
+            if samples is None:
+                samples = self.views[stats.view] = deque(maxlen=self.window)
+            samples.append(row)
+            self.requests[stats.view] = self.requests.get(stats.view, 0) + 1
+
+            for duration_ms, sql in stats.queries:
+                entry = (duration_ms, sql, stats.view)
+                if len(self.slow_queries) < self.slow_query_count:
+                    heapq.heappush(self.slow_queries, entry)
+                elif duration_ms > self.slow_queries[0][0]:
+                    heapq.heapreplace(self.slow_queries, entry)
+
+    def summary(self):
+        """Per-view p50/p95/p99 of every field over the rolling window."""
+        with self.lock:
+            snapshot = {view: list(samples) for view, samples in self.views.items()}
+            requests = dict(self.requests)
+
+        rows = []
+        for view, samples in snapshot.items():
+            row = {'view': view, 'requests': requests[view], 'window': len(samples)}
+            for i, field in enumerate(FIELDS):
+                values = sorted(sample[i] for sample in samples)
+                row[field] = {
+                    'p50': percentile(values, 0.50),
+                    'p95': percentile(values, 0.95),
+                    'p99': percentile(values, 0.99),
+                }
+            rows.append(row)
+        rows.sort(key=lambda row: row['total_ms']['p95'], reverse=True)
+        return rows
+
+    def slowest_queries(self):
+        with self.lock:
+            return sorted(self.slow_queries, reverse=True)
+
+
+registry = MetricsRegistry()
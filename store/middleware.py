@@ -0,0 +1,205 @@
+import cProfile
+import io
+import pstats
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.template.backends.django import Template
+
+from .cart_storage import SignedCookieCartStorage
+from .metrics import RequestStats, registry
+
+_current_stats = ContextVar('store_request_stats', default=None)
+
+PROFILE_SORTS = {key.value for key in pstats.SortKey}
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        stats = _current_stats.get()
+        if stats is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            stats.template_ms += (time.perf_counter() - started) * 1000
+    wrapper.store_timed = True
+    return wrapper
+
+
+def _timed_execute(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(sql, (time.perf_counter() - started) * 1000)
+
+
+def instrument_connection(connection):
+    # Installed for good rather than per request: async views run their
+    # queries on another thread, which has its own connection objects. The
+    # request's stats reach that thread through the context variable.
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _timed_execute)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument_connection(connection)
+
+
+class PerformanceMiddleware:
+    """
+    Record wall time, DB query count and time, template render time and
+    response size per view, expose them as a ``Server-Timing`` header and
+    feed the rolling percentiles in ``store.metrics.registry``.
+
+    ``?profile=1`` on any URL returns a cProfile report of that request
+    instead of the page, for staff users (or anyone when ``DEBUG`` is on).
+    Under ASGI the report covers the event loop thread only; time spent in
+    ORM calls made from async views shows up as waiting.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Django has no hook around template rendering outside of tests, so
+        # wrap the backend's render() once per process.
+        if not getattr(Template.render, 'store_timed', False):
+            Template.render = _timed_render(Template.render)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.GET.get('profile') == '1' and self.can_profile(request):
+            return self.profile(request)
+
+        # Connections opened before this module was imported.
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        if request.GET.get('profile') == '1' and await sync_to_async(self.can_profile)(request):
+            return await self.aprofile(request)
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats, started)
+
+    @staticmethod
+    def finish(request, response, stats, started):
+        stats.total_ms = (time.perf_counter() - started) * 1000
+
+        match = request.resolver_match
+        stats.view = match.view_name if match else 'unresolved'
+        if not response.streaming:
+            stats.response_bytes = len(response.content)
+        registry.record(stats)
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={stats.total_ms:.1f}',
+            f'db;dur={stats.db_ms:.1f};desc="{stats.db_queries} queries"',
+            f'tpl;dur={stats.template_ms:.1f}',
+        ])
+        return response
+
+    @staticmethod
+    def can_profile(request):
+        user = getattr(request, 'user', None)
+        return settings.DEBUG or (user is not None and user.is_staff)
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        profiler.runcall(self.get_response, request)
+        return self.profile_report(request, profiler)
+
+    async def aprofile(self, request):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.profile_report(request, profiler)
+
+    @staticmethod
+    def profile_report(request, profiler):
+        sort = request.GET.get('profile_sort')
+        if sort not in PROFILE_SORTS:
+            sort = 'cumulative'
+        try:
+            limit = int(request.GET.get('profile_limit', 60))
+        except ValueError:
+            limit = 60
+
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+        return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
+
+
+class CartCookieMiddleware:
+    """Write the cart cookie set by ``SignedCookieCartStorage`` to the response."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.set_cookie(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.set_cookie(request, await self.get_response(request))
+
+    @staticmethod
+    def set_cookie(request, response):
+        value = getattr(request, 'cart_cookie', None)
+        if value is None:
+            return response
+
+        name = getattr(settings, 'STORE_CART_COOKIE_NAME', 'cart')
+        if value:
+            response.set_signed_cookie(
+                name, value, salt=SignedCookieCartStorage.salt,
+                max_age=getattr(settings, 'STORE_CART_COOKIE_AGE', settings.SESSION_COOKIE_AGE),
+                secure=settings.SESSION_COOKIE_SECURE or None,
+                httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        else:
+            response.delete_cookie(name, samesite=settings.SESSION_COOKIE_SAMESITE)
+        return response
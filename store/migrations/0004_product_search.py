@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:16
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def install_search_schema(apps, schema_editor):
+    from store.search import VENDOR_BACKENDS
+
+    backend_class = VENDOR_BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is not None:
+        backend = backend_class(schema_editor.connection)
+        backend.install()
+        backend.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0003_order_payment_status_order_transaction_id_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(install_search_schema, migrations.RunPython.noop),
+    ]
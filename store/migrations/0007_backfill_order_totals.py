@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:22
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model("store", "Order")
+    OrderItem = apps.get_model("store", "OrderItem")
+
+    items = OrderItem.objects.filter(order=OuterRef("pk")).values("order")
+    subtotal = Coalesce(
+        Subquery(items.annotate(s=Sum(F("quantity") * F("price_at_time"))).values("s")),
+        Decimal("0"),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+    item_count = Coalesce(
+        Subquery(items.annotate(c=Sum("quantity")).values("c")),
+        0,
+        output_field=models.PositiveIntegerField(),
+    )
+    # One set-based UPDATE instead of loading every order and its items.
+    Order.objects.update(subtotal=subtotal, total=subtotal, item_count=item_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0006_order_totals"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
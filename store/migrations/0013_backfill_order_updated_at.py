@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:20
+
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_order_updated_at(apps, schema_editor):
+    Order = apps.get_model("store", "Order")
+    # Existing orders were last changed no later than we can tell: when placed.
+    Order.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0012_sales_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_updated_at, migrations.RunPython.noop),
+    ]
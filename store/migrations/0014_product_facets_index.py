@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0013_backfill_order_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["stock", "category", "condition", "rarity", "price"],
+                name="product_facets_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0015_stock_reservations"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_in_stock_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_stock_updated_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_facets_idx",
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["-total", "-id"], name="order_total_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=[
+                    "stock",
+                    "category",
+                    "condition",
+                    "rarity",
+                    "price",
+                    "updated_at",
+                ],
+                name="product_facets_idx",
+            ),
+        ),
+    ]
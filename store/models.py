@@ -1,7 +1,14 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.utils.text import slugify
 
+from . import images
+
 class Category(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True, blank=True)
@@ -43,9 +50,38 @@ class Product(models.Model):
     rarity = models.CharField(max_length=20, choices=RARITY_CHOICES, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a database trigger on PostgreSQL (see store/search.py);
+    # always NULL on SQLite, which indexes products in an FTS5 table instead.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Resized WebP/JPEG copies of ``image`` (see store/images.py).
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        # QueryPlanTests.test_every_index_is_used checks each one still serves
+        # the query it's here for.
+        indexes = [
+            # Newest first with id as the keyset pagination tiebreaker: the
+            # staff dashboard's product list, and the storefront's, which reads
+            # it in order skipping the few products out of stock.
+            models.Index(fields=['-created_at', '-id'], name='product_created_idx'),
+            models.Index(
+                fields=['category', '-created_at', '-id'], condition=models.Q(stock__gt=0),
+                name='product_in_stock_cat_idx',
+            ),
+            # Covers the facet counts (store/facets.py) and the Max('updated_at')
+            # / Count behind listing ETags: one range scan of the index instead
+            # of the table. Not partial: SQLite won't range-scan a partial index
+            # without an equality on a column.
+            models.Index(
+                fields=['stock', 'category', 'condition', 'rarity', 'price', 'updated_at'],
+                name='product_facets_idx',
+            ),
+            models.Index(
+                fields=['category', 'updated_at'], condition=models.Q(stock__gt=0),
+                name='product_in_stock_cat_upd_idx',
+            ),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -54,6 +90,32 @@ class Product(models.Model):
     
     def __str__(self):
         return self.name
+    
+    def image_srcset(self, extension):
+        storage = self.image.storage
+        return ', '.join(
+            f'{storage.url(variant[extension])} {variant["width"]}w'
+            for variant in (self.image_variants.get(size) for size in images.SIZES) if variant
+        )
+    
+    @property
+    def image_srcset_webp(self):
+        return self.image_srcset('webp')
+    
+    @property
+    def image_srcset_jpeg(self):
+        return self.image_srcset('jpeg')
+    
+    def image_variant(self, size):
+        """``{'url': ..., 'width': ..., 'height': ...}`` for one size, falling back to the original image."""
+        variant = self.image_variants.get(size)
+        if variant is None:
+            return {'url': self.image.url if self.image else '', 'width': None, 'height': None}
+        return {'url': self.image.storage.url(variant['jpeg']), 'width': variant['width'], 'height': variant['height']}
+    
+    @property
+    def card_image(self):
+        return self.image_variant('card')
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -88,15 +150,50 @@ class Order(models.Model):
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Lets the sales rollups (store/rollups.py) pick up only changed orders.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized from the items so listings don't have to sum them per row.
+    # Written at checkout and refreshed whenever an OrderItem changes.
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            models.Index(fields=['payment_status', '-created_at'], name='order_payment_created_idx'),
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+            # The dashboard's "Total: high to low" sort.
+            models.Index(fields=['-total', '-id'], name='order_total_idx'),
+        ]
     
     def __str__(self):
         return f'Order #{self.id} - {self.full_name}'
     
     def get_total(self):
-        return sum(item.get_subtotal() for item in self.items.all())
+        return self.total
+    
+    def set_totals(self, lines):
+        """Fill in the totals from ``(quantity, price)`` pairs before saving."""
+        self.subtotal = sum((quantity * price for quantity, price in lines), Decimal('0'))
+        self.total = self.subtotal
+        self.item_count = sum(quantity for quantity, _ in lines)
+    
+    def update_totals(self):
+        """Recompute the totals from the saved items."""
+        totals = self.items.aggregate(
+            subtotal=Sum(F('quantity') * F('price_at_time')),
+            item_count=Sum('quantity'),
+        )
+        self.subtotal = totals['subtotal'] or Decimal('0')
+        self.total = self.subtotal
+        self.item_count = totals['item_count'] or 0
+        Order.objects.filter(pk=self.pk).update(
+            subtotal=self.subtotal, total=self.total, item_count=self.item_count, updated_at=timezone.now(),
+        )
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -109,3 +206,78 @@ class OrderItem(models.Model):
     
     def get_subtotal(self):
         return self.quantity * self.price_at_time
+
+class StockReservation(models.Model):
+    """Units of a product held for an unpaid order until ``expires_at`` (see store/reservations.py)."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            # The sweeper and the units-on-hold count both look up by expiry.
+            models.Index(fields=['expires_at'], name='reservation_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.quantity}x {self.product_id} for order #{self.order_id} until {self.expires_at}'
+
+class CartLine(models.Model):
+    """A logged-in user's cart, one row per product (see store/cart_storage.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='cart_line_user_product_unique'),
+        ]
+    
+    def __str__(self):
+        return f'{self.quantity}x {self.product_id} for {self.user_id}'
+
+class DailySales(models.Model):
+    """Orders placed on one day (in TIME_ZONE), by payment method and status. See store/rollups.py."""
+    date = models.DateField()
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_METHOD_CHOICES)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    orders = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = 'daily sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'payment_method', 'status'], name='daily_sales_unique'),
+        ]
+    
+    def __str__(self):
+        return f'{self.date} {self.payment_method}/{self.status}: {self.orders} orders'
+
+class DailyProductSales(models.Model):
+    """Units and revenue of one product on one day, from orders that count as revenue."""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = 'daily product sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='daily_product_sales_unique'),
+        ]
+    
+    def __str__(self):
+        return f'{self.date} {self.product_id}: {self.units} units'
+
+class RollupWatermark(models.Model):
+    """How far a rollup has read: orders changed after ``value`` are still to do."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f'{self.name} @ {self.value}'
@@ -0,0 +1,167 @@
+"""
+Keyset (cursor) pagination.
+
+``django.core.paginator.Paginator`` runs a ``COUNT(*)`` on every page and an
+``OFFSET`` that gets slower the deeper you go. ``KeysetPaginator`` instead
+remembers the sort key of the last row it showed and asks for the rows that
+come after it, so page N costs the same as page 1.
+
+Cursors are opaque url-safe strings; a missing or malformed cursor, or one
+whose values a row couldn't have (null, out of the column's range), means
+the first page.
+"""
+import base64
+import binascii
+import json
+import math
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# No backend stores integers beyond 64 bits (SQLite's validators don't say so).
+INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+class KeysetPage:
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1], 'next')
+
+    @cached_property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0], 'previous')
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by ``ordering``, which must end in a unique field
+    (``-id`` by default is appended to the model's ``Meta.ordering``).
+    """
+
+    def __init__(self, queryset, per_page, ordering=None, count_limit=None):
+        if ordering is None:
+            ordering = list(queryset.model._meta.ordering) + ['-id']
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        if count_limit is None:
+            count_limit = getattr(settings, 'STORE_CATALOG_COUNT_LIMIT', 1000)
+        self.count_limit = count_limit
+
+    @cached_property
+    def count(self):
+        """
+        Number of matching rows, capped at ``count_limit`` so the query stays
+        cheap on big catalogs; check ``count_is_exact`` before showing it.
+        """
+        queryset = self.queryset.order_by()
+        if self.ordering[0][0] not in queryset.query.annotations:
+            # Walking the ordering index (a covering, in-stock partial index for
+            # the catalog) beats a LIMITed table scan.
+            queryset = queryset.order_by(*self.order_by_fields(self.ordering))
+        return queryset[:self.count_limit + 1].count()
+
+    @property
+    def count_is_exact(self):
+        return self.count <= self.count_limit
+
+    def get_page(self, cursor=None):
+        values, direction = self.decode_cursor(cursor)
+        forward = direction != 'previous'
+        ordering = self.ordering if forward else [(name, not desc) for name, desc in self.ordering]
+
+        queryset = self.queryset.order_by(*self.order_by_fields(ordering))
+        if values is not None:
+            queryset = queryset.filter(self.after(ordering, values))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            return KeysetPage(self, rows, has_next=has_more, has_previous=values is not None)
+        rows.reverse()
+        return KeysetPage(self, rows, has_next=True, has_previous=has_more)
+
+    @staticmethod
+    def order_by_fields(ordering):
+        return [('-' if desc else '') + name for name, desc in ordering]
+
+    @staticmethod
+    def after(ordering, values):
+        """(a, b, c) > (x, y, z), expanded so each column can have its own direction."""
+        clauses = []
+        for i, (name, desc) in enumerate(ordering):
+            clause = {prev_name: values[j] for j, (prev_name, _) in enumerate(ordering[:i])}
+            clause[f'{name}__lt' if desc else f'{name}__gt'] = values[i]
+            clauses.append(Q(**clause))
+        return reduce(or_, clauses)
+
+    def output_field(self, name):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(name)
+
+    def cursor_value(self, obj, name):
+        if name in self.queryset.query.annotations:
+            return getattr(obj, name)
+        return self.output_field(name).value_to_string(obj)
+
+    def cursor_to_python(self, name, value):
+        """A cursor value as the column's type, or ``ValueError``/``ValidationError``."""
+        field = self.output_field(name)
+        value = field.to_python(value)
+        # The sort columns aren't nullable, and a bound the database can't
+        # store (an id of 1e30, an 11-digit price) fails in the query.
+        if value is None or (isinstance(value, float) and not math.isfinite(value)):
+            raise ValueError
+        if isinstance(value, int) and value not in INTEGER_RANGE:
+            raise ValueError
+        field.run_validators(value)
+        return value
+
+    def encode_cursor(self, obj, direction):
+        values = [self.cursor_value(obj, name) for name, _ in self.ordering]
+        payload = json.dumps([direction[0], values], separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, 'next'
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.cursor_to_python(name, value) for (name, _), value in zip(self.ordering, raw_values)
+            ]
+        except (binascii.Error, ValueError, TypeError, OverflowError, ValidationError):
+            return None, 'next'
+        return values, 'previous' if direction == 'p' else 'next'
@@ -0,0 +1,136 @@
+"""
+Time-limited stock holds for unpaid UPI orders.
+
+Checkout takes every order's units out of stock as it places the order
+(store/checkout.py), UPI orders included, so nothing can sell out from
+under a shopper while they pay. Left at that, an order whose payment never
+comes would keep its units forever. Each item of an order placed in
+``payment_pending`` therefore gets a ``StockReservation`` recording the
+units it holds and when the hold runs out: ``STORE_RESERVATION_TTL``
+seconds after checkout (30 minutes by default).
+
+* Submitting the transaction ID settles the holds: the sale stands and the
+  rows go.
+* Cancelling the order from the dashboard or the Django admin releases
+  them: the units go back to stock (``status_changed()``).
+* ``release_expired()`` (``python manage.py release_expired_reservations``,
+  from cron) cancels the orders still unpaid when their holds run out and
+  returns their units. It reads the expired holds in batches through the
+  index on ``expires_at``. Each batch is one UPDATE of the orders, one of
+  the products and one DELETE of the holds.
+
+``stock`` stays the number of units for sale: held units are already out
+of it. ``units_on_hold()`` says how many of those are only on hold.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Min, Sum, Value, When
+from django.utils import timezone
+
+from . import catalog_cache
+from .models import Order, Product, StockReservation
+
+# Holds looked at per batch; an order's holds are always handled together.
+BATCH_SIZE = 1000
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'STORE_RESERVATION_TTL', 30 * 60))
+
+
+def hold(order, quantities):
+    """Hold ``quantities`` (``{product id: quantity}``) for ``order``, just placed."""
+    expires_at = timezone.now() + ttl()
+    StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items()
+    ])
+
+
+def expires_at(order):
+    return StockReservation.objects.filter(order=order).aggregate(expires_at=Min('expires_at'))['expires_at']
+
+
+def settle(order_ids):
+    """The orders were paid for: drop their holds and keep the sale."""
+    StockReservation.objects.filter(order_id__in=order_ids).delete()
+
+
+def _restock(order_ids):
+    """Put the units held for ``order_ids`` back in stock with one UPDATE; returns how many."""
+    units = defaultdict(int)
+    held = StockReservation.objects.filter(order_id__in=order_ids).values_list('product_id', 'quantity')
+    for product_id, quantity in held:
+        units[product_id] += quantity
+    if units:
+        quantity_case = Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in units.items()],
+            output_field=IntegerField(),
+        )
+        Product.objects.filter(pk__in=units).update(stock=F('stock') + quantity_case, updated_at=timezone.now())
+        # Products back in stock reappear in listings.
+        transaction.on_commit(catalog_cache.invalidate)
+    return sum(units.values())
+
+
+def release(order_ids):
+    """The orders were cancelled: return their held units to stock. Returns how many."""
+    with transaction.atomic():
+        units = _restock(order_ids)
+        StockReservation.objects.filter(order_id__in=order_ids).delete()
+    return units
+
+
+def status_changed(order, previous_status):
+    """
+    Follow up a change of ``order``'s status, already saved, from staff:
+    leaving ``payment_pending`` ends its holds. Cancelling gives the held
+    units back; anything else keeps the sale.
+    """
+    if previous_status != 'payment_pending' or order.status == previous_status:
+        return
+    if order.status == 'cancelled':
+        release([order.pk])
+    else:
+        settle([order.pk])
+
+
+def release_expired(now=None, batch_size=BATCH_SIZE):
+    """
+    Cancel the orders still unpaid whose holds have run out and return
+    their units. Returns ``(orders cancelled, units returned)``.
+    """
+    now = now or timezone.now()
+    cancelled = returned = 0
+    while True:
+        with transaction.atomic():
+            # In expiry order, so the index on expires_at answers it; an order
+            # cut off by the limit still has all its holds handled below.
+            order_ids = list(dict.fromkeys(
+                StockReservation.objects.filter(expires_at__lte=now).order_by('expires_at')
+                .values_list('order_id', flat=True)[:batch_size]
+            ))
+            if not order_ids:
+                break
+            unpaid = list(
+                Order.objects.select_for_update().filter(pk__in=order_ids, status='payment_pending').order_by()
+                .values_list('pk', flat=True)
+            )
+            if unpaid:
+                Order.objects.filter(pk__in=unpaid).update(status='cancelled', payment_status='failed', updated_at=now)
+                returned += _restock(unpaid)
+            # Orders paid for in the meantime just lose their holds.
+            StockReservation.objects.filter(order_id__in=order_ids).delete()
+        cancelled += len(unpaid)
+    return cancelled, returned
+
+
+def current_holds(now=None):
+    return StockReservation.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def units_on_hold(now=None):
+    return current_holds(now).aggregate(units=Sum('quantity'))['units'] or 0
@@ -0,0 +1,147 @@
+"""
+Daily sales rollups.
+
+``DailySales`` holds, per day, payment method and status, the number of
+orders, items and their revenue; ``DailyProductSales`` holds, per day and
+product, the units sold and their revenue in orders that count as revenue
+(``REVENUE_STATUSES``). Reports read these tables, whose size grows with
+the number of days rather than the number of orders.
+
+``update()`` keeps them current incrementally. It finds the days of the
+orders changed since the stored watermark (``Order.updated_at``, indexed),
+then recomputes those whole days from their orders with a grouped query
+per batch of days. Recomputing whole days keeps it simple and correct
+when an order changes status or payment method, moving it from one row to
+another. ``rebuild()`` throws the tables away and recomputes every day.
+Deleted orders aren't visible to ``update()``, so a signal re-rolls their
+days with ``reroll()``, once per transaction (see store/signals.py).
+
+Days are calendar days in ``TIME_ZONE``.
+"""
+import itertools
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, DailySales, Order, OrderItem, RollupWatermark
+
+WATERMARK = 'sales'
+# Orders that count as revenue: COD orders once placed, UPI orders once the
+# transaction ID is in.
+REVENUE_STATUSES = ('confirmed', 'shipped', 'completed')
+# Each run looks this far before the watermark again, for orders saved just
+# before the last run whose transactions hadn't committed yet.
+OVERLAP = timedelta(minutes=5)
+DAYS_PER_BATCH = 31
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def on_days(days, field='created_at'):
+    """``Q`` for ``field`` falling on any of ``days``, as index-friendly ranges of consecutive days."""
+    ranges = []
+    for _, run in itertools.groupby(enumerate(sorted(days)), lambda pair: pair[1] - timedelta(days=pair[0])):
+        run = [day for _, day in run]
+        ranges.append(Q(**{f'{field}__gte': day_start(run[0]), f'{field}__lt': day_start(run[-1] + timedelta(days=1))}))
+    return Q(*ranges, _connector=Q.OR)
+
+
+def rollup_days(days):
+    """Recompute the rollup rows of ``days`` from their orders."""
+    days = sorted(set(days))
+    for start in range(0, len(days), DAYS_PER_BATCH):
+        batch = days[start:start + DAYS_PER_BATCH]
+        with transaction.atomic():
+            DailySales.objects.filter(date__in=batch).delete()
+            DailyProductSales.objects.filter(date__in=batch).delete()
+            sales = (
+                Order.objects.filter(on_days(batch)).order_by()
+                .values(day=TruncDate('created_at'), method=F('payment_method'), state=F('status'))
+                .annotate(orders=Count('id'), items=Sum('item_count'), revenue=Sum('total'))
+            )
+            DailySales.objects.bulk_create([
+                DailySales(date=row['day'], payment_method=row['method'], status=row['state'],
+                           orders=row['orders'], items=row['items'] or 0, revenue=row['revenue'] or 0)
+                for row in sales
+            ])
+            products = (
+                OrderItem.objects.filter(on_days(batch, 'order__created_at'), order__status__in=REVENUE_STATUSES)
+                .order_by().values(day=TruncDate('order__created_at'), product_key=F('product_id'))
+                .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price_at_time')))
+            )
+            DailyProductSales.objects.bulk_create([
+                DailyProductSales(date=row['day'], product_id=row['product_key'], units=row['units'],
+                                  revenue=row['revenue'])
+                for row in products
+            ], batch_size=1000)
+
+
+def all_days():
+    bounds = Order.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None:
+        return []
+    first = timezone.localdate(bounds['first'])
+    last = timezone.localdate(bounds['last'])
+    return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+
+def update():
+    """Bring the rollups up to date; returns how many days were recomputed."""
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+        # Serialize runs (a no-op on SQLite, which serializes writers anyway).
+        watermark = RollupWatermark.objects.select_for_update().get(pk=watermark.pk)
+        now = timezone.now()
+        if watermark.value is None:
+            DailySales.objects.all().delete()
+            DailyProductSales.objects.all().delete()
+            days = all_days()
+        else:
+            days = list(
+                Order.objects.filter(updated_at__gt=watermark.value - OVERLAP).order_by()
+                .values_list(TruncDate('created_at'), flat=True).distinct()
+            )
+        rollup_days(days)
+        watermark.value = now
+        watermark.save(update_fields=['value'])
+    return len(days)
+
+
+def reroll(days):
+    """Recompute ``days`` now (those of deleted orders), serialized with ``update()``."""
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+        # Before the first update() there is nothing to correct: it rolls up every day.
+        if watermark is not None and watermark.value is not None:
+            rollup_days(days)
+
+
+def rebuild():
+    RollupWatermark.objects.filter(name=WATERMARK).update(value=None)
+    return update()
+
+
+def as_of():
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list('value', flat=True).first()
+
+
+def daily_revenue(start, end):
+    """``[(date, orders, revenue)]`` of orders counting as revenue, ``start`` to ``end`` inclusive."""
+    return list(
+        DailySales.objects.filter(date__gte=start, date__lte=end, status__in=REVENUE_STATUSES)
+        .values('date').annotate(orders=Sum('orders'), revenue=Sum('revenue')).order_by('date')
+        .values_list('date', 'orders', 'revenue')
+    )
+
+
+def best_sellers(start, end, limit=5):
+    return list(
+        DailyProductSales.objects.filter(date__gte=start, date__lte=end)
+        .values('product_id', 'product__name', 'product__slug')
+        .annotate(units=Sum('units'), revenue=Sum('revenue')).order_by('-revenue', 'product_id')[:limit]
+    )
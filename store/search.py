@@ -0,0 +1,212 @@
+"""
+Full-text product search.
+
+The storefront talks to a search backend instead of running
+``name__icontains`` scans. The backend is picked from the database vendor
+(or the ``STORE_SEARCH_BACKEND`` setting):
+
+* PostgreSQL: a trigger-maintained ``tsvector`` column with a GIN index,
+  ranked with ``SearchRank``.
+* SQLite: an external-content FTS5 table kept in sync by triggers, ranked
+  with bm25.
+* Anything else: the old ``icontains`` filter.
+
+Every backend returns the queryset filtered and annotated with
+``search_rank`` (higher is better).
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connections, DatabaseError
+from django.db.models import F, Q, Value, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class BaseSearchBackend:
+    vendor = None
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        """Create (or repair) the index structures. Must be idempotent."""
+
+    def rebuild(self):
+        """Re-index every product from scratch."""
+
+    def search(self, queryset, text):
+        raise NotImplementedError
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Portable fallback: unindexed substring match, no relevance."""
+
+    def search(self, queryset, text):
+        return queryset.filter(
+            Q(name__icontains=text) | Q(description__icontains=text)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    vendor = 'postgresql'
+    config = 'english'
+
+    VECTOR_SQL = (
+        "setweight(to_tsvector('english', coalesce({row}name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce({row}description, '')), 'B')"
+    )
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE OR REPLACE FUNCTION store_product_search_vector_update() '
+                'RETURNS trigger AS $$ BEGIN '
+                'NEW.search_vector := ' + self.VECTOR_SQL.format(row='NEW.') + '; '
+                'RETURN NEW; END $$ LANGUAGE plpgsql'
+            )
+            cursor.execute(
+                'DROP TRIGGER IF EXISTS store_product_search_vector_trigger ON store_product'
+            )
+            cursor.execute(
+                'CREATE TRIGGER store_product_search_vector_trigger '
+                'BEFORE INSERT OR UPDATE OF name, description ON store_product '
+                'FOR EACH ROW EXECUTE FUNCTION store_product_search_vector_update()'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS store_product_search_vector_gin '
+                'ON store_product USING GIN (search_vector)'
+            )
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE store_product SET search_vector = ' + self.VECTOR_SQL.format(row='')
+            )
+
+    def search(self, queryset, text):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(text, config=self.config, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    vendor = 'sqlite'
+    table = 'store_product_fts'
+
+    # Django rebuilds tables on some SQLite schema changes, which drops
+    # triggers, so everything here is safe to re-run after each migrate.
+    SCHEMA = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts USING fts5("
+        "name, description, content='store_product', content_rowid='id', "
+        "tokenize='porter unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS store_product_fts_ai AFTER INSERT ON store_product BEGIN "
+        "INSERT INTO store_product_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS store_product_fts_ad AFTER DELETE ON store_product BEGIN "
+        "INSERT INTO store_product_fts(store_product_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS store_product_fts_au "
+        "AFTER UPDATE OF name, description ON store_product BEGIN "
+        "INSERT INTO store_product_fts(store_product_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO store_product_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END",
+        # Name matches weigh ten times as much as description matches.
+        "INSERT INTO store_product_fts(store_product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    ]
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            for statement in self.SCHEMA:
+                cursor.execute(statement)
+
+    def is_installed(self):
+        return self.table in self.connection.introspection.table_names()
+
+    def rebuild(self):
+        self.install()
+        with self.connection.cursor() as cursor:
+            cursor.execute("INSERT INTO store_product_fts(store_product_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def match_expression(text):
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        # Quote every token so user input can never be parsed as FTS5 syntax;
+        # the last one is a prefix match so partially typed words still hit.
+        terms = ['"%s"' % token for token in tokens]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, queryset, text):
+        match = self.match_expression(text)
+        if match is None:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                '%s.rowid = store_product.id' % self.table,
+                '%s MATCH %%s' % self.table,
+            ],
+            params=[match],
+        ).annotate(search_rank=RawSQL('-%s.rank' % self.table, (), output_field=FloatField()))
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteFTSBackend,
+}
+
+_backends = {}
+
+
+def get_search_backend(using='default'):
+    backend = _backends.get(using)
+    if backend is not None:
+        return backend
+
+    connection = connections[using]
+    backend_path = getattr(settings, 'STORE_SEARCH_BACKEND', None)
+    if backend_path:
+        backend = import_string(backend_path)(connection)
+    else:
+        backend_class = VENDOR_BACKENDS.get(connection.vendor, LikeSearchBackend)
+        backend = backend_class(connection)
+        if isinstance(backend, SQLiteFTSBackend) and not backend.is_installed():
+            # SQLite builds without FTS5 (or a database that has not been
+            # migrated yet); don't cache so we pick FTS up once it exists.
+            return LikeSearchBackend(connection)
+
+    _backends[using] = backend
+    return backend
+
+
+def search_products(queryset, text):
+    """Filter ``queryset`` down to products matching ``text``, best first."""
+    backend = get_search_backend(queryset.db)
+    return backend.search(queryset, text).order_by('-search_rank', *queryset.model._meta.ordering, '-id')
+
+
+def install_search_schema(using='default'):
+    connection = connections[using]
+    backend_class = VENDOR_BACKENDS.get(connection.vendor)
+    if backend_class is None:
+        return
+    try:
+        backend_class(connection).install()
+    except DatabaseError:
+        logger.warning('Could not install %s product search schema', connection.vendor, exc_info=True)
@@ -0,0 +1,82 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalog_cache, images, rollups, typeahead
+from .cart_storage import merge_anonymous_cart
+from .models import Category, Order, OrderItem, Product
+
+
+def install_search_schema(sender, using, **kwargs):
+    from .search import install_search_schema
+    install_search_schema(using)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def update_order_totals(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Don't load the order just to update it (it may be mid-cascade-delete).
+    Order(pk=instance.order_id).update_totals()
+
+
+class DeletedOrderDays:
+    """The days of the orders deleted in a transaction, re-rolled once it commits."""
+
+    def __init__(self):
+        self.days = set()
+
+    def __call__(self):
+        rollups.reroll(self.days)
+
+
+@receiver(post_delete, sender=Order)
+def rollup_deleted_order_day(sender, instance, using, **kwargs):
+    # The incremental rollup only sees orders that still exist. Deleting many
+    # orders (a queryset or the admin's bulk delete) re-rolls each day once.
+    connection = transaction.get_connection(using)
+    pending = getattr(connection, 'deleted_order_days', None)
+    # Registered on this transaction still? A commit runs it, a rollback drops it.
+    if pending is not None and any(entry[1] is pending for entry in connection.run_on_commit):
+        pending.days.add(timezone.localdate(instance.created_at))
+        return
+    pending = connection.deleted_order_days = DeletedOrderDays()
+    pending.days.add(timezone.localdate(instance.created_at))
+    transaction.on_commit(pending, using=using)
+
+
+@receiver(post_save, sender=Product)
+def build_image_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.process_product_image(instance)
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        pk, name, slug = instance.pk, instance.name, instance.slug
+        transaction.on_commit(lambda: typeahead.product_saved(pk, name, slug))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: typeahead.product_deleted(pk))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Wait for the commit so a concurrent request can't re-cache the old rows.
+    transaction.on_commit(catalog_cache.invalidate)
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None:
+        merge_anonymous_cart(request, user)
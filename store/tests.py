@@ -1,3 +1,1523 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 
-# Create your tests here.
+import base64
+import csv
+import io
+import json
+import re
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.test import Client, LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.text import slugify
+from PIL import Image
+
+from . import (
+    async_views, catalog_cache, catalog_io, dashboard, images, loadtest, metrics, order_export, reservations, rollups,
+    typeahead, views,
+)
+from .cart import Cart, to_paise
+from .cart_storage import SignedCookieCartStorage
+from .checkout import StockConflict, place_order
+from .models import CartLine, Category, DailyProductSales, DailySales, Order, OrderItem, Product, StockReservation
+from .pagination import KeysetPaginator
+from .management.commands.check_static_assets import static_references
+from .search import get_search_backend, search_products
+from .staticfiles import IMMUTABLE_CACHE_CONTROL, minify_css
+
+
+class StoreTestCase(TestCase):
+    def setUp(self):
+        # Catalog cache entries would otherwise leak from one test into the next.
+        cache.clear()
+        typeahead.reset()
+
+
+class ProductSearchTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Trading Cards')
+        cls.pikachu = Product.objects.create(
+            name='Pikachu Holo Card', description='Base set.', price=10, stock=3, category=cls.category,
+        )
+        cls.box = Product.objects.create(
+            name='Booster Box', description='Chance of a pikachu holo inside.', price=99, stock=1,
+            category=cls.category,
+        )
+        cls.other = Product.objects.create(
+            name='Denim Jacket', description='Classic.', price=50, stock=5, category=cls.category,
+        )
+
+    def search(self, text):
+        return list(search_products(Product.objects.all(), text))
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('pikachu'), [self.pikachu, self.box])
+
+    def test_prefix_and_multi_word_queries(self):
+        self.assertEqual(self.search('pika'), [self.pikachu, self.box])
+        self.assertEqual(self.search('denim jack'), [self.other])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.other.name = 'Pikachu Jacket'
+        self.other.save()
+        self.assertIn(self.other, self.search('pikachu'))
+
+        self.box.delete()
+        self.assertEqual(self.search('booster'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"pikachu" -('), [self.pikachu, self.box])
+        self.assertEqual(self.search('***'), [])
+
+    def test_product_list_search(self):
+        response = self.client.get(reverse('product_list'), {'search': 'holo'})
+        self.assertEqual(list(response.context['page_obj']), [self.pikachu, self.box])
+
+
+class KeysetPaginationTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Books')
+        Product.objects.bulk_create([
+            Product(name=f'Book {i}', slug=f'book-{i}', description='', price=1, stock=1, category=category)
+            for i in range(25)
+        ])
+        # Give pairs of products identical timestamps so the id tiebreaker matters.
+        now = timezone.now()
+        for i, product in enumerate(Product.objects.order_by('id')):
+            Product.objects.filter(pk=product.pk).update(created_at=now - timedelta(minutes=i // 2))
+        cls.expected = list(Product.objects.order_by('-created_at', '-id'))
+
+    def test_walks_forward_and_back_without_gaps(self):
+        paginator = KeysetPaginator(Product.objects.all(), 10)
+        pages = [paginator.get_page()]
+        while pages[-1].next_cursor:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([obj for page in pages for obj in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertIsNone(first.previous_cursor)
+
+    def test_bad_cursor_is_first_page(self):
+        paginator = KeysetPaginator(Product.objects.all(), 10)
+        self.assertEqual(list(paginator.get_page('not-a-cursor!')), self.expected[:10])
+
+    def test_crafted_cursor_values_are_first_page(self):
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps(['n', values]).encode()).decode().rstrip('=')
+
+        crafted = {
+            '': [[None, None], ['2026-01-01T00:00:00+00:00', 1e30], ['2026-01-01T00:00:00+00:00', None]],
+            'book': [[None, None, None], [1e400, '2026-01-01T00:00:00+00:00', 1], [0.5, None, 1],
+                     [0.5, '2026-01-01T00:00:00+00:00', 2 ** 70]],
+        }
+        for search, cursors in crafted.items():
+            first = self.client.get(reverse('product_list'), {'search': search}).context['page_obj']
+            for values in cursors:
+                response = self.client.get(reverse('product_list'), {'search': search, 'cursor': cursor(values)})
+                self.assertEqual(response.status_code, 200, values)
+                self.assertEqual(list(response.context['page_obj']), list(first), values)
+                self.assertFalse(response.context['page_obj'].has_previous)
+
+    def test_capped_count(self):
+        self.assertEqual(KeysetPaginator(Product.objects.all(), 10, count_limit=100).count, 25)
+        paginator = KeysetPaginator(Product.objects.all(), 10, count_limit=20)
+        self.assertFalse(paginator.count_is_exact)
+
+    def test_deep_pages_use_no_offset(self):
+        page = self.client.get(reverse('product_list')).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product_list'), {'cursor': page.next_cursor})
+        self.assertEqual(list(response.context['page_obj']), self.expected[12:24])
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+
+
+class QueryPlanTests(StoreTestCase):
+    """
+    EXPLAIN every storefront query that touches the product and order tables
+    on a seeded catalog and fail if any of them falls back to a full scan.
+    """
+
+    FULL_SCAN_PATTERNS = {
+        'sqlite': re.compile(r'\bSCAN (store_product|store_order)\b(?! USING)'),
+        'postgresql': re.compile(r'Seq Scan on (store_product|store_order)\b'),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper', password='secret-pass-123')
+        cls.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        categories = Category.objects.bulk_create([
+            Category(name=f'Category {i}', slug=f'category-{i}') for i in range(10)
+        ])
+        Product.objects.bulk_create([
+            Product(
+                name=f'Product {i}', slug=f'product-{i}', description='', price=10,
+                stock=i % 5, category=categories[i % 10],
+            )
+            for i in range(3000)
+        ])
+        customers = [cls.user] + User.objects.bulk_create([User(username=f'customer-{i}') for i in range(50)])
+        Order.objects.bulk_create([
+            Order(
+                user=customers[i % len(customers)], full_name='Customer', email='c@example.com',
+                phone='1', address='1 Street', city='Pune', postal_code='411001', country='India',
+                status=['confirmed', 'payment_pending', 'shipped'][i % 3],
+            )
+            for i in range(2000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertNoFullScans(self, url, data=None):
+        """The plans of the view's product and order queries, after checking them."""
+        pattern = self.FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f'No plan checks for {connection.vendor}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+
+        explain = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        plans = []
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not re.search(r'FROM "store_(product|order)"', sql):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(explain + sql)
+                plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+            self.assertIsNone(pattern.search(plan), f'Full table scan for {url}:\n{sql}\n{plan}')
+            plans.append(plan)
+        self.assertGreater(len(plans), 0)
+        return plans
+
+    def test_home(self):
+        self.assertNoFullScans(reverse('home'))
+
+    def test_product_list(self):
+        self.assertNoFullScans(reverse('product_list'))
+
+    def test_product_list_category(self):
+        self.assertNoFullScans(reverse('product_list'), {'category': 'category-3'})
+
+    def test_product_list_next_page(self):
+        page = self.client.get(reverse('product_list'), {'category': 'category-3'}).context['page_obj']
+        self.assertNoFullScans(reverse('product_list'), {'category': 'category-3', 'cursor': page.next_cursor})
+
+    def test_product_detail(self):
+        self.assertNoFullScans(reverse('product_detail', args=['product-42']))
+
+    def test_my_orders(self):
+        self.client.force_login(self.user)
+        self.assertNoFullScans(reverse('my_orders'))
+
+    def test_every_index_is_used(self):
+        # Each product index, and the order index for the dashboard's sort
+        # by total, serves one of these pages; an unused one only slows writes.
+        self.client.force_login(self.staff)
+        plans = (
+            self.assertNoFullScans(reverse('product_list'))
+            + self.assertNoFullScans(reverse('product_list'), {'category': 'category-3'})
+            + self.assertNoFullScans(reverse('admin_dashboard'), {'o-sort': '-total'})
+        )
+        for name in [index.name for index in Product._meta.indexes] + ['order_total_idx']:
+            self.assertTrue(any(name in plan for plan in plans), f'{name} unused:\n' + '\n'.join(plans))
+
+
+def make_order(user=None, **kwargs):
+    return Order(
+        user=user, full_name='Customer', email='c@example.com', phone='1', address='1 Street',
+        city='Pune', postal_code='411001', country='India', **kwargs,
+    )
+
+
+class CheckoutTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper', password='secret-pass-123')
+        category = Category.objects.create(name='Cards')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Card {i}', slug=f'card-{i}', description='', price=10 + i, stock=5, category=category)
+            for i in range(10)
+        ])
+
+    def test_query_count_does_not_grow_with_cart(self):
+        for size in (1, 10):
+            lines = [(product, 2, product.price) for product in self.products[:size]]
+            with self.assertNumQueries(5):  # savepoint, order, stock, items, release
+                order = place_order(make_order(self.user), lines)
+            self.assertEqual(order.items.count(), size)
+        self.assertEqual(
+            list(Product.objects.order_by('id').values_list('stock', flat=True)),
+            [1] + [3] * 9,
+        )
+
+    def test_conflict_writes_nothing(self):
+        first, second = self.products[:2]
+        Product.objects.filter(pk=second.pk).update(stock=1)
+        with self.assertRaises(StockConflict) as raised:
+            place_order(make_order(self.user), [(first, 2, first.price), (second, 2, second.price)])
+
+        self.assertEqual(raised.exception.shortages, [('Card 1', 2, 1)])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=first.pk).stock, 5)
+
+    def test_checkout_view_reports_conflict(self):
+        product = self.products[0]
+        self.client.force_login(self.user)
+        self.client.post(reverse('add_to_cart', args=[product.id]), {'quantity': 3})
+        Product.objects.filter(pk=product.pk).update(stock=2)
+
+        response = self.client.post(reverse('checkout'), {
+            'full_name': 'Customer', 'email': 'c@example.com', 'phone': '1', 'address': '1 Street',
+            'city': 'Pune', 'postal_code': '411001', 'country': 'India', 'payment_method': 'cod',
+        })
+        self.assertRedirects(response, reverse('cart'))
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderTotalsTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Cards')
+        cls.card = Product.objects.create(name='Card', description='', price=10, stock=50, category=category)
+        cls.box = Product.objects.create(name='Box', description='', price=99, stock=50, category=category)
+
+    def test_totals_written_at_checkout(self):
+        order = place_order(make_order(), [(self.card, 3, self.card.price), (self.box, 1, self.box.price)])
+        order.refresh_from_db()
+        self.assertEqual((order.subtotal, order.total, order.item_count), (129, 129, 4))
+
+    def test_totals_follow_item_changes(self):
+        order = place_order(make_order(), [(self.card, 3, self.card.price)])
+        item = OrderItem.objects.create(order=order, product=self.box, quantity=2, price_at_time=50)
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (130, 5))
+
+        item.quantity = 1
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (80, 4))
+
+        order.items.filter(product=self.card).delete()
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (50, 1))
+
+
+class CartStorageTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Cards')
+        cls.product = Product.objects.create(name='Pikachu', slug='pikachu', description='', price=10, stock=9, category=category)
+        cls.user = User.objects.create_user('shopper', password='secret-pass-123')
+
+    def add(self, quantity, product=None):
+        return self.client.post(reverse('add_to_cart', args=[(product or self.product).id]), {'quantity': quantity})
+
+    def test_browsing_never_writes_a_session(self):
+        with CaptureQueriesContext(connection) as queries:
+            for url in (reverse('home'), reverse('product_list'), reverse('product_detail', args=['pikachu'])):
+                response = self.client.get(url)
+                self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse([q for q in queries if 'django_session' in q['sql']])
+
+    def test_anonymous_cart_lives_in_a_signed_cookie(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.add(2)
+            self.add(3)
+        self.assertFalse([q for q in queries if 'django_session' in q['sql'] or 'cartline' in q['sql']])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+        self.assertContains(self.client.get(reverse('home')), '<span class="cart-badge">5</span>', html=True)
+
+        response = self.client.post(reverse('update_cart', args=[self.product.id]), {'quantity': 0})
+        self.assertEqual(response.cookies[settings.STORE_CART_COOKIE_NAME].value, '')
+
+    def test_tampered_cookie_is_ignored(self):
+        self.add(2)
+        name = settings.STORE_CART_COOKIE_NAME
+        self.client.cookies[name] = self.client.cookies[name].value.replace(':2:', ':9:', 1)
+        self.assertEqual(self.client.get(reverse('cart')).context['cart'].get_total_quantity(), 0)
+
+    def test_full_cookie_cart(self):
+        with mock.patch.object(SignedCookieCartStorage, 'max_bytes', 20):
+            response = self.add(1)
+        self.assertNotIn(settings.STORE_CART_COOKIE_NAME, response.cookies)
+        self.assertContains(self.client.get(reverse('home')), 'Your cart is full')
+
+    @override_settings(STORE_CART_STORAGE='store.cart_storage.SessionCartStorage')
+    def test_session_storage(self):
+        self.add(2)
+        self.add(3)
+        self.assertEqual(self.client.session['cart_quantity'], 5)
+        self.assertContains(self.client.get(reverse('home')), '<span class="cart-badge">5</span>', html=True)
+
+        self.client.post(reverse('update_cart', args=[self.product.id]), {'quantity': 0})
+        self.assertEqual(self.client.session['cart_quantity'], 0)
+
+    def test_login_merges_anonymous_cart_into_cart_lines(self):
+        other = Product.objects.create(name='Eevee', slug='eevee', description='', price=5, stock=9,
+                                       category=self.product.category)
+        CartLine.objects.create(user=self.user, product=self.product, quantity=1, price=10)
+        self.add(2)
+        self.add(1, product=other)
+
+        response = self.client.post(reverse('login'), {'username': 'shopper', 'password': 'secret-pass-123'})
+        self.assertEqual(response.cookies[settings.STORE_CART_COOKIE_NAME].value, '')
+        self.assertEqual(
+            dict(self.user.cart_lines.values_list('product__slug', 'quantity')),
+            {'pikachu': 3, 'eevee': 1},
+        )
+
+        # The cart now follows the user to a fresh client.
+        self.client.logout()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('cart')).context['cart'].get_total_quantity(), 4)
+
+    def test_user_cart_writes_only_changed_lines(self):
+        self.client.force_login(self.user)
+        self.add(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('update_cart', args=[self.product.id]), {'quantity': 4})
+        writes = [q['sql'] for q in queries if 'store_cartline' in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(self.user.cart_lines.get().quantity, 4)
+
+
+class CartSnapshotTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Cards')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Card {i}', slug=f'card-{i}', description='', price=Decimal('19.99') + i, stock=9,
+                    category=category)
+            for i in range(3)
+        ])
+
+    def make_cart(self, lines):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        with override_settings(STORE_CART_STORAGE='store.cart_storage.SessionCartStorage'):
+            cart = Cart(request)
+        for product, quantity in lines:
+            cart.add(product, quantity)
+        return cart, request.session
+
+    def test_totals_in_one_query(self):
+        cart, session = self.make_cart([(self.products[0], 2), (self.products[1], 1), (self.products[2], 3)])
+        with self.assertNumQueries(1):
+            items = list(cart)
+            self.assertEqual(cart.get_total_price(), Decimal('2') * Decimal('19.99') + Decimal('20.99')
+                             + 3 * Decimal('21.99'))
+            self.assertEqual(len(cart), 6)
+            list(cart)
+        self.assertEqual([item.total_price for item in items], [Decimal('39.98'), Decimal('20.99'), Decimal('65.97')])
+        self.assertEqual(items[0].product.category.name, 'Cards')
+
+        # Iterating no longer leaks products and Decimals into the session.
+        self.assertEqual(session['cart'][str(self.products[0].id)], {'quantity': 2, 'price': '19.99'})
+
+    def test_items_are_immutable(self):
+        cart, _ = self.make_cart([(self.products[0], 1)])
+        item = next(iter(cart))
+        with self.assertRaises(AttributeError):
+            item.quantity = 5
+        with self.assertRaises(AttributeError):
+            item.extra = True
+
+    def test_changes_and_removed_products(self):
+        cart, _ = self.make_cart([(self.products[0], 1), (self.products[1], 1)])
+        self.assertEqual(cart.get_total_price(), Decimal('40.98'))
+        cart.add(self.products[0], 4, update_quantity=True)
+        self.assertEqual(cart.get_total_price(), Decimal('100.95'))
+
+        self.products[1].delete()
+        cart.save()
+        self.assertEqual([item.product for item in cart], [self.products[0]])
+        self.assertEqual(len(cart), 4)
+
+    def test_to_paise(self):
+        self.assertEqual([to_paise(value) for value in ('49.90', '5', '0.5', Decimal('1234.56'))], [4990, 500, 50, 123456])
+
+
+def make_image(width, height, format='JPEG', **options):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'teal').save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+class ProductImageTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cards')
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create(self, data, name='card.jpg', **kwargs):
+        return Product.objects.create(
+            name='Pikachu', description='', price=10, stock=3, category=self.category,
+            image=SimpleUploadedFile(name, data), **kwargs,
+        )
+
+    def test_upload_builds_derivatives(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera Maker'
+        product = self.create(make_image(2000, 1000, exif=exif))
+        variants = Product.objects.get(pk=product.pk).image_variants
+
+        self.assertEqual(variants['source'], product.image.name)
+        self.assertEqual(
+            [(variants[size]['width'], variants[size]['height']) for size in images.SIZES],
+            [(400, 200), (800, 400), (1600, 800)],
+        )
+        storage = product.image.storage
+        with storage.open(variants['card']['webp']) as webp, storage.open(variants['card']['jpeg']) as jpeg:
+            webp_image, jpeg_image = Image.open(webp), Image.open(jpeg)
+            self.assertEqual((webp_image.format, jpeg_image.format), ('WEBP', 'JPEG'))
+            self.assertFalse(jpeg_image.getexif())
+            self.assertNotIn('exif', webp_image.info)
+
+        self.assertEqual(
+            product.image_srcset_webp,
+            ', '.join(f'{storage.url(variants[size]["webp"])} {width}w' for size, width in images.SIZES.items()),
+        )
+
+    def test_small_images_are_not_upscaled(self):
+        product = self.create(make_image(300, 400, format='PNG'), name='small.png')
+        self.assertEqual({product.image_variants[size]['width'] for size in images.SIZES}, {300})
+
+    def test_replacing_the_image_replaces_derivatives(self):
+        product = self.create(make_image(900, 900))
+        old_names = images.variant_names(product.image_variants)
+        product.image = SimpleUploadedFile('other.jpg', make_image(500, 500))
+        product.save()
+
+        storage = product.image.storage
+        self.assertFalse([name for name in old_names if storage.exists(name)])
+        self.assertTrue(all(storage.exists(name) for name in images.variant_names(product.image_variants)))
+
+    def test_listing_markup(self):
+        product = self.create(make_image(900, 1200))
+        response = self.client.get(reverse('product_list'))
+        self.assertContains(response, f'srcset="{product.image_srcset_webp}"')
+        self.assertContains(response, 'width="400" height="533"')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_backfill_command(self):
+        product = self.create(make_image(900, 900))
+        Product.objects.filter(pk=product.pk).update(image_variants={})
+        call_command('build_image_derivatives', workers=0, stdout=io.StringIO())
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['card']['width'], 400)
+
+
+class StaticAssetsTests(StoreTestCase):
+    CSS = 'css/main.0123456789ab.css'
+
+    def setUp(self):
+        super().setUp()
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.static_root = Path(static_root.name)
+        settings_override = override_settings(STATIC_ROOT=static_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write_manifest(self, paths):
+        for hashed in paths.values():
+            (self.static_root / hashed).parent.mkdir(parents=True, exist_ok=True)
+            (self.static_root / hashed).write_text('body{color:red}')
+        (self.static_root / 'staticfiles.json').write_text(json.dumps({'paths': paths, 'version': '1.1', 'hash': 'x'}))
+
+    def test_minify_css(self):
+        self.assertEqual(
+            minify_css('/*! licence */\n/* note */\n.card  >  a :hover ,\nb {\n  content: " ; { ";\n'
+                       '  width: calc(100% - 2px) ;\n  background: url(a b.png);\n}\n'),
+            '/*! licence */.card>a :hover,b{content:" ; { ";width:calc(100% - 2px);background:url(a b.png)}',
+        )
+
+    def test_hashed_assets_are_immutable(self):
+        self.write_manifest({'css/main.css': self.CSS, 'js/main.js': 'js/main.0123456789ab.js'})
+        self.assertContains(self.client.get(reverse('product_list')), f'/static/{self.CSS}')
+
+        response = Client().get(f'/static/{self.CSS}')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+    def test_without_manifest_files_keep_their_names(self):
+        self.assertContains(self.client.get(reverse('product_list')), '/static/css/main.css')
+
+    def test_check_static_assets(self):
+        paths = {path: path for _, _, path in static_references()}
+        missing = paths.popitem()[0]
+        self.write_manifest(paths)
+        with self.assertRaisesMessage(CommandError, missing):
+            call_command('check_static_assets')
+
+        paths[missing] = missing
+        self.write_manifest(paths)
+        call_command('check_static_assets', stdout=io.StringIO())
+
+
+class CatalogCacheTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cards')
+        cls.product = Product.objects.create(name='Pikachu', description='', price=10, stock=1, category=cls.category)
+
+    def setUp(self):
+        super().setUp()
+        catalog_cache.reset_stats()
+
+    def featured(self):
+        return [p.name for p in self.client.get(reverse('home')).context['featured_products']]
+
+    def test_hits_and_misses(self):
+        self.featured()
+        self.featured()
+        self.assertEqual(catalog_cache.stats()['featured'], {'hits': 1, 'misses': 1})
+        self.assertEqual(catalog_cache.stats()['categories'], {'hits': 1, 'misses': 1})
+
+    def test_product_edit_invalidates(self):
+        self.assertEqual(self.featured(), ['Pikachu'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Raichu'
+            self.product.save()
+        self.assertEqual(self.featured(), ['Raichu'])
+
+    def test_checkout_invalidates(self):
+        self.assertEqual(self.featured(), ['Pikachu'])
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(make_order(), [(self.product, 1, self.product.price)])
+        self.assertEqual(self.featured(), [])
+
+    def test_lost_generation_does_not_resurrect_old_entries(self):
+        self.assertEqual(self.featured(), ['Pikachu'])
+        Product.objects.filter(pk=self.product.pk).update(name='Raichu')
+        cache.delete(catalog_cache.GENERATION_KEY)
+        self.assertEqual(self.featured(), ['Raichu'])
+
+    def test_cards_are_cached_per_product(self):
+        other = Product.objects.create(name='Eevee', description='', price=10, stock=1, category=self.category)
+        self.client.get(reverse('product_list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            other.price = 12
+            other.save()
+        catalog_cache.reset_stats()
+        response = self.client.get(reverse('product_list'))
+        self.assertEqual(catalog_cache.stats()['cards'], {'hits': 1, 'misses': 1})
+        self.assertContains(response, 'Rs. 12')
+
+    def test_cached_cards_carry_each_visitors_csrf_token(self):
+        for _ in range(2):
+            client = Client(enforce_csrf_checks=True)
+            response = client.get(reverse('home'))
+            self.assertNotContains(response, catalog_cache.CARD_CSRF_PLACEHOLDER)
+            token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode())[1]
+            response = client.post(reverse('add_to_cart', args=[self.product.id]), {'csrfmiddlewaretoken': token})
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(catalog_cache.stats()['cards'], {'hits': 1, 'misses': 1})
+
+
+class ConditionalGetTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper', password='secret-pass-123')
+        cls.category = Category.objects.create(name='Cards')
+        cls.product = Product.objects.create(name='Pikachu', description='', price=10, stock=5, category=cls.category)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_are_not_modified(self):
+        # Listings answer from the cached version; a product needs its own row.
+        pages = [(reverse('home'), 0), (reverse('product_list'), 0), (reverse('product_detail', args=[self.product.slug]), 1)]
+        for url, queries in pages:
+            response = self.client.get(url)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+            self.assertIn('Last-Modified', response)
+            with self.assertNumQueries(queries):
+                self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_product_edit_changes_etag(self):
+        url = reverse('product_list')
+        response = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 12
+            self.product.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+        detail = reverse('product_detail', args=[self.product.slug])
+        response = self.client.get(detail)
+        Product.objects.get(pk=self.product.pk).save()
+        self.assertEqual(self.revalidate(detail, response).status_code, 200)
+
+    def test_cart_and_login_change_etag(self):
+        url = reverse('product_detail', args=[self.product.slug])
+        response = self.client.get(url)
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        # The add-to-cart message is still waiting: no validators, no 304.
+        pending = self.revalidate(url, response)
+        self.assertEqual(pending.status_code, 200)
+        self.assertNotIn('ETag', pending)
+
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        self.client.force_login(self.user)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_revalidation_loads_no_cart_and_sets_no_csrf_cookie(self):
+        url = reverse('product_detail', args=[self.product.slug])
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        self.client.get(url)
+        response = self.client.get(url)
+        with mock.patch.object(SignedCookieCartStorage, 'load', side_effect=AssertionError('cart loaded')):
+            not_modified = self.revalidate(url, response)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertNotIn(settings.CSRF_COOKIE_NAME, not_modified.cookies)
+
+
+class GenerateCatalogTests(StoreTestCase):
+    def generate(self, prefix, seed=7):
+        call_command(
+            'generate_catalog', '--categories', '3', '--products', '60', '--users', '5', '--orders', '40',
+            '--batch-size', '25', '--seed', str(seed), '--prefix', prefix, '--until', '2026-06-30',
+            stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+        products = Product.objects.filter(slug__startswith=f'{prefix}-').order_by('pk')
+        return [(p.name, p.price, p.stock, p.created_at) for p in products]
+
+    def test_deterministic_from_seed(self):
+        first = self.generate('a')
+        self.assertEqual(len(first), 60)
+        self.assertEqual(first, self.generate('b'))
+        self.assertNotEqual(first, self.generate('c', seed=8))
+
+    def test_orders_and_timestamps(self):
+        self.generate('a')
+        self.assertEqual(Order.objects.count(), 40)
+        order = Order.objects.prefetch_related('items').first()
+        self.assertEqual(order.total, sum(item.get_subtotal() for item in order.items.all()))
+        self.assertLess(Order.objects.earliest('created_at').created_at, timezone.now() - timedelta(days=30))
+        self.assertLessEqual(Product.objects.latest('created_at').created_at.date().isoformat(), '2026-06-30')
+        self.assertFalse(Product.objects.exclude(updated_at=F('created_at')).exists())
+        self.assertFalse(Order.objects.exclude(updated_at=F('created_at')).exists())
+        # The generated timestamps are kept without touching auto_now on the shared fields.
+        self.assertTrue(Product._meta.get_field('updated_at').auto_now)
+        self.assertTrue(Order._meta.get_field('created_at').auto_now_add)
+
+    def test_prefix_must_be_new(self):
+        self.generate('a')
+        with self.assertRaises(CommandError):
+            self.generate('a')
+
+
+class CatalogImportExportTests(StoreTestCase):
+    CSV = (
+        'slug,name,description,price,stock,category,condition,rarity\n'
+        'pikachu,Pikachu,,10.00,5,cards,mint,rare\n'
+        'eevee,Eevee,,7.50,2,Cards,,\n'
+        'broken,Broken,,-1,x,cards,,\n'
+        'lost,Lost,,1.00,1,no-such-category,,\n'
+        'eevee,Eevee V,,8.00,3,cards,,\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cards')
+        cls.existing = Product.objects.create(name='Old Pikachu', slug='pikachu', description='Kept id',
+                                              price=1, stock=1, category=cls.category)
+
+    def import_csv(self, text, **kwargs):
+        return catalog_io.import_products(io.BytesIO(text.encode()), 'csv', **kwargs)
+
+    def test_upserts_in_chunks_and_reports_bad_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = self.import_csv(self.CSV, chunk_size=2)
+        self.assertEqual((result.rows, result.created, result.updated, result.failed), (5, 1, 2, 2))
+        self.assertEqual([error['line'] for error in result.errors], [4, 5])
+        self.assertEqual(set(result.errors[0]['errors']), {'price', 'stock'})
+        self.assertIn('category', result.errors[1]['errors'])
+        pikachu = Product.objects.get(slug='pikachu')
+        self.assertEqual((pikachu.pk, pikachu.name, pikachu.stock, pikachu.condition), (self.existing.pk, 'Pikachu', 5, 'mint'))
+        self.assertEqual(Product.objects.get(slug='eevee').name, 'Eevee V')
+        # Categories once, then a lookup and an upsert per chunk (plus savepoints).
+        self.assertLessEqual(len([q for q in queries if 'SAVEPOINT' not in q['sql']]), 1 + 2 * 3)
+
+    def test_jsonl_and_missing_categories(self):
+        lines = '{"slug": "mew", "name": "Mew", "price": 99, "stock": 1, "category": "Legends"}\nnot json\n'
+        result = catalog_io.import_products(io.BytesIO(lines.encode()), 'jsonl', create_categories=True)
+        self.assertEqual((result.created, result.failed), (1, 1))
+        self.assertEqual(Product.objects.get(slug='mew').category.slug, 'legends')
+
+    def test_export_round_trips(self):
+        self.import_csv(self.CSV)
+        exported = ''.join(catalog_io.serialize(catalog_io.export_rows(chunk_size=1), 'csv'))
+        Product.objects.all().delete()
+        result = self.import_csv(exported)
+        self.assertEqual((result.created, result.failed), (2, 0))
+        self.assertEqual(Product.objects.get(slug='eevee').price, Decimal('8.00'))
+
+    def test_staff_views(self):
+        staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.force_login(staff)
+        upload = SimpleUploadedFile('products.csv', self.CSV.encode(), content_type='text/csv')
+        response = self.client.post(reverse('admin_product_import'), {'file': upload})
+        self.assertContains(response, 'no-such-category')
+        self.assertEqual(Product.objects.count(), 2)
+        response = self.client.get(reverse('admin_product_export'), {'format': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(sorted(row['slug'] for row in rows), ['eevee', 'pikachu'])
+
+
+class AdminDashboardTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        cards, toys = Category.objects.bulk_create([
+            Category(name='Cards', slug='cards'), Category(name='Toys', slug='toys'),
+        ])
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Product {i:02}', slug=f'product-{i}', description='', price=10 + i,
+                    stock=i % 4, category=cards if i % 2 else toys)
+            for i in range(30)
+        ])
+        for status, total in [('completed', 100), ('confirmed', 50), ('cancelled', 70), ('payment_pending', 30)]:
+            order = make_order(status=status, total=total)
+            order.save()
+        Order.objects.filter(status='confirmed').update(created_at=timezone.now() - timedelta(days=10))
+        Order.objects.filter(status='payment_pending').update(payment_status='awaiting_verification')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+
+    def test_kpis(self):
+        # Read-only: until rollup_sales runs, the sales figures are empty.
+        kpis = dashboard.compute_kpis()
+        self.assertEqual((kpis['revenue']['30d'], kpis['sales_as_of']), (0, None))
+        self.assertFalse(DailySales.objects.exists())
+
+        rollups.update()
+        with self.assertNumQueries(2):  # the KPI aggregate and best sellers
+            kpis = dashboard.compute_kpis()
+        self.assertEqual(kpis['revenue'], {'today': 100, '7d': 100, '30d': 150})
+        self.assertEqual(kpis['orders_today'], 3)
+        self.assertEqual(kpis['awaiting_verification'], 1)
+        self.assertEqual(kpis['units_on_hold'], 0)
+        self.assertEqual(kpis['sales_as_of'], rollups.as_of())
+        self.assertEqual(dict((value, count) for value, _, count in kpis['status_counts'])['cancelled'], 1)
+        # Stock 1-3, not the eight sold out: what the card's link lists.
+        self.assertEqual(kpis['low_stock'], 22)
+        self.assertEqual(dashboard.filter_products({'stock': 'low'})[0].count(), kpis['low_stock'])
+
+    def test_kpis_cached_until_an_order_changes(self):
+        rollups.update()
+        self.client.get(reverse('admin_dashboard'))
+        order = Order.objects.get(status='cancelled')
+        Order.objects.filter(pk=order.pk).update(status='completed', updated_at=timezone.now())
+        rollups.update()
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).context['kpis']['revenue']['today'], 100)
+        self.client.post(reverse('admin_order_update', args=[order.pk]), {'status': 'completed'})
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).context['kpis']['revenue']['today'], 170)
+
+    def test_product_filters_sorting_and_pages(self):
+        response = self.client.get(reverse('admin_dashboard'), {'p-category': 'cards', 'p-stock': 'in', 'p-sort': '-price'})
+        self.assertEqual([p.name for p in response.context['product_page']],
+                         [f'Product {i:02}' for i in range(29, 0, -2)])
+        response = self.client.get(reverse('admin_dashboard'), {'p-stock': 'out', 'p-q': 'product-1'})
+        self.assertEqual(sorted(p.slug for p in response.context['product_page']),
+                         ['product-12', 'product-16'])
+
+        seen = []
+        params = {'p-sort': 'name', 'o-status': 'completed'}
+        while True:
+            response = self.client.get(reverse('admin_dashboard'), params)
+            page = response.context['product_page']
+            seen += [p.name for p in page]
+            if not page.next_cursor:
+                break
+            params['p-cursor'] = page.next_cursor
+        self.assertEqual(seen, sorted(p.name for p in self.products))
+        # The order filter rode along on every page.
+        self.assertEqual([o.status for o in response.context['order_page']], ['completed'])
+
+    def test_order_filters_and_bad_values(self):
+        response = self.client.get(reverse('admin_dashboard'), {'o-payment_status': 'awaiting_verification'})
+        self.assertEqual([o.status for o in response.context['order_page']], ['payment_pending'])
+        response = self.client.get(reverse('admin_dashboard'), {'p-category': 'nope', 'o-sort': 'bogus', 'o-cursor': 'x'})
+        self.assertEqual(len(response.context['product_page']), 25)
+        self.assertEqual(len(response.context['order_page']), 4)
+
+
+class SalesRollupTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Cards')
+        cls.pikachu, cls.eevee = Product.objects.bulk_create([
+            Product(name='Pikachu', slug='pikachu', description='', price=10, stock=100, category=category),
+            Product(name='Eevee', slug='eevee', description='', price=4, stock=100, category=category),
+        ])
+        cls.today = timezone.localdate()
+
+    def order(self, days_ago, lines, **kwargs):
+        order = place_order(make_order(**{'status': 'completed', **kwargs}), lines)
+        placed = timezone.now() - timedelta(days=days_ago)
+        Order.objects.filter(pk=order.pk).update(created_at=placed, updated_at=placed)
+        return order
+
+    def totals(self):
+        return sorted(DailySales.objects.values_list('date', 'payment_method', 'status', 'orders', 'items', 'revenue'))
+
+    def test_incremental_matches_rebuild(self):
+        self.order(3, [(self.pikachu, 2, Decimal('10'))])
+        self.order(3, [(self.eevee, 1, Decimal('4'))], payment_method='upi', status='payment_pending')
+        old = self.order(40, [(self.pikachu, 1, Decimal('9'))])
+        self.assertEqual(rollups.update(), 38)
+        self.assertEqual(rollups.best_sellers(self.today - timedelta(days=29), self.today),
+                         [{'product_id': self.pikachu.pk, 'product__name': 'Pikachu', 'product__slug': 'pikachu',
+                           'units': 2, 'revenue': Decimal('20')}])
+
+        # A status change and a new order touch two days; only those are redone.
+        cancelled = Order.objects.get(pk=old.pk)
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        self.order(0, [(self.eevee, 3, Decimal('4'))])
+        untouched = set(DailySales.objects.filter(date=self.today - timedelta(days=3)).values_list('pk', flat=True))
+        self.assertEqual(rollups.update(), 2)
+        self.assertEqual(
+            set(DailySales.objects.filter(date=self.today - timedelta(days=3)).values_list('pk', flat=True)), untouched,
+        )
+        incremental = self.totals()
+        rollups.rebuild()
+        self.assertEqual(self.totals(), incremental)
+        self.assertEqual(rollups.daily_revenue(self.today - timedelta(days=50), self.today), [
+            (self.today - timedelta(days=3), 1, Decimal('20.00')), (self.today, 1, Decimal('12.00')),
+        ])
+        self.assertFalse(DailyProductSales.objects.filter(date=self.today - timedelta(days=40)).exists())
+
+    def test_deleted_order_leaves_the_rollups(self):
+        order = self.order(1, [(self.pikachu, 1, Decimal('10'))])
+        rollups.update()
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.get(pk=order.pk).delete()
+        self.assertEqual(self.totals(), [])
+        self.assertFalse(DailyProductSales.objects.exists())
+
+    def test_bulk_delete_rerolls_each_day_once(self):
+        orders = [self.order(1, [(self.pikachu, 1, Decimal('10'))]) for _ in range(3)]
+        kept = self.order(2, [(self.eevee, 1, Decimal('4'))])
+        rollups.update()
+        with mock.patch('store.rollups.rollup_days', wraps=rollups.rollup_days) as rollup_days:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                Order.objects.filter(pk__in=[order.pk for order in orders]).delete()
+        self.assertEqual(len(callbacks), 1)
+        rollup_days.assert_called_once_with({self.today - timedelta(days=1)})
+        self.assertEqual([row[:4] for row in self.totals()],
+                         [(self.today - timedelta(days=2), kept.payment_method, 'completed', 1)])
+
+    def test_command(self):
+        self.order(0, [(self.pikachu, 1, Decimal('10'))])
+        out = io.StringIO()
+        call_command('rollup_sales', '--rebuild', '--report', '7', stdout=out)
+        self.assertIn('1 day rolled up', out.getvalue())
+        self.assertIn(f'{self.today}       1 orders', out.getvalue())
+
+
+class OrderExportTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        category = Category.objects.create(name='Cards')
+        products = Product.objects.bulk_create([
+            Product(name=f'Card {i}', slug=f'card-{i}', description='', price=5 + i, stock=100, category=category)
+            for i in range(3)
+        ])
+        cls.orders = []
+        for i, status in enumerate(['completed', 'cancelled', 'completed', 'shipped']):
+            order = make_order(status=status)
+            order.full_name = f'=Customer {i}'
+            place_order(order, [(product, i + 1, product.price) for product in products[:i % 3 + 1]])
+            Order.objects.filter(pk=order.pk).update(created_at=datetime(2026, 3, 10 + i, 12, tzinfo=dt_timezone.utc))
+            cls.orders.append(order)
+        cls.empty = make_order(status='completed')
+        cls.empty.save()
+        Order.objects.filter(pk=cls.empty.pk).update(created_at=datetime(2026, 3, 11, 9, tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+
+    def export(self, **params):
+        response = self.client.get(reverse('admin_order_export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_rows_per_item_with_filters(self):
+        response, body = self.export(date_from='2026-03-11', date_to='2026-03-12', status=['completed', 'cancelled'],
+                                     format='csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders-20260311-20260312.csv"')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row['order_id'], row['product_slug']) for row in rows], [
+            (str(self.empty.pk), ''),
+            (str(self.orders[1].pk), 'card-0'), (str(self.orders[1].pk), 'card-1'),
+            (str(self.orders[2].pk), 'card-0'), (str(self.orders[2].pk), 'card-1'), (str(self.orders[2].pk), 'card-2'),
+        ])
+        self.assertEqual(rows[1]['line_total'], '10.00')
+        # Spreadsheet formulas are neutralised.
+        self.assertEqual(rows[1]['full_name'], "'=Customer 1")
+
+    def test_jsonl_streams_in_chunks(self):
+        orders = order_export.orders_for_export()
+        # The orders, then the items of each chunk of two orders.
+        with self.assertNumQueries(4):
+            records = [json.loads(line) for line in order_export.serialize(orders, 'jsonl', chunk_size=2)]
+        self.assertEqual([record['id'] for record in records], [self.orders[0].pk, self.empty.pk] +
+                         [order.pk for order in self.orders[1:]])
+        self.assertEqual(records[-1]['items'][0], {
+            'product_id': self.orders[3].items.first().product_id, 'product_slug': 'card-0', 'product_name': 'Card 0',
+            'quantity': 4, 'unit_price': '5.00', 'line_total': '20.00',
+        })
+
+    def test_form(self):
+        response = self.client.get(reverse('admin_order_export'))
+        self.assertContains(response, 'Export Orders')
+        response = self.client.get(reverse('admin_order_export'), {'date_from': '2026-03-12', 'date_to': '2026-03-11',
+                                                                    'format': 'csv'})
+        self.assertContains(response, 'The start date is after the end date.')
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('admin_order_export'), {'format': 'csv'}).status_code, 302)
+
+
+class FacetTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cards = Category.objects.create(name='Cards')
+        boxes = Category.objects.create(name='Boxes')
+        Product.objects.bulk_create([
+            Product(name='Pikachu', slug='pikachu', description='', price=300, stock=1, category=cards,
+                    condition='new', rarity='rare'),
+            Product(name='Raichu', slug='raichu', description='', price=800, stock=1, category=cards,
+                    condition='used', rarity='common'),
+            Product(name='Booster Box', slug='booster-box', description='', price=6000, stock=1, category=boxes,
+                    condition='new', rarity='common'),
+            Product(name='Sold Out', slug='sold-out', description='', price=300, stock=0, category=cards,
+                    condition='new', rarity='rare'),
+        ])
+
+    def listing(self, query=''):
+        response = self.client.get(f'{reverse("product_list")}?{query}')
+        groups = {group['name']: {o['value']: o['count'] for o in group['options']} for group in
+                  response.context['facet_groups']}
+        return sorted(p.name for p in response.context['page_obj']), groups
+
+    def test_counts_without_selection(self):
+        names, groups = self.listing()
+        self.assertEqual(names, ['Booster Box', 'Pikachu', 'Raichu'])
+        self.assertEqual(groups['category'], {'boxes': 1, 'cards': 2})
+        self.assertEqual(groups['condition'], {'new': 2, 'used': 1, 'mint': 0})
+        self.assertEqual(groups['price'], {'under-500': 1, '500-1000': 1, '1000-2500': 0, '2500-5000': 0,
+                                           '5000-plus': 1})
+
+    def test_values_or_within_a_facet_and_across_facets(self):
+        names, groups = self.listing('condition=new&condition=used&category=cards')
+        self.assertEqual(names, ['Pikachu', 'Raichu'])
+        # A facet's own counts ignore its own selection, so the other values still show.
+        self.assertEqual(groups['category'], {'boxes': 1, 'cards': 2})
+        self.assertEqual(groups['condition'], {'new': 1, 'used': 1, 'mint': 0})
+        self.assertEqual(groups['rarity'], {'common': 1, 'uncommon': 0, 'rare': 1, 'ultra_rare': 0})
+        names, _ = self.listing('price=500-1000&price=5000-plus&rarity=common')
+        self.assertEqual(names, ['Booster Box', 'Raichu'])
+
+    def test_counts_follow_search(self):
+        names, groups = self.listing('search=pikachu')
+        self.assertEqual(names, ['Pikachu'])
+        self.assertEqual(groups['category'], {'boxes': 0, 'cards': 1})
+
+    def test_counts_and_version_are_cached_per_normalized_selection(self):
+        self.listing('rarity=common&condition=new&condition=used&search=Card')
+        catalog_cache.reset_stats()
+        self.listing('condition=used&rarity=common&condition=new&condition=new&search=%20card&utm_source=mail')
+        self.assertEqual(catalog_cache.stats()['facets'], {'hits': 1, 'misses': 0})
+        self.assertEqual(catalog_cache.stats()['listing_version'], {'hits': 1, 'misses': 0})
+
+    def test_unknown_category_is_not_found(self):
+        response = self.client.get(reverse('product_list'), {'category': ['cards', 'nope']})
+        self.assertEqual(response.status_code, 404)
+
+    def test_sidebar(self):
+        response = self.client.get(reverse('product_list'), {'category': 'cards', 'condition': 'mint'})
+        self.assertContains(response, 'name="condition" value="mint" checked')
+        self.assertNotIn('Last-Modified', response)
+
+
+class TypeaheadTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Cards')
+        cls.pikachu, cls.pirate, cls.pidgey, cls.eevee = Product.objects.bulk_create([
+            Product(name=name, slug=slugify(name), description='', price=10, stock=1, category=category)
+            for name in ['Holo Pikachu Card', 'Pirate Pikachu Plush', 'Pidgey Card', 'Eevee Card']
+        ])
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(date=datetime(2026, 3, 1).date(), product=cls.pidgey, units=9, revenue=90),
+            DailyProductSales(date=datetime(2026, 3, 1).date(), product=cls.pirate, units=3, revenue=30),
+        ])
+
+    def suggest(self, query):
+        response = self.client.get(reverse('search_suggestions'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [suggestion['name'] for suggestion in response.json()['suggestions']]
+
+    def test_prefix_matches_most_sold_first(self):
+        self.assertEqual(self.suggest('pi'), ['Pidgey Card', 'Pirate Pikachu Plush', 'Holo Pikachu Card'])
+        response = self.client.get(reverse('search_suggestions'), {'q': 'eev'})
+        self.assertEqual(response.json()['suggestions'], [{'name': 'Eevee Card', 'url': '/product/eevee-card/'}])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.suggest('pik ca'), ['Holo Pikachu Card'])
+        self.assertEqual(self.suggest('card HOLO'), ['Holo Pikachu Card'])
+        self.assertEqual(self.suggest('pikachu zz'), [])
+
+    def test_answers_without_the_database_once_built(self):
+        with self.assertNumQueries(2):
+            self.suggest('pik')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('card'), ['Pidgey Card', 'Holo Pikachu Card', 'Eevee Card'])
+            self.assertEqual(self.suggest('p'), [])
+
+    def test_signals_update_the_index(self):
+        self.suggest('pik')
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Pikachu Tin', description='', price=5, stock=1, category=self.eevee.category)
+            self.pirate.name = 'Pirate Raichu Plush'
+            self.pirate.save()
+            self.pikachu.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('pik'), ['Pikachu Tin'])
+            # The rename keeps its sales.
+            self.assertEqual(self.suggest('pi'), ['Pidgey Card', 'Pirate Raichu Plush', 'Pikachu Tin'])
+
+    def test_stale_index_answers_while_one_thread_rebuilds(self):
+        self.suggest('pik')
+        stale = typeahead.current()
+        build = typeahead.PrefixIndex.build
+
+        def build_during_a_save():
+            # Other requests and signals aren't blocked by the build.
+            self.assertFalse(typeahead._lock.locked())
+            self.assertEqual(typeahead.suggest('eev'), [{'name': 'Eevee Card', 'url': '/product/eevee-card/'}])
+            index = build()
+            typeahead.product_saved(self.eevee.pk, 'Eevee Holo Card', self.eevee.slug)
+            return index
+
+        with self.settings(STORE_TYPEAHEAD_MAX_AGE=0), \
+                mock.patch.object(typeahead.PrefixIndex, 'build', side_effect=build_during_a_save) as rebuild:
+            self.assertEqual(self.suggest('holo'), ['Holo Pikachu Card', 'Eevee Holo Card'])
+        rebuild.assert_called_once_with()
+        self.assertIsNot(typeahead._index, stale)
+        self.assertIsNone(typeahead._changes)
+
+    def test_bulk_import_resets_the_index(self):
+        self.suggest('pik')
+        data = io.BytesIO(b'slug,name,price,stock,category\npikachu-box,Pikachu Box,5,1,Cards\n')
+        catalog_io.import_products(data)
+        self.assertIsNone(typeahead.current())
+        self.assertIn('Pikachu Box', self.suggest('pik'))
+
+
+class StockReservationTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper', password='secret-pass-123')
+        cls.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        category = Category.objects.create(name='Cards')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Card {i}', slug=f'card-{i}', description='', price=10, stock=10, category=category)
+            for i in range(3)
+        ])
+
+    def upi_order(self, quantities=(2, 1)):
+        lines = [(product, quantity, product.price) for product, quantity in zip(self.products, quantities) if quantity]
+        return place_order(make_order(self.user, payment_method='upi', status='payment_pending'), lines)
+
+    def stock(self):
+        return list(Product.objects.order_by('id').values_list('stock', flat=True))
+
+    def test_only_orders_awaiting_payment_hold_stock(self):
+        with self.assertNumQueries(6):  # savepoint, order, stock, items, holds, release
+            order = self.upi_order()
+        place_order(make_order(self.user, status='confirmed'), [(self.products[2], 1, self.products[2].price)])
+        self.assertEqual(sorted(order.reservations.values_list('product_id', 'quantity')),
+                         [(self.products[0].pk, 2), (self.products[1].pk, 1)])
+        self.assertEqual(StockReservation.objects.count(), 2)
+        self.assertEqual(reservations.units_on_hold(), 3)
+        self.assertEqual(self.stock(), [8, 9, 9])
+
+    def test_release_expired_cancels_unpaid_orders_in_batches(self):
+        unpaid = [self.upi_order(), self.upi_order((1, 1, 1))]
+        paid = self.upi_order((0, 3))
+        Order.objects.filter(pk=paid.pk).update(status='confirmed')
+        fresh = self.upi_order((1,))
+        later = timezone.now() + reservations.ttl()
+        StockReservation.objects.exclude(order=fresh).update(expires_at=timezone.now())
+
+        # Batches of three holds: the first takes in both unpaid orders whole
+        # (8 queries with the savepoint), the second the paid one (5: nothing
+        # to give back), then an empty look (3).
+        with self.assertNumQueries(16):
+            self.assertEqual(reservations.release_expired(batch_size=3), (2, 6))
+        self.assertEqual(self.stock(), [9, 7, 10])
+        self.assertEqual(
+            list(Order.objects.filter(pk__in=[o.pk for o in unpaid]).order_by().values_list('status', 'payment_status')
+                 .distinct()),
+            [('cancelled', 'failed')],
+        )
+        self.assertEqual(Order.objects.get(pk=paid.pk).status, 'confirmed')
+        self.assertEqual(list(StockReservation.objects.values_list('order_id', flat=True)), [fresh.pk])
+        self.assertEqual(reservations.release_expired(now=later), (1, 1))
+        self.assertEqual(self.stock(), [10, 7, 10])
+
+    def test_paying_settles_and_expiry_blocks_payment(self):
+        self.client.force_login(self.user)
+        order = self.upi_order()
+        response = self.client.get(reverse('payment', args=[order.pk]))
+        self.assertContains(response, 'Your items are held until')
+        self.client.post(reverse('payment', args=[order.pk]), {'transaction_id': '123456789012'})
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'confirmed')
+        self.assertFalse(order.reservations.exists())
+
+        expired = self.upi_order()
+        reservations.release_expired(now=timezone.now() + reservations.ttl())
+        response = self.client.post(reverse('payment', args=[expired.pk]), {'transaction_id': '123456789012'})
+        self.assertRedirects(response, reverse('order_confirmation', args=[expired.pk]))
+        self.assertEqual(Order.objects.get(pk=expired.pk).status, 'cancelled')
+        self.assertEqual(self.stock(), [8, 9, 10])
+
+    def test_dashboard_cancel_returns_units(self):
+        self.client.force_login(self.staff)
+        cancelled, confirmed = self.upi_order(), self.upi_order((1,))
+        self.client.post(reverse('admin_order_update', args=[cancelled.pk]), {'status': 'cancelled'})
+        self.client.post(reverse('admin_order_update', args=[confirmed.pk]), {'status': 'confirmed'})
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(self.stock(), [9, 10, 10])
+
+    def test_django_admin_cancel_returns_units(self):
+        self.staff.is_superuser = True
+        self.staff.save()
+        self.client.force_login(self.staff)
+        cancelled, confirmed = self.upi_order(), self.upi_order((1,))
+        # list_editable on the changelist, as a formset of the orders shown.
+        orders = list(Order.objects.order_by('-created_at'))
+        data = {
+            'form-TOTAL_FORMS': len(orders), 'form-INITIAL_FORMS': len(orders), '_save': 'Save',
+        }
+        for n, order in enumerate(orders):
+            data[f'form-{n}-id'] = order.pk
+            data[f'form-{n}-status'] = 'cancelled' if order == cancelled else 'payment_pending'
+        response = self.client.post(reverse('admin:store_order_changelist'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.get(pk=cancelled.pk).status, 'cancelled')
+        self.assertEqual(list(StockReservation.objects.values_list('order_id', flat=True)), [confirmed.pk])
+        self.assertEqual(self.stock(), [9, 10, 10])
+
+        # The change form: keeping the sale just drops the holds.
+        response = self.client.get(reverse('admin:store_order_change', args=[confirmed.pk]))
+        data = {
+            name: value for name, value in response.context['adminform'].form.initial.items()
+            if value is not None and name != 'user'
+        }
+        data.update({
+            'status': 'confirmed', 'items-TOTAL_FORMS': 0, 'items-INITIAL_FORMS': 0, '_save': 'Save',
+        })
+        response = self.client.post(reverse('admin:store_order_change', args=[confirmed.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.get(pk=confirmed.pk).status, 'confirmed')
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(self.stock(), [9, 10, 10])
+
+    def test_command(self):
+        self.upi_order()
+        StockReservation.objects.update(expires_at=timezone.now())
+        out = io.StringIO()
+        call_command('release_expired_reservations', stdout=out)
+        self.assertIn('1 unpaid order cancelled, 3 units back in stock', out.getvalue())
+
+
+@override_settings(ROOT_URLCONF='shopverse.asgi_urls')
+class AsyncViewTests(StoreTestCase):
+    """The async storefront views behind an async middleware chain, as under ASGI."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cards')
+        cls.product = Product.objects.create(name='Pikachu', description='', price=10, stock=5, category=cls.category)
+
+    def test_routing(self):
+        self.assertIs(resolve(reverse('home')).func, async_views.home)
+        self.assertIs(resolve(reverse('cart'), urlconf='shopverse.urls').func, views.cart_view)
+        self.assertEqual(resolve(reverse('checkout')).url_name, 'checkout')
+
+    async def test_read_views(self):
+        for url in [reverse('home'), reverse('product_list'), reverse('product_list') + '?category=cards&search=pika',
+                    reverse('product_detail', args=[self.product.slug]), reverse('cart'),
+                    reverse('search_suggestions') + '?q=pik']:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertIn('Server-Timing', response)
+        response = await self.async_client.get(reverse('search_suggestions'), {'q': 'pik'})
+        self.assertEqual([s['name'] for s in json.loads(response.content)['suggestions']], ['Pikachu'])
+        response = await self.async_client.get(reverse('home'))
+        response = await self.async_client.get(reverse('home'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get(reverse('product_detail', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('product_list'), {'category': 'missing'})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_cart(self):
+        await self.async_client.post(reverse('add_to_cart', args=[self.product.id]))
+        response = await self.async_client.get(reverse('cart'))
+        self.assertContains(response, 'Pikachu')
+        self.assertEqual(response.context['cart'].get_total_quantity(), 1)
+
+
+class PerformanceMiddlewareTests(StoreTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='secret-pass-123', is_staff=True)
+        category = Category.objects.create(name='Cards')
+        Product.objects.create(name='Pikachu', slug='pikachu', description='', price=10, stock=1, category=category)
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_server_timing_and_registry(self):
+        response = self.client.get(reverse('product_detail', args=['pikachu']))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+$')
+
+        [row] = metrics.registry.summary()
+        self.assertEqual(row['view'], 'product_detail')
+        self.assertGreater(row['db_queries']['p50'], 0)
+        self.assertGreater(row['template_ms']['p50'], 0)
+        self.assertEqual(row['response_bytes']['p50'], len(response.content))
+        self.assertTrue(metrics.registry.slowest_queries())
+
+    def test_dashboard_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse('admin_performance')).status_code, 302)
+        self.client.force_login(self.staff)
+        self.client.get(reverse('home'))
+        response = self.client.get(reverse('admin_performance'))
+        self.assertContains(response, 'home')
+
+    def test_profile_mode(self):
+        url = reverse('product_detail', args=['pikachu'])
+        response = self.client.get(url, {'profile': '1'})
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'profile': '1', 'profile_sort': 'bogus'})
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertContains(response, 'function calls')
+
+
+class QueryBudgetTests(StoreTestCase):
+    """
+    Fixed query budgets per view on seeded data, so a template that starts
+    touching an unprefetched relation fails here instead of in production.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper', password='secret-pass-123')
+        cls.staff = User.objects.create_user('staff', password='secret-pass-123', is_staff=True)
+        categories = Category.objects.bulk_create([
+            Category(name=f'Category {i}', slug=f'category-{i}') for i in range(5)
+        ])
+        cls.products = Product.objects.bulk_create([
+            Product(
+                name=f'Product {i}', slug=f'product-{i}', description='', price=10, stock=20,
+                category=categories[i % 5],
+            )
+            for i in range(30)
+        ])
+        for i in range(5):
+            order = place_order(
+                make_order(cls.user, payment_method='upi', status='payment_pending'),
+                [(product, 1, product.price) for product in cls.products[i * 3:i * 3 + 3]],
+            )
+        cls.order = order
+        # The backend checks once per process whether the FTS table exists.
+        get_search_backend()
+
+    def assertQueryBudget(self, budget, url, method='get', data=None, status=200):
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method)(url, data)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def fill_cart(self, count=5):
+        for product in self.products[:count]:
+            self.client.post(reverse('add_to_cart', args=[product.id]))
+
+    def test_home(self):
+        self.assertQueryBudget(3, reverse('home'))
+
+    def test_product_list(self):
+        self.assertQueryBudget(5, reverse('product_list'))
+
+    def test_product_list_filtered(self):
+        self.assertQueryBudget(5, reverse('product_list'), data={'category': 'category-1', 'search': 'product'})
+
+    def test_warm_catalog_cache(self):
+        self.client.get(reverse('home'))
+        self.client.get(reverse('product_list'), {'category': 'category-1'})
+        self.assertQueryBudget(0, reverse('home'))
+        self.assertQueryBudget(0, reverse('product_list'), data={'category': 'category-1'})
+
+    def test_product_detail(self):
+        self.assertQueryBudget(1, reverse('product_detail', args=['product-3']))
+
+    def test_cart(self):
+        self.fill_cart()
+        self.assertQueryBudget(1, reverse('cart'))
+        self.assertQueryBudget(1, reverse('add_to_cart', args=[self.products[6].id]), method='post', status=302)
+        self.assertQueryBudget(1, reverse('update_cart', args=[self.products[6].id]), method='post',
+                               data={'quantity': 3}, status=302)
+
+    def test_checkout(self):
+        self.client.force_login(self.user)
+        self.fill_cart()
+        self.assertQueryBudget(4, reverse('checkout'))
+        self.assertQueryBudget(10, reverse('checkout'), method='post', status=302, data={
+            'full_name': 'Customer', 'email': 'c@example.com', 'phone': '1', 'address': '1 Street',
+            'city': 'Pune', 'postal_code': '411001', 'country': 'India', 'payment_method': 'cod',
+        })
+
+    def test_customer_orders(self):
+        self.client.force_login(self.user)
+        self.assertQueryBudget(5, reverse('my_orders'))
+        self.assertQueryBudget(5, reverse('order_confirmation', args=[self.order.id]))
+        # Plus when the order's stock holds run out.
+        self.assertQueryBudget(6, reverse('payment', args=[self.order.id]))
+
+    def test_admin_dashboard(self):
+        self.client.force_login(self.staff)
+        rollups.update()
+        # KPIs refreshed, read-only: session, user and both tables (4); the
+        # KPI aggregate and best sellers (2); cart and categories (2).
+        self.assertQueryBudget(8, reverse('admin_dashboard'))
+        # Between refreshes they come from the cache.
+        self.assertQueryBudget(6, reverse('admin_dashboard'))
+
+    def test_django_admin(self):
+        self.staff.is_superuser = True
+        self.staff.save()
+        self.client.force_login(self.staff)
+        self.assertQueryBudget(6, reverse('admin:store_product_changelist'))
+        self.assertQueryBudget(5, reverse('admin:store_order_changelist'))
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Hammer one product from many threads; every unit is sold at most once."""
+
+    THREADS = 12
+
+    def test_no_oversell(self):
+        category = Category.objects.create(name='Cards')
+        product = Product.objects.create(name='Charizard', description='', price=300, stock=5, category=category)
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+
+        def buy():
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        place_order(make_order(), [(product, 1, product.price)])
+                        outcomes.append('sold')
+                    except StockConflict:
+                        outcomes.append('conflict')
+                    except OperationalError:
+                        # SQLite's shared-cache test database refuses concurrent
+                        # writers outright instead of waiting; just try again.
+                        continue
+                    break
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual(outcomes.count('sold'), 5)
+        self.assertEqual(outcomes.count('conflict'), self.THREADS - 5)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(OrderItem.objects.filter(product=product).count(), 5)
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test_percentiles_match_the_dashboard(self):
+        recorder = loadtest.Recorder()
+        recorder.started, recorder.finished = 0, 10
+        for ms in range(1, 101):
+            recorder.request('home', 200, ms)
+        recorder.failure('cart', ConnectionResetError())
+        report = recorder.report()
+        values = list(range(1, 101))
+        self.assertEqual(
+            (report['urls']['home']['p50_ms'], report['urls']['home']['p99_ms']),
+            (metrics.percentile(values, 0.50), metrics.percentile(values, 0.99)),
+        )
+        self.assertIsNone(report['urls']['cart']['p50_ms'])
+
+    def test_journeys_against_live_server(self):
+        category = Category.objects.create(name='Cards')
+        Product.objects.bulk_create([
+            Product(name=f'Holo Card {i}', slug=f'holo-card-{i}', description='', price=10, stock=50, category=category)
+            for i in range(15)
+        ])
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+            # One shopper: SQLite's shared-cache test database rejects concurrent writers.
+            call_command(
+                'loadtest', '--url', self.live_server_url, '--concurrency', '1', '--journeys', '6',
+                '--mix', 'browse=1,search=1,buy=1', '--users', '2', '--output', output.name,
+                stderr=io.StringIO(),
+            )
+            report = json.load(output)
+
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(sum(journey['failed'] for journey in report['journeys'].values()), 0)
+        self.assertEqual(sum(journey['completed'] for journey in report['journeys'].values()), 6)
+        self.assertIn('p99_ms', report['urls']['product_detail'])
+        self.assertEqual(Order.objects.count(), report['journeys'].get('buy', {}).get('completed', 0))
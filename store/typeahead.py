@@ -0,0 +1,272 @@
+"""
+Search-as-you-type suggestions for the header search box, answered from a
+per-process prefix index instead of the database.
+
+The index holds the words of every product name (lowercased, as the search
+backend tokenizes them) in two parallel sorted arrays, ``tokens`` and
+``ids``, so the products with a word starting with some prefix are one
+``bisect`` range. A dict maps each product to the little a suggestion
+shows, plus its popularity (units sold, from the daily rollups), which
+orders the suggestions. Answers are memoized until the index next changes.
+
+It is built on first use with two queries, then kept current one product
+at a time: the ``Product`` save and delete signals re-index that product
+once the transaction commits (see store/signals.py). Bulk writes that skip
+signals (the importer, ``generate_catalog``) call ``reset()``, and the next
+lookup rebuilds. Every product is indexed, in stock or not, because
+checkout changes stock without signals.
+
+Each process has its own copy and only hears its own signals, so a copy
+older than ``STORE_TYPEAHEAD_MAX_AGE`` seconds (300 by default) is rebuilt
+to pick up changes made by other processes. One thread rebuilds while the
+others keep answering from the stale copy; ``_lock`` is only held to swap
+the new index in, replaying the changes signalled while it was built.
+"""
+import bisect
+import heapq
+import itertools
+import sys
+import threading
+import time
+from array import array
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Sum
+from django.urls import reverse
+
+from .models import DailyProductSales, Product
+from .search import tokenize
+
+LIMIT = 8
+MIN_QUERY_LENGTH = 2
+MAX_MEMOIZED_ANSWERS = 4096
+URL_PLACEHOLDER = 'product-slug'
+# Sorts after every character, so ``prefix + _TOP`` bounds a prefix range.
+_TOP = chr(sys.maxunicode)
+
+_index = None
+# Guards the index's contents; never held while querying the database.
+_lock = threading.Lock()
+# One build at a time.
+_build_lock = threading.Lock()
+# While a build runs, the (method, args) signalled since its queries started.
+_changes = None
+# Bumped by reset(), so a build that started before it isn't installed.
+_generation = 0
+
+
+def words(text):
+    """The distinct words of ``text``, interned: the same word in many names is stored once."""
+    return tuple(dict.fromkeys(sys.intern(word) for word in tokenize(text)))
+
+
+def distinct(ids):
+    """``ids`` without repeats, lazily (a product can match through several of its words)."""
+    seen = set()
+    for pk in ids:
+        if pk not in seen:
+            seen.add(pk)
+            yield pk
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.tokens = []
+        self.ids = array('q')
+        # id -> (name, slug, rank, words); rank sorts the most sold first.
+        self.products = {}
+        self.answers = {}
+        self.built_at = time.monotonic()
+        # Resolved once; reverse() per suggestion would cost more than the lookup.
+        self.url_template = reverse('product_detail', args=[URL_PLACEHOLDER])
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        popularity = dict(
+            DailyProductSales.objects.order_by().values('product_id').annotate(units=Sum('units'))
+            .values_list('product_id', 'units')
+        )
+        entries = []
+        for pk, name, slug in Product.objects.values_list('id', 'name', 'slug').iterator(chunk_size=2000):
+            product_words = words(name)
+            rank = (-popularity.get(pk, 0), pk)
+            index.products[pk] = (name, slug, rank, product_words)
+            entries.extend((word, rank) for word in product_words)
+        entries.sort()
+        index.tokens = [word for word, _ in entries]
+        index.ids = array('q', [rank[-1] for _, rank in entries])
+        return index
+
+    def __len__(self):
+        return len(self.products)
+
+    def rank(self, pk):
+        return self.products[pk][2]
+
+    def _position(self, word, rank):
+        """Where ``word`` of the product ranked ``rank`` goes: each word's ids are in rank order."""
+        lo = bisect.bisect_left(self.tokens, word)
+        hi = bisect.bisect_right(self.tokens, word, lo)
+        return bisect.bisect_left(self.ids, rank, lo, hi, key=self.rank), hi
+
+    def add(self, pk, name, slug, popularity=0):
+        self.remove(pk)
+        product_words = words(name)
+        rank = (-popularity, pk)
+        for word in product_words:
+            at, _ = self._position(word, rank)
+            self.tokens.insert(at, word)
+            self.ids.insert(at, pk)
+        self.products[pk] = (name, slug, rank, product_words)
+        self.answers.clear()
+
+    def remove(self, pk):
+        entry = self.products.get(pk)
+        if entry is None:
+            return
+        for word in entry[3]:
+            at, hi = self._position(word, entry[2])
+            if at < hi and self.ids[at] == pk:
+                del self.tokens[at]
+                del self.ids[at]
+        del self.products[pk]
+        self.answers.clear()
+
+    def save(self, pk, name, slug):
+        """Re-index a saved product, keeping its popularity."""
+        entry = self.products.get(pk)
+        self.add(pk, name, slug, -entry[2][0] if entry else 0)
+
+    def prefix_range(self, prefix):
+        return bisect.bisect_left(self.tokens, prefix), bisect.bisect_left(self.tokens, prefix + _TOP)
+
+    def ranked(self, lo, hi):
+        """The ids in ``lo:hi``, best first: a lazy merge of each word's run."""
+        runs = []
+        while lo < hi:
+            end = bisect.bisect_right(self.tokens, self.tokens[lo], lo, hi)
+            runs.append(self.ids[lo:end])
+            lo = end
+        return heapq.merge(*runs, key=self.rank)
+
+    def suggest(self, query, limit=LIMIT):
+        """
+        Up to ``limit`` products with, for every word of ``query``, a word
+        of the name starting with it; the most sold first.
+        """
+        query_words = tuple(dict.fromkeys(tokenize(query)))
+        key = (query_words, limit)
+        answer = self.answers.get(key)
+        if answer is None:
+            answer = self._suggest(query_words, limit)
+            if len(self.answers) >= MAX_MEMOIZED_ANSWERS:
+                self.answers.clear()
+            self.answers[key] = answer
+        return answer
+
+    def _suggest(self, query_words, limit):
+        if not query_words:
+            return []
+        ranges = sorted((hi - lo, lo, hi) for lo, hi in map(self.prefix_range, query_words))
+        size, lo, hi = ranges[0]
+        if len(ranges) == 1:
+            # Each word's ids are in rank order: merge them until there are enough.
+            best = itertools.islice(distinct(self.ranked(lo, hi)), limit)
+        else:
+            matches = set(self.ids[lo:hi])
+            for _, other_lo, other_hi in ranges[1:]:
+                matches.intersection_update(self.ids[other_lo:other_hi])
+            if len(matches) * limit < size:
+                best = heapq.nsmallest(limit, matches, key=self.rank)
+            else:
+                # Common enough that walking the rarest word in rank order finds them soon.
+                best = itertools.islice(distinct(pk for pk in self.ranked(lo, hi) if pk in matches), limit)
+        return [
+            {'name': self.products[pk][0], 'url': self.url_template.replace(URL_PLACEHOLDER, self.products[pk][1])}
+            for pk in best
+        ]
+
+
+def max_age():
+    return getattr(settings, 'STORE_TYPEAHEAD_MAX_AGE', 300)
+
+
+def current():
+    """The index if it's built and fresh enough, else ``None``."""
+    index = _index
+    if index is not None and time.monotonic() - index.built_at <= max_age():
+        return index
+    return None
+
+
+def rebuild():
+    """Build a new index without holding ``_lock``, then swap it in."""
+    global _index, _changes
+    with _lock:
+        _changes = []
+        generation = _generation
+    try:
+        index = PrefixIndex.build()
+        with _lock:
+            # Saves and deletes committed during the build may predate its queries.
+            for method, args in _changes:
+                getattr(index, method)(*args)
+            if _generation == generation:
+                _index = index
+    finally:
+        with _lock:
+            _changes = None
+    return index
+
+
+def get_index():
+    """The index, built if there's none; a stale one is refreshed by one thread at a time."""
+    index = _index
+    if index is None:
+        with _build_lock:
+            # Another thread may have built it while this one waited.
+            return _index or rebuild()
+    if current() is None and _build_lock.acquire(blocking=False):
+        try:
+            return rebuild()
+        finally:
+            _build_lock.release()
+    return index
+
+
+def suggest(query, limit=LIMIT):
+    index = current() or get_index()
+    with _lock:
+        return index.suggest(query, limit)
+
+
+async def asuggest(query, limit=LIMIT):
+    """``suggest`` for async callers; only a (re)build touches the database."""
+    index = current() or await sync_to_async(get_index)()
+    with _lock:
+        return index.suggest(query, limit)
+
+
+def changed(method, *args):
+    with _lock:
+        if _index is not None:
+            getattr(_index, method)(*args)
+        if _changes is not None:
+            _changes.append((method, args))
+
+
+def product_saved(pk, name, slug):
+    changed('save', pk, name, slug)
+
+
+def product_deleted(pk):
+    changed('remove', pk)
+
+
+def reset():
+    global _index, _generation
+    with _lock:
+        _index = None
+        _generation += 1
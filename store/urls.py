@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('products/', views.product_list, name='product_list'),
+    path('products/suggest/', views.search_suggestions, name='search_suggestions'),
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
     path('cart/', views.cart_view, name='cart'),
     path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
@@ -17,8 +18,12 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/performance/', views.admin_performance, name='admin_performance'),
     path('admin-dashboard/product/add/', views.admin_product_add, name='admin_product_add'),
+    path('admin-dashboard/product/import/', views.admin_product_import, name='admin_product_import'),
+    path('admin-dashboard/product/export/', views.admin_product_export, name='admin_product_export'),
     path('admin-dashboard/product/edit/<int:product_id>/', views.admin_product_edit, name='admin_product_edit'),
     path('admin-dashboard/product/delete/<int:product_id>/', views.admin_product_delete, name='admin_product_delete'),
+    path('admin-dashboard/orders/export/', views.admin_order_export, name='admin_order_export'),
     path('admin-dashboard/order/update/<int:order_id>/', views.admin_order_update, name='admin_order_update'),
 ]
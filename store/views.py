@@ -2,50 +2,161 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q
 from django.conf import settings
-from .models import Product, Category, Order, OrderItem
-from .forms import SignUpForm, CheckoutForm, ProductForm, TransactionForm
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from .models import Product, Order, OrderItem
+from .forms import (
+    SignUpForm, CheckoutForm, DashboardOrderFilterForm, DashboardProductFilterForm, OrderExportForm,
+    ProductForm, ProductImportForm, TransactionForm,
+)
+from . import catalog_cache, catalog_io, dashboard, facets, metrics, order_export, reservations, typeahead
 from .cart import Cart
+from .cart_storage import CartStorageFull
+from .checkout import StockConflict, place_order
+from .conditional import conditional_page
+from .pagination import KeysetPaginator
+from .search import search_products
 
-def home(request):
-    featured_products = Product.objects.filter(stock__gt=0)[:6]
-    categories = Category.objects.all()
-    return render(request, 'store/home.html', {
-        'featured_products': featured_products,
-        'categories': categories
-    })
+# Columns a product card needs (see product_card.html), updated_at for its
+# cache key, plus created_at for keyset pagination.
+PRODUCT_CARD_FIELDS = [
+    'id', 'name', 'slug', 'price', 'stock', 'image', 'image_variants', 'rarity', 'created_at',
+    'updated_at', 'category__name', 'category__slug',
+]
 
-def product_list(request):
-    products = Product.objects.filter(stock__gt=0)
-    category_slug = request.GET.get('category')
-    search_query = request.GET.get('search')
-    
-    if category_slug:
-        category = get_object_or_404(Category, slug=category_slug)
-        products = products.filter(category=category)
+
+def product_cards():
+    return Product.objects.select_related('category').only(*PRODUCT_CARD_FIELDS)
+
+
+def orders_with_items():
+    return Order.objects.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('id'))
+    )
+
+
+def category_fingerprint(categories):
+    return tuple((c.pk, c.name, c.slug, c.product_count) for c in categories)
+
+# The storefront read views come in two versions: these sync ones, served
+# under WSGI, and async ones in store/async_views.py, served under ASGI (see
+# shopverse/asgi.py). Each fetches its data its own way, then hands it to
+# the shared *_response function, which renders the page or answers 304.
+
+def home_response(request, categories, last_modified, count, featured_products):
+    """``featured_products`` is called only if the page is rendered."""
+    def render_page():
+        featured = featured_products()
+        return render(request, 'store/home.html', {
+            'featured_products': featured,
+            'featured_cards': catalog_cache.render_cards(request, featured),
+            'categories': categories
+        })
     
+    return conditional_page(
+        request, render_page, last_modified, count, category_fingerprint(categories),
+        last_modified=last_modified,
+    )
+
+def home(request):
+    in_stock = product_cards().filter(stock__gt=0)
+    categories = catalog_cache.categories()
+    last_modified, count = catalog_cache.listing_version(in_stock, 'home')
+    return home_response(
+        request, categories, last_modified, count, lambda: catalog_cache.featured_products(in_stock),
+    )
+
+def product_listing(request, categories, search_query):
+    """
+    The listing's facet selection, its queryset before and after the facet
+    filters, and its ordering. Raises 404 for an unknown category.
+    """
+    selection = facets.FacetSelection(request.GET, categories)
+    if selection.unknown_categories:
+        raise Http404('No such category.')
+    products = product_cards().filter(stock__gt=0)
+    ordering = None
     if search_query:
-        products = products.filter(
-            Q(name__icontains=search_query) | 
-            Q(description__icontains=search_query)
-        )
+        products = search_products(products, search_query)
+        ordering = ['-search_rank', '-created_at', '-id']
+    # Facet counts are over the listing without the facet filters.
+    return selection, products, products.filter(selection.q()), ordering
+
+def product_list_response(request, categories, search_query, selection, products, ordering, version, facet_counts):
+    last_modified, count = version
+    # Keep the current filters on the Previous/Next links.
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
+    filter_query = filter_params.urlencode()
     
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    def render_page():
+        paginator = KeysetPaginator(products, 12, ordering=ordering)
+        cursor = request.GET.get('cursor')
+        if search_query or cursor:
+            page_obj = paginator.get_page(cursor)
+        else:
+            page_obj = catalog_cache.first_page(paginator, selection.signature or 'all')
+        
+        return render(request, 'store/product_list.html', {
+            'page_obj': page_obj,
+            'cards': catalog_cache.render_cards(request, page_obj),
+            'categories': categories,
+            'current_category': selection.single_category,
+            'facet_groups': selection.groups(facet_counts),
+            'facets_selected': bool(selection),
+            'search_query': search_query or '',
+            'filter_query': filter_query,
+        })
     
-    categories = Category.objects.all()
-    return render(request, 'store/product_list.html', {
-        'page_obj': page_obj,
-        'categories': categories,
-        'current_category': category_slug
-    })
+    return conditional_page(
+        request, render_page, last_modified, count, category_fingerprint(categories),
+        sorted(facet_counts.items()),
+        # With facets ticked, the counts can change while the listing's own
+        # newest updated_at doesn't; only the ETag sees that.
+        last_modified=None if selection else last_modified,
+    )
+
+def product_list(request):
+    search_query = request.GET.get('search')
+    categories = catalog_cache.categories()
+    selection, unfaceted, products, ordering = product_listing(request, categories, search_query)
+    return product_list_response(
+        request, categories, search_query, selection, products, ordering,
+        catalog_cache.listing_version(products, facets.cache_name(selection, search_query)),
+        facets.counts(unfaceted, selection, search_query),
+    )
+
+def product_detail_response(request, product):
+    return conditional_page(
+        request,
+        lambda: render(request, 'store/product_detail.html', {'product': product}),
+        product.pk, product.updated_at, product.category.name, product.category.slug,
+        last_modified=product.updated_at,
+    )
 
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug)
-    return render(request, 'store/product_detail.html', {'product': product})
+    product = get_object_or_404(Product.objects.select_related('category'), slug=slug)
+    return product_detail_response(request, product)
+
+def suggestions_query(request):
+    return request.GET.get('q', '').strip()[:100]
+
+def suggestions_response(query, suggestions):
+    response = JsonResponse({'query': query, 'suggestions': suggestions})
+    # The same for every visitor; a short cache covers backspacing.
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+def search_suggestions(request):
+    query = suggestions_query(request)
+    suggestions = []
+    if len(query) >= typeahead.MIN_QUERY_LENGTH:
+        suggestions = typeahead.suggest(query)
+    return suggestions_response(query, suggestions)
 
 def cart_view(request):
     cart = Cart(request)
@@ -57,8 +168,12 @@ def add_to_cart(request, product_id):
     quantity = int(request.POST.get('quantity', 1))
     
     if product.stock >= quantity:
-        cart.add(product=product, quantity=quantity)
-        messages.success(request, f'{product.name} added to cart!')
+        try:
+            cart.add(product=product, quantity=quantity)
+        except CartStorageFull:
+            messages.error(request, 'Your cart is full. Log in to add more items.')
+        else:
+            messages.success(request, f'{product.name} added to cart!')
     else:
         messages.error(request, 'Not enough stock available.')
     
@@ -79,8 +194,12 @@ def update_cart(request, product_id):
         
         if quantity > 0:
             if product.stock >= quantity:
-                cart.add(product=product, quantity=quantity, update_quantity=True)
-                messages.success(request, 'Cart updated.')
+                try:
+                    cart.add(product=product, quantity=quantity, update_quantity=True)
+                except CartStorageFull:
+                    messages.error(request, 'Your cart is full. Log in to add more items.')
+                else:
+                    messages.success(request, 'Cart updated.')
             else:
                 messages.error(request, 'Not enough stock available.')
         else:
@@ -110,18 +229,11 @@ def checkout(request):
                 order.status = 'payment_pending'
                 order.payment_status = 'pending'
             
-            order.save()
-            
-            for item in cart:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item['product'],
-                    quantity=item['quantity'],
-                    price_at_time=item['price']
-                )
-                product = item['product']
-                product.stock -= item['quantity']
-                product.save()
+            try:
+                place_order(order, [(item.product, item.quantity, item.price) for item in cart])
+            except StockConflict as conflict:
+                messages.error(request, f'Sorry, some items just sold out: {conflict}. Please update your cart.')
+                return redirect('cart')
             
             cart.clear()
             
@@ -129,7 +241,7 @@ def checkout(request):
             if order.payment_method == 'upi':
                 return redirect('payment', order_id=order.id)
             else:
-                messages.success(request, f'Order #{order.id} placed successfully! Pay ₹{order.get_total()} on delivery.')
+                messages.success(request, f'Order #{order.id} placed successfully! Pay ₹{order.total} on delivery.')
                 return redirect('order_confirmation', order_id=order.id)
     else:
         initial_data = {
@@ -143,19 +255,29 @@ def checkout(request):
 
 @login_required
 def payment(request, order_id):
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(orders_with_items(), id=order_id, user=request.user)
     
     # Only allow payment for pending UPI orders
     if order.payment_method != 'upi' or order.payment_status == 'verified':
         return redirect('order_confirmation', order_id=order.id)
+    expired = f'Order #{order.id} was cancelled because payment didn\'t arrive in time.'
+    if order.status == 'cancelled':
+        messages.error(request, expired)
+        return redirect('order_confirmation', order_id=order.id)
     
     if request.method == 'POST':
         form = TransactionForm(request.POST)
         if form.is_valid():
-            order.transaction_id = form.cleaned_data['transaction_id']
-            order.payment_status = 'awaiting_verification'
-            order.status = 'confirmed'
-            order.save()
+            # Conditional, so an order the sweeper has just cancelled (and
+            # restocked) can't be confirmed.
+            confirmed = Order.objects.filter(pk=order.pk).exclude(status='cancelled').update(
+                transaction_id=form.cleaned_data['transaction_id'], payment_status='awaiting_verification',
+                status='confirmed', updated_at=timezone.now(),
+            )
+            if not confirmed:
+                messages.error(request, expired)
+                return redirect('order_confirmation', order_id=order.id)
+            reservations.settle([order.pk])
             messages.success(request, f'Transaction ID submitted! Your order #{order.id} is being processed.')
             return redirect('order_confirmation', order_id=order.id)
     else:
@@ -170,16 +292,17 @@ def payment(request, order_id):
         'form': form,
         'upi_id': upi_id,
         'upi_name': upi_name,
+        'held_until': reservations.expires_at(order) if order.status == 'payment_pending' else None,
     })
 
 @login_required
 def order_confirmation(request, order_id):
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(orders_with_items(), id=order_id, user=request.user)
     return render(request, 'store/order_confirmation.html', {'order': order})
 
 @login_required
 def my_orders(request):
-    orders = Order.objects.filter(user=request.user)
+    orders = orders_with_items().filter(user=request.user)
     return render(request, 'store/my_orders.html', {'orders': orders})
 
 def signup_view(request):
@@ -228,11 +351,47 @@ def is_staff(user):
 @login_required
 @user_passes_test(is_staff)
 def admin_dashboard(request):
-    products = Product.objects.all()
-    orders = Order.objects.all()[:10]
+    product_filters = DashboardProductFilterForm(request.GET)
+    order_filters = DashboardOrderFilterForm(request.GET)
+    # Invalid values (an unknown category, say) are dropped, not reported.
+    product_filters.is_valid()
+    order_filters.is_valid()
+    
+    products, product_ordering = dashboard.filter_products(product_filters.cleaned_data)
+    product_page = KeysetPaginator(products, 25, ordering=product_ordering, count_limit=0).get_page(
+        request.GET.get('p-cursor')
+    )
+    orders, order_ordering = dashboard.filter_orders(order_filters.cleaned_data)
+    order_page = KeysetPaginator(orders, 25, ordering=order_ordering, count_limit=0).get_page(
+        request.GET.get('o-cursor')
+    )
+    
     return render(request, 'store/admin_dashboard.html', {
-        'products': products,
-        'orders': orders
+        'kpis': dashboard.kpis(),
+        'product_filters': product_filters,
+        'product_page': product_page,
+        'product_rows': catalog_cache.render_cards(request, product_page, 'store/admin_product_row.html'),
+        'product_query': dashboard.query_without(request.GET, 'p-cursor'),
+        'product_hidden': dashboard.other_params(request.GET, 'p'),
+        'order_filters': order_filters,
+        'order_page': order_page,
+        'order_query': dashboard.query_without(request.GET, 'o-cursor'),
+        'order_hidden': dashboard.other_params(request.GET, 'o'),
+    })
+
+@login_required
+@user_passes_test(is_staff)
+def admin_performance(request):
+    if request.method == 'POST':
+        metrics.registry.reset()
+        catalog_cache.reset_stats()
+        messages.success(request, 'Performance metrics reset.')
+        return redirect('admin_performance')
+    
+    return render(request, 'store/admin_performance.html', {
+        'views': metrics.registry.summary(),
+        'slow_queries': metrics.registry.slowest_queries(),
+        'cache_stats': sorted(catalog_cache.stats().items()),
     })
 
 @login_required
@@ -281,6 +440,67 @@ def admin_product_delete(request, product_id):
     
     return render(request, 'store/admin_product_delete.html', {'product': product})
 
+@login_required
+@user_passes_test(is_staff)
+def admin_product_import(request):
+    result = None
+    if request.method == 'POST':
+        form = ProductImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                # Uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to a temp
+                # file, and rows are read from it one at a time.
+                result = catalog_io.import_products(
+                    upload,
+                    form.cleaned_data['format'] or catalog_io.guess_format(upload.name),
+                    create_categories=form.cleaned_data['create_categories'],
+                )
+            except (catalog_io.ImportFormatError, UnicodeDecodeError) as error:
+                form.add_error('file', str(error))
+            else:
+                messages.success(
+                    request,
+                    f'Imported {result.rows} rows: {result.created} created, '
+                    f'{result.updated} updated, {result.failed} rejected.',
+                )
+    else:
+        form = ProductImportForm()
+    
+    return render(request, 'store/admin_product_import.html', {'form': form, 'result': result})
+
+@login_required
+@user_passes_test(is_staff)
+def admin_product_export(request):
+    format = request.GET.get('format', 'csv')
+    if format not in catalog_io.FORMATS:
+        format = 'csv'
+    content_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        catalog_io.serialize(catalog_io.export_rows(), format),
+        content_type=f'{content_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{catalog_io.export_filename(format)}"'
+    return response
+
+@login_required
+@user_passes_test(is_staff)
+def admin_order_export(request):
+    # The form submits by GET, so an export is a plain link that can be shared or scripted.
+    form = OrderExportForm(request.GET or None)
+    if not form.is_valid():
+        return render(request, 'store/admin_order_export.html', {'form': form})
+    
+    data = form.cleaned_data
+    orders = order_export.orders_for_export(data['date_from'], data['date_to'], data['status'])
+    content_type = 'text/csv' if data['format'] == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        order_export.serialize(orders, data['format']), content_type=f'{content_type}; charset=utf-8',
+    )
+    filename = order_export.export_filename(data['format'], data['date_from'], data['date_to'])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @login_required
 @user_passes_test(is_staff)
 def admin_order_update(request, order_id):
@@ -295,8 +515,16 @@ def admin_order_update(request, order_id):
         else:
             status = request.POST.get('status')
             if status in dict(Order.STATUS_CHOICES):
+                previous_status = order.status
                 order.status = status
                 order.save()
+                reservations.status_changed(order, previous_status)
                 messages.success(request, f'Order #{order.id} status updated to {order.get_status_display()}.')
+        dashboard.invalidate_kpis()
+        
+        # Back to the same filtered page of the dashboard.
+        next_url = request.POST.get('next')
+        if next_url and url_has_allowed_host_and_scheme(next_url, {request.get_host()}, request.is_secure()):
+            return redirect(next_url)
     
     return redirect('admin_dashboard')